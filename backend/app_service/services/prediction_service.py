@@ -9,22 +9,46 @@ import cloudinary.uploader
 import db.connections as db_conn
 import httpx
 from api_routes.endpoints import GET_MODEL_PREDICTION
+from utils.prediction_format import (
+    PREDICTION_ACCEPT,
+    decode_predictions,
+    is_prediction_payload,
+)
 from models.prediction import PredictionStatus
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pathlib import Path
 import json
+import heapq
 from bson import ObjectId
 
 
-async def get_prediction(model_name: str, file):
-    files = {"file": (file.filename, await file.read(), file.content_type)}
+async def get_prediction(
+    model_name: str, file, top_k: Optional[int] = None, include_probs: bool = False
+):
+    # Send the image as the raw request body; model_service decodes it straight
+    # from memory instead of parsing (and possibly spooling) a multipart form
+    content_type = file.content_type or ""
+    if not content_type.startswith("image/"):
+        content_type = "application/octet-stream"
+    # model_service picks the top k itself and skips the full vector, unless
+    # include_probs asks for it as well
+    params = {}
+    if top_k:
+        params["top_k"] = top_k
+    if include_probs:
+        params["include_probs"] = True
     async with httpx.AsyncClient() as client:
         resp = await client.post(
             settings.BACKEND_MODEL_URL
             + GET_MODEL_PREDICTION.format(model_name=model_name),
-            files=files,
+            content=await file.read(),
+            headers={"Content-Type": content_type, "Accept": PREDICTION_ACCEPT},
+            params=params or None,
         )
         resp.raise_for_status()
+        # Compact binary body when model_service supports it, JSON otherwise
+        if is_prediction_payload(resp.headers.get("content-type", "")):
+            return decode_predictions(resp.content)[0]
         return resp.json()
 
 
@@ -62,7 +86,10 @@ async def predict_service(
         # Call model_service
         start_time = time.perf_counter()
         file.file.seek(0)
-        prediction_result = await get_prediction(model_name, file)
+        # The full distribution is stored too (all_probabilities)
+        prediction_result = await get_prediction(
+            model_name, file, top_k=top_k, include_probs=True
+        )
         end_time = time.perf_counter()
         elapsed = end_time - start_time
 
@@ -123,6 +150,9 @@ def parse_top_predictions(
                 "confidence": 0.999808132648468,
                 "raw_output": [0.999808132648468, 1.5604824511683546e-05, ...]
             }
+            or, when model_service was asked for top_k, "top_predictions":
+            [{"class_idx": 0, "label": "apple/apple scab", "confidence": 0.9998}, ...]
+            in place of (or alongside) raw_output
         idx2label: Mapping from index to "crop/disease_name" format
         top_k: Number of top predictions to return
 
@@ -132,23 +162,31 @@ def parse_top_predictions(
     predictions = []
 
     try:
-        # Get raw probabilities array
-        raw_output = prediction_result.get("raw_output", [])
-
-        if not raw_output:
-            raise ValueError("Empty raw_output")
+        server_top = prediction_result.get("top_predictions")
+        if server_top:
+            # Already selected and ordered by model_service
+            sorted_predictions = [
+                (p["class_idx"], p["confidence"], p.get("label"))
+                for p in server_top[:top_k]
+            ]
+        else:
+            # Get raw probabilities array
+            raw_output = prediction_result.get("raw_output", [])
 
-        # Create list of (index, probability) tuples
-        indexed_probs = [(idx, prob) for idx, prob in enumerate(raw_output)]
+            if not raw_output:
+                raise ValueError("Empty raw_output")
 
-        # Sort by probability (descending) and get top k
-        sorted_predictions = sorted(indexed_probs, key=lambda x: x[1], reverse=True)[
-            :top_k
-        ]
+            # Top k by probability (descending) without sorting the whole vector
+            sorted_predictions = [
+                (idx, prob, None)
+                for idx, prob in heapq.nlargest(
+                    top_k, enumerate(raw_output), key=lambda x: x[1]
+                )
+            ]
 
-        for class_idx, confidence in sorted_predictions:
+        for class_idx, confidence, label in sorted_predictions:
             # Get label from idx2label
-            label = idx2label.get(str(class_idx), "unknown/unknown")
+            label = label or idx2label.get(str(class_idx), "unknown/unknown")
 
             # Parse crop and disease from label
             crop, disease = parse_crop_disease(label)
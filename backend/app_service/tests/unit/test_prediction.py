@@ -6,11 +6,14 @@ from services.prediction_service import (
     delete_prediction,
     parse_top_predictions,
     predict_service,
+    get_prediction,
 )
 from unittest.mock import MagicMock, AsyncMock, patch, mock_open
 from fastapi import HTTPException, UploadFile
 import json
 import io
+import struct
+from utils.prediction_format import decode_predictions
 
 
 @pytest.mark.asyncio
@@ -955,9 +958,8 @@ async def test_predict_service_success():
         return_value=mock_cloudinary_result,
     ), patch(
         "services.prediction_service.get_prediction",
-        new_callable=AsyncMock,
-        return_value=mock_prediction_result,
-    ), patch(
+        new=AsyncMock(return_value=mock_prediction_result),
+    ) as mock_get_prediction, patch(
         "services.prediction_service.db_conn", mock_db_conn
     ), patch(
         "services.prediction_service.settings", mock_settings
@@ -984,6 +986,12 @@ async def test_predict_service_success():
         assert "top_predictions" in result["raw_output"]
         assert len(result["raw_output"]["top_predictions"]) <= top_k
         assert result["raw_output"]["primary_confidence"] == 0.999808132648468
+        # The full distribution is requested alongside the top k and stored
+        assert mock_get_prediction.call_args.kwargs["include_probs"] is True
+        assert (
+            result["raw_output"]["all_probabilities"]
+            == mock_prediction_result["raw_output"]
+        )
 
         # Verify database insert was called
         mock_db_conn.predictions_collection.insert_one.assert_called_once()
@@ -1518,3 +1526,129 @@ def test_parse_top_predictions_confidence_conversion():
 
         for pred in result:
             assert isinstance(pred["confidence"], float)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "content_type,expected",
+    [("image/png", "image/png"), (None, "application/octet-stream")],
+)
+async def test_get_prediction_sends_raw_image_body(content_type, expected):
+    """The image goes to model_service as the request body, not a multipart form"""
+    mock_file = MagicMock()
+    mock_file.read = AsyncMock(return_value=b"image-bytes")
+    mock_file.content_type = content_type
+
+    mock_response = MagicMock()
+    mock_response.headers = {"content-type": "application/json"}
+    mock_response.json.return_value = {"model": "resnet50"}
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(return_value=mock_response)
+    mock_client.__aenter__.return_value = mock_client
+
+    with patch(
+        "services.prediction_service.httpx.AsyncClient", return_value=mock_client
+    ):
+        result = await get_prediction("resnet50", mock_file)
+
+    assert result == {"model": "resnet50"}
+    kwargs = mock_client.post.call_args.kwargs
+    assert kwargs["content"] == b"image-bytes"
+    assert kwargs["headers"]["Content-Type"] == expected
+    assert "files" not in kwargs
+
+
+def encode_prediction_payload(items, rows, code=1):
+    """Hand-built model_service binary body (see utils/prediction_format.py)"""
+    meta = json.dumps(items).encode()
+    classes = len(rows[0])
+    fmt = "f" if code == 1 else "e"
+    data = struct.pack(f"<{len(rows) * classes}{fmt}", *[v for r in rows for v in r])
+    header = struct.pack("<4sBBHHI", b"PLNT", 1, code, len(rows), classes, len(meta))
+    return header + meta + data
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("code", [1, 2])
+async def test_get_prediction_parses_binary_response(code):
+    """Binary model_service responses come back as the usual result dict"""
+    mock_file = MagicMock()
+    mock_file.read = AsyncMock(return_value=b"image-bytes")
+    mock_file.content_type = "image/jpeg"
+
+    item = {"model": "resnet50", "prediction": "apple/apple scab", "confidence": 0.75}
+    mock_response = MagicMock()
+    mock_response.headers = {
+        "content-type": "application/vnd.plant-prediction; dtype=float32"
+    }
+    mock_response.content = encode_prediction_payload([item], [[0.75, 0.25]], code)
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(return_value=mock_response)
+    mock_client.__aenter__.return_value = mock_client
+
+    with patch(
+        "services.prediction_service.httpx.AsyncClient", return_value=mock_client
+    ):
+        result = await get_prediction("resnet50", mock_file)
+
+    assert result == {**item, "raw_output": [0.75, 0.25]}
+    accept = mock_client.post.call_args.kwargs["headers"]["Accept"]
+    assert accept.startswith("application/vnd.plant-prediction")
+    mock_response.json.assert_not_called()
+
+
+def test_decode_predictions_skips_missing_rows():
+    """Rows of NaN (e.g. failed batch items) don't get a raw_output"""
+    nan = float("nan")
+    payload = encode_prediction_payload(
+        [{"model": "a"}, {"error": "bad image"}], [[0.5, 0.5], [nan, nan]]
+    )
+    assert decode_predictions(payload) == [
+        {"model": "a", "raw_output": [0.5, 0.5]},
+        {"error": "bad image"},
+    ]
+
+
+def test_parse_top_predictions_uses_server_top_k():
+    """top_predictions from model_service are used as-is, without a raw vector"""
+    prediction_result = {
+        "prediction": "apple/black rot",
+        "confidence": 0.7,
+        "top_predictions": [
+            {"class_idx": 1, "label": "apple/black rot", "confidence": 0.7},
+            {"class_idx": 0, "label": "apple/apple scab", "confidence": 0.2},
+        ],
+    }
+
+    result = parse_top_predictions(prediction_result, {}, top_k=5)
+
+    assert [p["class_idx"] for p in result] == [1, 0]
+    assert result[0]["crop"] == "apple"
+    assert result[0]["disease"] == "black rot"
+    assert result[1]["confidence"] == 0.2
+
+
+@pytest.mark.asyncio
+async def test_get_prediction_requests_top_k():
+    mock_file = MagicMock()
+    mock_file.read = AsyncMock(return_value=b"image-bytes")
+    mock_file.content_type = "image/jpeg"
+
+    mock_response = MagicMock()
+    mock_response.headers = {"content-type": "application/json"}
+    mock_response.json.return_value = {"model": "resnet50"}
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(return_value=mock_response)
+    mock_client.__aenter__.return_value = mock_client
+
+    with patch(
+        "services.prediction_service.httpx.AsyncClient", return_value=mock_client
+    ):
+        await get_prediction("resnet50", mock_file, top_k=3)
+        assert mock_client.post.call_args.kwargs["params"] == {"top_k": 3}
+
+        await get_prediction("resnet50", mock_file, top_k=3, include_probs=True)
+        assert mock_client.post.call_args.kwargs["params"] == {
+            "top_k": 3,
+            "include_probs": True,
+        }
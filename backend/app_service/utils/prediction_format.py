@@ -0,0 +1,55 @@
+"""
+Reader for model_service's compact binary prediction responses
+(`application/vnd.plant-prediction`, see model_service/services/prediction_format.py).
+
+Header (little-endian): magic b"PLNT", version, dtype (1 = float32, 2 = float16),
+result count, classes per result and metadata length; then the JSON metadata, then
+the probabilities row-major. Parsed with the standard library only.
+"""
+
+import json
+import math
+import struct
+import sys
+from array import array
+from typing import List
+
+PREDICTION_MEDIA_TYPE = "application/vnd.plant-prediction"
+
+# Binary first; JSON from a model_service that doesn't speak it yet
+PREDICTION_ACCEPT = f"{PREDICTION_MEDIA_TYPE}, application/json;q=0.5"
+
+_HEADER = struct.Struct("<4sBBHHI")
+
+
+def _read_floats(data: bytes, code: int) -> List[float]:
+    if code == 1:
+        values = array("f")
+        values.frombytes(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values.tolist()
+    if code == 2:
+        return list(struct.unpack(f"<{len(data) // 2}e", data))
+    raise ValueError(f"Unknown prediction dtype code {code}")
+
+
+def decode_predictions(payload: bytes) -> List[dict]:
+    """Result dicts in the same shape as model_service's JSON responses"""
+    magic, version, code, count, classes, meta_len = _HEADER.unpack_from(payload)
+    if magic != b"PLNT" or version != 1:
+        raise ValueError("Not a plant-prediction payload")
+
+    offset = _HEADER.size
+    meta = json.loads(payload[offset : offset + meta_len])
+    values = _read_floats(payload[offset + meta_len :], code)
+
+    for i, item in enumerate(meta):
+        row = values[i * classes : (i + 1) * classes]
+        if row and not all(math.isnan(v) for v in row):
+            item["raw_output"] = row
+    return meta
+
+
+def is_prediction_payload(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() == PREDICTION_MEDIA_TYPE
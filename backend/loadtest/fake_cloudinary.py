@@ -0,0 +1,58 @@
+"""
+A stand-in for Cloudinary's upload API.
+
+    FAKE_CLOUDINARY_LATENCY_MS=250 python -m uvicorn loadtest.fake_cloudinary:app --port 8090
+
+The cloudinary SDK posts uploads to "<upload_prefix>/v1_1/<cloud>/<resource type>/upload";
+starting a service with CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:8090 (next to
+CLOUDINARY_CLOUD_NAME) sends them here instead. Uploads are read and counted but not
+stored, and answered with a Cloudinary-shaped response after FAKE_CLOUDINARY_LATENCY_MS
+(default 0), to model the round trip to the real service.
+"""
+
+import asyncio
+import os
+import uuid
+
+from fastapi import FastAPI, Request
+
+app = FastAPI(title="Fake Cloudinary")
+app.state.uploads = 0
+app.state.bytes = 0
+
+
+@app.post("/v1_1/{cloud_name}/{resource_type}/upload")
+async def upload(cloud_name: str, resource_type: str, request: Request):
+    form = await request.form()
+    upload_file = form.get("file")
+    data = await upload_file.read() if hasattr(upload_file, "read") else b""
+
+    latency_ms = float(os.environ.get("FAKE_CLOUDINARY_LATENCY_MS", 0))
+    if latency_ms:
+        await asyncio.sleep(latency_ms / 1000)
+
+    app.state.uploads += 1
+    app.state.bytes += len(data)
+    folder = form.get("folder")
+    public_id = f"{folder}/{uuid.uuid4().hex}" if folder else uuid.uuid4().hex
+    path = f"{cloud_name}/{resource_type}/upload/v1/{public_id}.jpg"
+    return {
+        "public_id": public_id,
+        "version": 1,
+        "resource_type": resource_type,
+        "type": "upload",
+        "format": "jpg",
+        "bytes": len(data),
+        "url": f"http://res.cloudinary.invalid/{path}",
+        "secure_url": f"https://res.cloudinary.invalid/{path}",
+    }
+
+
+@app.post("/v1_1/{cloud_name}/{resource_type}/destroy")
+async def destroy(cloud_name: str, resource_type: str):
+    return {"result": "ok"}
+
+
+@app.get("/stats")
+async def stats():
+    return {"uploads": app.state.uploads, "bytes": app.state.bytes}
@@ -0,0 +1,647 @@
+"""
+An in-memory MongoDB stand-in that speaks the wire protocol.
+
+    python -m loadtest.mongo_standin --port 27018
+
+pymongo / motor connect to it like to a standalone mongod (mongodb://127.0.0.1:27018),
+so app_service and model_service run unmodified. It implements the commands the two
+services issue: hello, ping, find, insert, update, delete, findAndModify, aggregate
+($match, $sort, $skip, $limit, $project, $group with $sum, $count), createIndexes and a
+few administrative ones. Queries support equality (including dotted paths and array
+membership), the comparison operators, $in / $nin / $exists / $regex and
+$and / $or / $nor; updates support $set, $unset, $inc, $setOnInsert, $push, $addToSet,
+$pull and replacement documents.
+
+It is a stand-in for load tests, not a database: collections are scanned linearly,
+indexes (including TTL expiry) are recorded but not used, and nothing is persisted.
+Point the harness at a real mongod (--mongo-uri) when database latency matters.
+"""
+
+import argparse
+import asyncio
+import copy
+import itertools
+import re
+import struct
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+
+OP_REPLY = 1
+OP_QUERY = 2004
+OP_MSG = 2013
+
+# OP_MSG flag bits
+CHECKSUM_PRESENT = 1 << 0
+MORE_TO_COME = 1 << 1
+
+# Same as MongoDB 7.0
+MAX_WIRE_VERSION = 21
+MAX_BSON_SIZE = 16 * 1024 * 1024
+MAX_MESSAGE_SIZE = 48_000_000
+
+CODEC_OPTIONS = CodecOptions(tz_aware=True, tzinfo=timezone.utc)
+HEADER = struct.Struct("<iiii")
+
+_MISSING = object()
+
+
+class CommandError(Exception):
+    def __init__(self, message: str, code: int = 2, code_name: str = "BadValue"):
+        super().__init__(message)
+        self.code = code
+        self.code_name = code_name
+
+
+# --------------------------------------------------------------------------
+# Documents, queries and updates
+# --------------------------------------------------------------------------
+
+
+def get_path(doc: Any, path: str) -> Any:
+    for part in path.split("."):
+        if isinstance(doc, dict) and part in doc:
+            doc = doc[part]
+        elif isinstance(doc, list) and part.isdigit() and int(part) < len(doc):
+            doc = doc[int(part)]
+        else:
+            return _MISSING
+    return doc
+
+
+def set_path(doc: dict, path: str, value: Any):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def unset_path(doc: dict, path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    try:
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        return value <= operand  # $lte
+    except TypeError:  # MongoDB only compares values of the same type
+        return False
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def _match_operators(value: Any, conditions: dict) -> bool:
+    for op, operand in conditions.items():
+        if op == "$eq":
+            ok = _equals(value, operand)
+        elif op == "$ne":
+            ok = not _equals(value, operand)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            candidates = value if isinstance(value, list) else [value]
+            ok = any(v is not _MISSING and _compare(v, op, operand) for v in candidates)
+        elif op == "$in":
+            ok = any(_equals(value, candidate) for candidate in operand)
+        elif op == "$nin":
+            ok = not any(_equals(value, candidate) for candidate in operand)
+        elif op == "$exists":
+            ok = (value is not _MISSING) == bool(operand)
+        elif op == "$regex":
+            pattern = operand.pattern if hasattr(operand, "pattern") else operand
+            flags = re.IGNORECASE if "i" in conditions.get("$options", "") else 0
+            ok = isinstance(value, str) and re.search(pattern, value, flags)
+        elif op == "$options":
+            continue
+        elif op == "$not":
+            ok = not _match_operators(value, operand)
+        else:
+            raise CommandError(f"unknown operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            ok = all(matches(doc, q) for q in condition)
+        elif key == "$or":
+            ok = any(matches(doc, q) for q in condition)
+        elif key == "$nor":
+            ok = not any(matches(doc, q) for q in condition)
+        elif isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            ok = _match_operators(get_path(doc, key), condition)
+        else:
+            ok = _equals(get_path(doc, key), condition)
+        if not ok:
+            return False
+    return True
+
+
+def _sort_key(value: Any) -> Tuple:
+    # MongoDB's cross-type order, for the types these services store
+    if value is _MISSING or value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, ObjectId):
+        return (4, value.binary)
+    if isinstance(value, datetime):
+        return (6, value.timestamp())
+    return (3, str(value))
+
+
+def sort_docs(docs: List[dict], spec: Optional[dict]) -> List[dict]:
+    for key, direction in reversed(list((spec or {}).items())):
+        docs = sorted(
+            docs, key=lambda d: _sort_key(get_path(d, key)), reverse=direction < 0
+        )
+    return docs
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return doc
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if any(fields.values()):
+        result = (
+            {"_id": doc["_id"]} if projection.get("_id", 1) and "_id" in doc else {}
+        )
+        for key in fields:
+            value = get_path(doc, key)
+            if value is not _MISSING:
+                set_path(result, key, value)
+        return result
+    result = copy.deepcopy(doc)
+    for key in projection:
+        if not projection[key]:
+            unset_path(result, key)
+    return result
+
+
+def apply_update(doc: dict, update: Any, inserting: bool = False) -> dict:
+    """The updated copy of `doc`"""
+    if isinstance(update, list):
+        raise CommandError("pipeline updates are not supported by the stand-in")
+    if not any(key.startswith("$") for key in update):
+        replacement = copy.deepcopy(update)
+        if "_id" in doc:
+            replacement["_id"] = doc["_id"]
+        return replacement
+
+    doc = copy.deepcopy(doc)
+    for op, fields in update.items():
+        for path, value in fields.items():
+            current = get_path(doc, path)
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                set_path(doc, path, copy.deepcopy(value))
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                unset_path(doc, path)
+            elif op == "$inc":
+                set_path(doc, path, (0 if current is _MISSING else current) + value)
+            elif op == "$currentDate":
+                set_path(doc, path, datetime.now(timezone.utc))
+            elif op in ("$push", "$addToSet"):
+                items = list(current) if isinstance(current, list) else []
+                values = value["$each"] if isinstance(value, dict) else [value]
+                for item in values:
+                    if op == "$push" or item not in items:
+                        items.append(item)
+                set_path(doc, path, items)
+            elif op == "$pull":
+                if isinstance(current, list):
+                    set_path(doc, path, [v for v in current if v != value])
+            else:
+                raise CommandError(f"Unknown modifier: {op}", 9, "FailedToParse")
+    return doc
+
+
+def _upsert_seed(query: dict) -> dict:
+    """The equality fields of a query, which seed an upserted document"""
+    seed = {}
+    for key, value in (query or {}).items():
+        if key.startswith("$"):
+            continue
+        if isinstance(value, dict) and any(k.startswith("$") for k in value):
+            if "$eq" in value:
+                set_path(seed, key, value["$eq"])
+            continue
+        set_path(seed, key, value)
+    return seed
+
+
+# --------------------------------------------------------------------------
+# Storage and commands
+# --------------------------------------------------------------------------
+
+
+class Collection:
+    def __init__(self):
+        self.docs: Dict[Any, dict] = {}  # _id -> document, in insertion order
+        self.indexes: Dict[str, dict] = {"_id_": {"key": {"_id": 1}, "name": "_id_"}}
+
+    def find(self, query: Optional[dict]) -> List[dict]:
+        return [doc for doc in self.docs.values() if matches(doc, query)]
+
+    def insert(self, doc: dict):
+        doc.setdefault("_id", ObjectId())
+        key = _id_key(doc["_id"])
+        if key in self.docs:
+            raise CommandError(
+                f"E11000 duplicate key error dup key: {{ _id: {doc['_id']!r} }}",
+                11000,
+                "DuplicateKey",
+            )
+        self.docs[key] = doc
+
+    def replace(self, old: dict, new: dict):
+        self.docs[_id_key(old["_id"])] = new
+
+    def remove(self, doc: dict):
+        self.docs.pop(_id_key(doc["_id"]), None)
+
+
+def _id_key(value: Any) -> Any:
+    # Documents as _id values are unhashable; their encoding is a stable key
+    return bson.encode(value) if isinstance(value, dict) else value
+
+
+class MongoStandIn:
+    def __init__(self):
+        self.databases: Dict[str, Dict[str, Collection]] = defaultdict(
+            lambda: defaultdict(Collection)
+        )
+        self._connection_ids = itertools.count(1)
+        self._started = datetime.now(timezone.utc)
+
+    # ---------------------------------------------------------------- commands
+
+    def run_command(self, db: str, cmd: dict, connection_id: int = 0) -> dict:
+        name = next(iter(cmd))
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            return {
+                "ok": 0.0,
+                "errmsg": f"no such command: '{name}'",
+                "code": 59,
+                "codeName": "CommandNotFound",
+            }
+        try:
+            reply = handler(db, cmd, connection_id)
+        except CommandError as e:
+            return {
+                "ok": 0.0,
+                "errmsg": str(e),
+                "code": e.code,
+                "codeName": e.code_name,
+            }
+        reply.setdefault("ok", 1.0)
+        return reply
+
+    def cmd_hello(self, db, cmd, connection_id):
+        return {
+            "helloOk": True,
+            "isWritablePrimary": True,
+            "ismaster": True,
+            "maxBsonObjectSize": MAX_BSON_SIZE,
+            "maxMessageSizeBytes": MAX_MESSAGE_SIZE,
+            "maxWriteBatchSize": 100_000,
+            "localTime": datetime.now(timezone.utc),
+            "logicalSessionTimeoutMinutes": 30,
+            "connectionId": connection_id,
+            "minWireVersion": 0,
+            "maxWireVersion": MAX_WIRE_VERSION,
+            "readOnly": False,
+        }
+
+    cmd_ismaster = cmd_hello
+
+    def cmd_ping(self, db, cmd, connection_id):
+        return {}
+
+    def cmd_buildinfo(self, db, cmd, connection_id):
+        return {"version": "7.0.0-standin", "versionArray": [7, 0, 0, 0]}
+
+    def cmd_endsessions(self, db, cmd, connection_id):
+        return {}
+
+    def cmd_killcursors(self, db, cmd, connection_id):
+        return {"cursorsKilled": cmd.get("cursors", [])}
+
+    def cmd_listdatabases(self, db, cmd, connection_id):
+        return {
+            "databases": [{"name": name, "empty": False} for name in self.databases]
+        }
+
+    def cmd_listcollections(self, db, cmd, connection_id):
+        batch = [{"name": name, "type": "collection"} for name in self.databases[db]]
+        return _cursor(f"{db}.$cmd.listCollections", batch)
+
+    def cmd_drop(self, db, cmd, connection_id):
+        self.databases[db].pop(cmd["drop"], None)
+        return {}
+
+    def cmd_dropdatabase(self, db, cmd, connection_id):
+        self.databases.pop(db, None)
+        return {}
+
+    def cmd_createindexes(self, db, cmd, connection_id):
+        collection = self.databases[db][cmd["createIndexes"]]
+        before = len(collection.indexes)
+        for index in cmd["indexes"]:
+            collection.indexes[index["name"]] = index
+        return {"numIndexesBefore": before, "numIndexesAfter": len(collection.indexes)}
+
+    def cmd_listindexes(self, db, cmd, connection_id):
+        collection = self.databases[db][cmd["listIndexes"]]
+        return _cursor(f"{db}.{cmd['listIndexes']}", list(collection.indexes.values()))
+
+    def cmd_insert(self, db, cmd, connection_id):
+        collection = self.databases[db][cmd["insert"]]
+        errors = []
+        for i, doc in enumerate(cmd.get("documents", [])):
+            try:
+                collection.insert(doc)
+            except CommandError as e:
+                errors.append({"index": i, "code": e.code, "errmsg": str(e)})
+                if cmd.get("ordered", True):
+                    break
+        reply = {"n": len(cmd.get("documents", [])) - len(errors)}
+        if errors:
+            reply["writeErrors"] = errors
+        return reply
+
+    def cmd_find(self, db, cmd, connection_id):
+        collection = self.databases[db][cmd["find"]]
+        docs = sort_docs(collection.find(cmd.get("filter")), cmd.get("sort"))
+        skip, limit = cmd.get("skip", 0), abs(cmd.get("limit", 0))
+        docs = docs[skip : skip + limit if limit else None]
+        # Every result fits in the first batch; the cursor is always exhausted
+        batch = [project(doc, cmd.get("projection")) for doc in docs]
+        return _cursor(f"{db}.{cmd['find']}", batch)
+
+    def cmd_count(self, db, cmd, connection_id):
+        docs = self.databases[db][cmd["count"]].find(cmd.get("query"))
+        skip, limit = cmd.get("skip", 0), cmd.get("limit", 0)
+        return {"n": len(docs[skip : skip + limit if limit else None])}
+
+    def cmd_distinct(self, db, cmd, connection_id):
+        values = []
+        for doc in self.databases[db][cmd["distinct"]].find(cmd.get("query")):
+            value = get_path(doc, cmd["key"])
+            if value is not _MISSING and value not in values:
+                values.append(value)
+        return {"values": values}
+
+    def cmd_update(self, db, cmd, connection_id):
+        collection = self.databases[db][cmd["update"]]
+        matched = modified = 0
+        upserted = []
+        for i, spec in enumerate(cmd.get("updates", [])):
+            docs = collection.find(spec.get("q"))
+            if not spec.get("multi"):
+                docs = docs[:1]
+            for doc in docs:
+                new = apply_update(doc, spec["u"])
+                matched += 1
+                if new != doc:
+                    modified += 1
+                    collection.replace(doc, new)
+            if not docs and spec.get("upsert"):
+                new = apply_update(
+                    _upsert_seed(spec.get("q")), spec["u"], inserting=True
+                )
+                collection.insert(new)
+                upserted.append({"index": i, "_id": new["_id"]})
+        reply = {"n": matched + len(upserted), "nModified": modified}
+        if upserted:
+            reply["upserted"] = upserted
+        return reply
+
+    def cmd_delete(self, db, cmd, connection_id):
+        collection = self.databases[db][cmd["delete"]]
+        deleted = 0
+        for spec in cmd.get("deletes", []):
+            docs = collection.find(spec.get("q"))
+            if spec.get("limit"):
+                docs = docs[: spec["limit"]]
+            for doc in docs:
+                collection.remove(doc)
+            deleted += len(docs)
+        return {"n": deleted}
+
+    def cmd_findandmodify(self, db, cmd, connection_id):
+        collection = self.databases[db][cmd["findAndModify"]]
+        docs = sort_docs(collection.find(cmd.get("query")), cmd.get("sort"))
+        doc = docs[0] if docs else None
+        fields = cmd.get("fields")
+
+        if cmd.get("remove"):
+            if doc is not None:
+                collection.remove(doc)
+            value = doc
+            last_error = {"n": int(doc is not None)}
+        elif doc is not None:
+            new = apply_update(doc, cmd["update"])
+            collection.replace(doc, new)
+            value = new if cmd.get("new") else doc
+            last_error = {"n": 1, "updatedExisting": True}
+        elif cmd.get("upsert"):
+            new = apply_update(_upsert_seed(cmd.get("query")), cmd["update"], True)
+            collection.insert(new)
+            value = new if cmd.get("new") else None
+            last_error = {"n": 1, "updatedExisting": False, "upserted": new["_id"]}
+        else:
+            value = None
+            last_error = {"n": 0, "updatedExisting": False}
+
+        return {
+            "lastErrorObject": last_error,
+            "value": None if value is None else project(value, fields),
+        }
+
+    def cmd_aggregate(self, db, cmd, connection_id):
+        pipeline = cmd.get("pipeline", [])
+        if pipeline and "$changeStream" in pipeline[0]:
+            raise CommandError(
+                "The $changeStream stage is only supported on replica sets",
+                40573,
+                "Location40573",
+            )
+        docs = self.databases[db][cmd["aggregate"]].find(None)
+        for stage in pipeline:
+            docs = self._aggregate_stage(docs, stage)
+        return _cursor(f"{db}.{cmd['aggregate']}", docs)
+
+    def _aggregate_stage(self, docs: List[dict], stage: dict) -> List[dict]:
+        (op, spec), *_ = stage.items()
+        if op == "$match":
+            return [doc for doc in docs if matches(doc, spec)]
+        if op == "$sort":
+            return sort_docs(docs, spec)
+        if op == "$skip":
+            return docs[spec:]
+        if op == "$limit":
+            return docs[:spec]
+        if op == "$project":
+            return [project(doc, spec) for doc in docs]
+        if op == "$count":
+            return [{spec: len(docs)}] if docs else []
+        if op == "$group":
+            return self._group(docs, spec)
+        raise CommandError(f"Unsupported aggregation stage: {op}")
+
+    @staticmethod
+    def _group(docs: List[dict], spec: dict) -> List[dict]:
+        def value_of(doc, expr):
+            if isinstance(expr, str) and expr.startswith("$"):
+                value = get_path(doc, expr[1:])
+                return None if value is _MISSING else value
+            return expr
+
+        groups: Dict[Any, dict] = {}
+        for doc in docs:
+            key = value_of(doc, spec["_id"])
+            group = groups.setdefault(_id_key(key), {"_id": key})
+            for field, accumulator in spec.items():
+                if field == "_id":
+                    continue
+                (op, expr), *_ = accumulator.items()
+                if op != "$sum":
+                    raise CommandError(f"Unsupported accumulator: {op}")
+                value = value_of(doc, expr)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    group[field] = group.get(field, 0) + value
+                else:
+                    group.setdefault(field, 0)
+        return list(groups.values())
+
+    # ---------------------------------------------------------------- protocol
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        connection_id = next(self._connection_ids)
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                length, request_id, _, opcode = HEADER.unpack(header)
+                body = await reader.readexactly(length - HEADER.size)
+                reply = self._handle_message(opcode, body, connection_id)
+                if reply is not None:
+                    writer.write(_frame(request_id, *reply))
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _handle_message(
+        self, opcode: int, body: bytes, connection_id: int
+    ) -> Optional[Tuple[int, bytes]]:
+        if opcode == OP_MSG:
+            flags = struct.unpack_from("<I", body)[0]
+            end = len(body) - (4 if flags & CHECKSUM_PRESENT else 0)
+            cmd = _parse_op_msg(body[4:end])
+            reply = self.run_command(cmd.pop("$db", "admin"), cmd, connection_id)
+            if flags & MORE_TO_COME:  # unacknowledged write: no reply expected
+                return None
+            return OP_MSG, struct.pack("<IB", 0, 0) + bson.encode(reply)
+
+        if opcode == OP_QUERY:
+            # Legacy framing, used by drivers for the initial handshake only
+            name_end = body.index(b"\x00", 4)
+            db = body[4:name_end].decode().split(".")[0]
+            offset = name_end + 1 + 8
+            size = struct.unpack_from("<i", body, offset)[0]
+            cmd = bson.decode(body[offset : offset + size], CODEC_OPTIONS)
+            cmd = cmd.get("$query", cmd)
+            reply = self.run_command(db, cmd, connection_id)
+            return OP_REPLY, struct.pack("<iqii", 8, 0, 0, 1) + bson.encode(reply)
+
+        raise ConnectionError(f"Unsupported opcode {opcode}")
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 27017):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+def _cursor(ns: str, batch: List[dict]) -> dict:
+    return {"cursor": {"id": bson.Int64(0), "ns": ns, "firstBatch": batch}}
+
+
+def _parse_op_msg(sections: bytes) -> dict:
+    """The command document, with any document sequences folded back in"""
+    cmd, offset = None, 0
+    while offset < len(sections):
+        kind = sections[offset]
+        offset += 1
+        size = struct.unpack_from("<i", sections, offset)[0]
+        if kind == 0:
+            cmd = bson.decode(sections[offset : offset + size], CODEC_OPTIONS)
+        else:
+            name_end = sections.index(b"\x00", offset + 4)
+            identifier = sections[offset + 4 : name_end].decode()
+            docs = bson.decode_all(
+                sections[name_end + 1 : offset + size], CODEC_OPTIONS
+            )
+            cmd = cmd if cmd is not None else {}
+            cmd.setdefault(identifier, []).extend(docs)
+        offset += size
+    return cmd
+
+
+_response_ids = itertools.count(1)
+
+
+def _frame(response_to: int, opcode: int, payload: bytes) -> bytes:
+    header = HEADER.pack(
+        HEADER.size + len(payload), next(_response_ids), response_to, opcode
+    )
+    return header + payload
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27017)
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = await MongoStandIn().serve(args.host, args.port)
+        print(f"🍃 MongoDB stand-in listening on {args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Write randomly initialized weights for the models model_service serves.
+
+    cd model_service && python -m loadtest.random_weights <workdir> --num-classes 54
+
+(run with backend/ on PYTHONPATH). Creates <workdir>/saved_models/ with a checkpoint
+for every base model, under the real file names, and a stacking head for the ensemble,
+and links model_service's label maps next to them. model_service started from
+<workdir> then serves every model with the real architectures and cost, but
+meaningless predictions.
+"""
+
+import argparse
+import os
+from typing import List, Optional
+
+import numpy as np
+import torch
+
+from manager.initializer import BASE_MODEL_PATHS
+from manager.plant_model import PlantModel
+from manager.stacking_head import StackingHead
+from saved_models.model_paths.model_paths import BASE_MODEL_DIR, STACKING_HEAD_PATH
+
+# Shared with the real saved_models directory instead of copied
+LINKED_DIRS = ("utils", "model_paths")
+
+
+def write_random_weights(workdir: str, num_classes: int, seed: int = 0):
+    torch.manual_seed(seed)
+    target = os.path.join(workdir, BASE_MODEL_DIR)
+    os.makedirs(target, exist_ok=True)
+    for name in LINKED_DIRS:
+        link = os.path.join(target, name)
+        if not os.path.exists(link):
+            os.symlink(os.path.abspath(os.path.join(BASE_MODEL_DIR, name)), link)
+
+    for name, (checkpoint_path, _) in BASE_MODEL_PATHS.items():
+        model = PlantModel(
+            name=name,
+            model_path=checkpoint_path,
+            model_type="pytorch",
+            num_classes=num_classes,
+            lazy=True,
+        ).build_model_arch()
+        torch.save(
+            {"model_state": model.state_dict()}, os.path.join(workdir, checkpoint_path)
+        )
+
+    rng = np.random.default_rng(seed)
+    num_features = num_classes * len(BASE_MODEL_PATHS)
+    StackingHead(
+        rng.normal(scale=0.1, size=(num_classes, num_features)),
+        np.zeros(num_classes),
+        np.arange(num_classes),
+    ).save(os.path.join(workdir, STACKING_HEAD_PATH))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("workdir")
+    parser.add_argument("--num-classes", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    write_random_weights(args.workdir, args.num_classes)
+    print(f"🎲 Random weights written to {args.workdir}/{BASE_MODEL_DIR}")
+
+
+if __name__ == "__main__":
+    main()
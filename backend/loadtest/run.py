@@ -0,0 +1,376 @@
+"""
+Load-test the prediction flow end to end.
+
+    python -m loadtest.run
+    python -m loadtest.run --users 50 --duration 120 --model ensemble --output report.json
+    python -m loadtest.run --upload-latency-ms 300 --model-env INFERENCE_WORKERS=4
+    python -m loadtest.run --app-url http://localhost:8000 --mongo-uri mongodb://localhost
+
+Boots the local stack (loadtest.stack: both services, the MongoDB stand-in and the fake
+Cloudinary) unless --app-url targets a running app_service, and seeds --users accounts.
+Each simulated user logs in, then repeats the journey (default: predict, history,
+dashboard) --session-iterations times with --think-time seconds (on average) between
+requests, before logging in again. Users start evenly over --ramp-up seconds and stop
+starting requests after --duration.
+
+The report has, per endpoint and in total: requests, errors (non-2xx responses and
+transport failures, by status or exception), error rate, throughput, and p50/p95/p99,
+mean and max latency of the successful requests. It is printed as a table and written
+as JSON with --output; --max-error-rate turns it into a pass/fail gate.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from loadtest.stack import (
+    DEFAULT_DB_NAME,
+    DEFAULT_PASSWORD,
+    Stack,
+    seed_users,
+    user_email,
+)
+
+JOURNEY_STEPS = ("predict", "history", "dashboard")
+
+# Cookies app_service authenticates with; set Secure, so sent by hand over http
+AUTH_COOKIES = ("access_token", "refresh_token")
+
+
+def synthetic_jpeg(width: int = 1024, height: int = 768, seed: int = 0) -> bytes:
+    """A noisy phone-photo-sized JPEG; noise keeps the file at a realistic size"""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+class Recorder:
+    """Latency and outcome of every request, per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, endpoint: str, latency: float, outcome, ok: bool):
+        self.outcomes[endpoint][str(outcome)] += 1
+        if ok:
+            self.latencies[endpoint].append(latency)
+        else:
+            self.errors[endpoint][str(outcome)] += 1
+
+    def _summary(self, latencies: List[float], outcomes: Counter, duration: float):
+        requests = sum(outcomes.values())
+        errors = requests - len(latencies)
+        summary = {
+            "requests": requests,
+            "errors": errors,
+            "error_rate": errors / requests if requests else 0.0,
+            "throughput_rps": requests / duration if duration else 0.0,
+        }
+        if latencies:
+            ms = np.array(latencies) * 1000
+            summary.update(
+                p50_ms=float(np.percentile(ms, 50)),
+                p95_ms=float(np.percentile(ms, 95)),
+                p99_ms=float(np.percentile(ms, 99)),
+                mean_ms=float(ms.mean()),
+                max_ms=float(ms.max()),
+            )
+        return summary
+
+    def report(self, duration: float) -> Dict:
+        endpoints = {}
+        for endpoint in sorted(self.outcomes):
+            endpoints[endpoint] = self._summary(
+                self.latencies[endpoint], self.outcomes[endpoint], duration
+            )
+            endpoints[endpoint]["outcomes"] = dict(self.outcomes[endpoint])
+        total = self._summary(
+            [lat for lats in self.latencies.values() for lat in lats],
+            sum(self.outcomes.values(), Counter()),
+            duration,
+        )
+        return {"duration_s": duration, "total": total, "endpoints": endpoints}
+
+
+class UserSession:
+    """One simulated user, sending requests one at a time like a browser tab"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        recorder: Recorder,
+        email: str,
+        password: str,
+        model: str,
+        image: bytes,
+        rng: random.Random,
+    ):
+        self.client = client
+        self.recorder = recorder
+        self.email = email
+        self.password = password
+        self.model = model
+        self.image = image
+        self.rng = rng
+        self.cookies: Dict[str, str] = {}
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs):
+        headers = {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(
+                endpoint, time.perf_counter() - start, type(e).__name__, ok=False
+            )
+            return None
+        self.recorder.record(
+            endpoint,
+            time.perf_counter() - start,
+            response.status_code,
+            ok=response.is_success,
+        )
+        # require_user rotates expired access tokens through Set-Cookie
+        for name in AUTH_COOKIES:
+            if name in response.cookies:
+                self.cookies[name] = response.cookies[name]
+        return response
+
+    async def login(self) -> bool:
+        self.cookies = {}
+        response = await self.request(
+            "login",
+            "POST",
+            "/auth/login",
+            json={"email": self.email, "password": self.password},
+        )
+        return response is not None and response.is_success
+
+    async def predict(self):
+        await self.request(
+            "predict",
+            "POST",
+            f"/prediction/{self.model}",
+            files={"file": ("leaf.jpg", self.image, "image/jpeg")},
+        )
+
+    async def history(self):
+        await self.request(
+            "history", "POST", "/prediction/get-user-predictions", json={"limit": 10}
+        )
+
+    async def dashboard(self):
+        await self.request("dashboard", "GET", "/profile/users/get-dashboard-details")
+
+    async def think(self, mean: float):
+        if mean > 0:
+            await asyncio.sleep(self.rng.uniform(0.5 * mean, 1.5 * mean))
+
+    async def run(
+        self,
+        journey: List[str],
+        session_iterations: int,
+        think_time: float,
+        deadline: float,
+    ):
+        while time.monotonic() < deadline:
+            if not await self.login():
+                await self.think(max(think_time, 1.0))
+                continue
+            for _ in range(session_iterations):
+                for step in journey:
+                    await self.think(think_time)
+                    if time.monotonic() >= deadline:
+                        return
+                    await getattr(self, step)()
+
+
+async def run_load(
+    app_url: str,
+    emails: List[str],
+    password: str = DEFAULT_PASSWORD,
+    model: str = "resnet50",
+    image: Optional[bytes] = None,
+    duration: float = 60,
+    ramp_up: float = 0,
+    think_time: float = 1.0,
+    journey: List[str] = JOURNEY_STEPS,
+    session_iterations: int = 5,
+    timeout: float = 60,
+    seed: int = 0,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> Dict:
+    image = image or synthetic_jpeg()
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=len(emails), max_keepalive_connections=None)
+    async with httpx.AsyncClient(
+        base_url=app_url, timeout=timeout, limits=limits, transport=transport
+    ) as client:
+        start = time.monotonic()
+        deadline = start + duration
+
+        async def user(index: int, email: str):
+            if ramp_up:
+                await asyncio.sleep(ramp_up * index / len(emails))
+            session = UserSession(
+                client,
+                recorder,
+                email,
+                password,
+                model,
+                image,
+                random.Random(seed + index),
+            )
+            await session.run(list(journey), session_iterations, think_time, deadline)
+
+        await asyncio.gather(*(user(i, email) for i, email in enumerate(emails)))
+        elapsed = time.monotonic() - start
+
+    return recorder.report(elapsed)
+
+
+def print_report(report: Dict):
+    header = f"{'endpoint':<10} {'requests':>8} {'errors':>7} {'req/s':>7} "
+    header += f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header)
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, s in rows:
+        latency = " ".join(
+            f"{s[key]:>8.1f}" if key in s else f"{'-':>8}"
+            for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        print(
+            f"{name:<10} {s['requests']:>8} {s['errors']:>7} "
+            f"{s['throughput_rps']:>7.2f} {latency}"
+        )
+    for name, s in report["endpoints"].items():
+        failures = {k: v for k, v in s["outcomes"].items() if not k.startswith("2")}
+        if failures:
+            print(f"⚠️ {name} failures: {failures}")
+
+
+def env_setting(item: str):
+    key, sep, value = item.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got '{item}'")
+    return key, value
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--ramp-up", type=float, default=10, help="seconds")
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds")
+    parser.add_argument(
+        "--journey", nargs="+", default=list(JOURNEY_STEPS), choices=JOURNEY_STEPS
+    )
+    parser.add_argument("--session-iterations", type=int, default=5)
+    parser.add_argument("--model", default="resnet50")
+    parser.add_argument("--image", help="image to upload (default: synthetic JPEG)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--max-error-rate", type=float)
+    # Target: a running app_service, or the local stack booted for this run
+    parser.add_argument("--app-url", help="load-test this app_service instead")
+    parser.add_argument("--mongo-uri", help="MongoDB to seed users in / boot against")
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--upload-latency-ms", type=float, default=0.0)
+    parser.add_argument("--random-weights", action="store_true", default=None)
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument(
+        "--model-env",
+        nargs="*",
+        type=env_setting,
+        default=[],
+        help="model_service settings as KEY=VALUE",
+    )
+    parser.add_argument("--log-dir")
+    args = parser.parse_args(argv)
+
+    image = None
+    if args.image:
+        with open(args.image, "rb") as f:
+            image = f.read()
+
+    def load(app_url: str, mongo_uri: Optional[str]) -> Dict:
+        if mongo_uri:
+            emails = seed_users(mongo_uri, args.db_name, args.users, args.password)
+        else:  # accounts must already exist in the target
+            emails = [user_email(i) for i in range(args.users)]
+        print(f"🚀 {args.users} users for {args.duration:g}s against {app_url}")
+        return asyncio.run(
+            run_load(
+                app_url,
+                emails,
+                password=args.password,
+                model=args.model,
+                image=image,
+                duration=args.duration,
+                ramp_up=args.ramp_up,
+                think_time=args.think_time,
+                journey=args.journey,
+                session_iterations=args.session_iterations,
+                timeout=args.timeout,
+            )
+        )
+
+    config = {
+        k: v
+        for k, v in vars(args).items()
+        if k not in ("output", "password", "log_dir")
+    }
+    if args.app_url:
+        report = load(args.app_url, args.mongo_uri)
+    else:
+        with Stack(
+            mongo_uri=args.mongo_uri,
+            db_name=args.db_name,
+            upload_latency_ms=args.upload_latency_ms,
+            random_weights=args.random_weights,
+            app_workers=args.app_workers,
+            model_env=dict(args.model_env),
+            log_dir=args.log_dir,
+        ) as stack:
+            report = load(stack.app_url, stack.mongo_uri)
+            report["uploads"] = stack.upload_stats()
+            config.update(
+                mongo="real" if args.mongo_uri else "stand-in",
+                model_env=dict(args.model_env),
+                random_weights=stack.random_weights,
+                log_dir=stack.log_dir,
+            )
+    report = {"config": config, **report}
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_error_rate is not None:
+        if report["total"]["error_rate"] > args.max_error_rate:
+            raise SystemExit(
+                f"❌ Error rate {report['total']['error_rate']:.2%} above "
+                f"{args.max_error_rate:.2%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
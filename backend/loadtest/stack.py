@@ -0,0 +1,387 @@
+"""
+Boot app_service and model_service locally, wired to stand-ins instead of the cloud.
+
+    python -m loadtest.stack
+    python -m loadtest.stack --mongo-uri mongodb://localhost:27017 --upload-latency-ms 300
+
+Starts, each on a free port: the MongoDB stand-in (loadtest.mongo_standin, unless
+--mongo-uri points at a real server), the fake Cloudinary (loadtest.fake_cloudinary),
+model_service and app_service, then waits until model_service is /ready. Both services
+run unmodified; only their environment differs from production. Without the real
+checkpoints in model_service/saved_models, model_service serves random weights
+(loadtest.random_weights) from a scratch directory. Process output goes to --log-dir.
+
+`python -m loadtest.run` uses the same Stack to boot everything before a load test.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SERVICE_DIR = os.path.join(BACKEND_DIR, "app_service")
+MODEL_SERVICE_DIR = os.path.join(BACKEND_DIR, "model_service")
+
+DEFAULT_DB_NAME = "agri_vision_loadtest"
+DEFAULT_PASSWORD = "loadtest-password"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def user_email(index: int) -> str:
+    return f"loadtest-user-{index}@example.com"
+
+
+def _model_paths():
+    # Plain constants; loaded by path so the harness needn't import model_service
+    path = os.path.join(MODEL_SERVICE_DIR, "saved_models/model_paths/model_paths.py")
+    spec = importlib.util.spec_from_file_location("loadtest_model_paths", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def model_weights_present(root: str = MODEL_SERVICE_DIR) -> bool:
+    """Whether `root` has a checkpoint for every base model and the ensemble"""
+    paths = _model_paths()
+    checkpoints = [
+        value
+        for name, value in vars(paths).items()
+        if name.endswith("_PATH") and str(value).endswith(".pth")
+    ]
+    ensemble = [paths.STACKING_HEAD_PATH, paths.ENSEMBLE_PATH]
+    return all(os.path.exists(os.path.join(root, p)) for p in checkpoints) and any(
+        os.path.exists(os.path.join(root, p)) for p in ensemble
+    )
+
+
+def num_classes() -> int:
+    path = os.path.join(MODEL_SERVICE_DIR, "saved_models/utils/idx2label.json")
+    with open(path) as f:
+        return len(json.load(f))
+
+
+class Process:
+    """One child process, with its output in a log file"""
+
+    def __init__(self, name: str, args: List[str], cwd: str, env: dict, log_dir: str):
+        self.name = name
+        self.log_path = os.path.join(log_dir, f"{name}.log")
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            args, cwd=cwd, env=env, stdout=self._log, stderr=subprocess.STDOUT
+        )
+
+    def _check_alive(self):
+        if self.process.poll() is not None:
+            with open(self.log_path, "rb") as f:
+                tail = f.read()[-2000:].decode(errors="replace")
+            raise RuntimeError(
+                f"{self.name} exited with {self.process.returncode}, "
+                f"see {self.log_path}:\n{tail}"
+            )
+
+    def wait_for_port(self, port: int, timeout: float = 30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self._check_alive()
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise TimeoutError(f"{self.name} did not listen on {port} within {timeout}s")
+
+    def wait_for_url(self, url: str, timeout: float = 120):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self._check_alive()
+            try:
+                if httpx.get(url, timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.5)
+        raise TimeoutError(f"{self.name} was not ready at {url} within {timeout}s")
+
+    def stop(self, timeout: float = 10):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._log.close()
+
+
+class Stack:
+    def __init__(
+        self,
+        mongo_uri: Optional[str] = None,
+        db_name: str = DEFAULT_DB_NAME,
+        upload_latency_ms: float = 0.0,
+        random_weights: Optional[bool] = None,
+        app_workers: int = 1,
+        model_env: Optional[Dict[str, str]] = None,
+        log_dir: Optional[str] = None,
+        ready_timeout: float = 600,
+    ):
+        """
+        random_weights: None picks random weights only when checkpoints are missing
+        model_env: extra model_service settings, e.g. {"INFERENCE_WORKERS": "4"}
+        """
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.upload_latency_ms = upload_latency_ms
+        self.random_weights = (
+            not model_weights_present() if random_weights is None else random_weights
+        )
+        self.app_workers = app_workers
+        self.model_env = model_env or {}
+        self.log_dir = log_dir
+        self.ready_timeout = ready_timeout
+        self.processes: List[Process] = []
+        self._scratch: Optional[str] = None
+
+    def __enter__(self) -> "Stack":
+        try:
+            self.start()
+        except BaseException:
+            self.stop()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _start(self, name: str, args: List[str], cwd: str, env: dict) -> Process:
+        process = Process(name, args, cwd, env, self.log_dir)
+        self.processes.append(process)
+        return process
+
+    def _base_env(self, name: str) -> dict:
+        env = dict(os.environ)
+        env.pop("CLOUDINARY_URL", None)  # never reach the real account
+        metrics_dir = os.path.join(self._scratch, f"prometheus_{name}")
+        os.makedirs(metrics_dir, exist_ok=True)
+        env["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [BACKEND_DIR, env.get("PYTHONPATH")])
+        )
+        return env
+
+    def start(self):
+        self._scratch = tempfile.mkdtemp(prefix="loadtest-")
+        self.log_dir = self.log_dir or os.path.join(self._scratch, "logs")
+        os.makedirs(self.log_dir, exist_ok=True)
+        python = sys.executable
+
+        if self.mongo_uri is None:
+            port = free_port()
+            self._start(
+                "mongo_standin",
+                [python, "-m", "loadtest.mongo_standin", "--port", str(port)],
+                BACKEND_DIR,
+                self._base_env("mongo_standin"),
+            ).wait_for_port(port)
+            self.mongo_uri = f"mongodb://127.0.0.1:{port}"
+            print(f"🍃 MongoDB stand-in at {self.mongo_uri}")
+
+        port = free_port()
+        env = self._base_env("cloudinary")
+        env["FAKE_CLOUDINARY_LATENCY_MS"] = str(self.upload_latency_ms)
+        cloudinary = self._start(
+            "fake_cloudinary",
+            [python, "-m", "uvicorn", "loadtest.fake_cloudinary:app"]
+            + ["--port", str(port), "--no-access-log"],
+            BACKEND_DIR,
+            env,
+        )
+        self.cloudinary_url = f"http://127.0.0.1:{port}"
+        cloudinary.wait_for_url(f"{self.cloudinary_url}/stats")
+        print(f"☁️ Fake Cloudinary at {self.cloudinary_url}")
+
+        self._start_model_service()
+        self._start_app_service()
+
+    def _start_model_service(self):
+        port = free_port()
+        env = self._base_env("model_service")
+        env.update(
+            MONGO_URI=self.mongo_uri,
+            MONGO_DB_NAME=self.db_name,
+            NUM_CLASSES=str(num_classes()),
+            PORT=str(port),
+        )
+        env.update(self.model_env)
+
+        cwd = MODEL_SERVICE_DIR
+        if self.random_weights:
+            cwd = os.path.join(self._scratch, "model_service")
+            print("🎲 Checkpoints missing, serving random weights")
+            with open(os.path.join(self.log_dir, "random_weights.log"), "wb") as log:
+                subprocess.run(
+                    [sys.executable, "-m", "loadtest.random_weights", cwd]
+                    + ["--num-classes", env["NUM_CLASSES"]],
+                    cwd=MODEL_SERVICE_DIR,
+                    env=env,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    check=True,
+                )
+
+        model_service = self._start(
+            "model_service",
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--app-dir",
+                MODEL_SERVICE_DIR,
+            ]
+            + ["--port", str(port), "--no-access-log"],
+            cwd,
+            env,
+        )
+        self.model_url = f"http://127.0.0.1:{port}"
+        model_service.wait_for_url(f"{self.model_url}/ready", self.ready_timeout)
+        print(f"🧠 model_service ready at {self.model_url}")
+
+    def _start_app_service(self):
+        port = free_port()
+        env = self._base_env("app_service")
+        env.update(
+            MONGO_URI=self.mongo_uri,
+            MONGO_DB_NAME=self.db_name,
+            PREDICTION_EXPIRY_HOURS="24",
+            RESET_PASSWORD_TOKEN_EXPIRY_MINUTES="10",
+            OTP_TOKEN_EXPIRE_MINUTES="10",
+            ACCESS_SECRET_KEY=secrets.token_hex(32),
+            REFRESH_SECRET_KEY=secrets.token_hex(32),
+            CLOUDINARY_CLOUD_NAME="loadtest",
+            CLOUDINARY_API_KEY="loadtest",
+            CLOUDINARY_API_SECRET="loadtest",
+            CLOUDINARY_UPLOAD_PREFIX=self.cloudinary_url,
+            MAIL_USER="loadtest@example.com",
+            MAIL_PASS="loadtest",
+            BACKEND_DB_URL=f"http://127.0.0.1:{port}",
+            BACKEND_MODEL_URL=self.model_url,
+            FRONTEND_URL="http://127.0.0.1:3000",
+        )
+        app_service = self._start(
+            "app_service",
+            [sys.executable, "-m", "uvicorn", "main:app"]
+            + ["--port", str(port), "--workers", str(self.app_workers)]
+            + ["--no-access-log"],
+            APP_SERVICE_DIR,
+            env,
+        )
+        self.app_url = f"http://127.0.0.1:{port}"
+        app_service.wait_for_url(f"{self.app_url}/health")
+        print(f"🌱 app_service ready at {self.app_url}")
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.stop()
+        self.processes = []
+        if self._scratch and os.path.isdir(self._scratch):
+            # Keep the logs when they were written to the scratch directory
+            for name in os.listdir(self._scratch):
+                path = os.path.join(self._scratch, name)
+                if path != self.log_dir:
+                    shutil.rmtree(path, ignore_errors=True)
+            if not os.listdir(self._scratch):
+                os.rmdir(self._scratch)
+
+    def upload_stats(self) -> dict:
+        return httpx.get(f"{self.cloudinary_url}/stats", timeout=5).json()
+
+
+def seed_users(
+    mongo_uri: str,
+    db_name: str,
+    count: int,
+    password: str = DEFAULT_PASSWORD,
+) -> List[str]:
+    """Users loadtest-user-0..count-1 as signup creates them; existing ones are kept"""
+    from uuid import uuid4
+
+    from passlib.context import CryptContext
+    from pymongo import MongoClient
+
+    # Same scheme as app_service's utils.security_utils
+    password_hash = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(password)
+    emails = [user_email(i) for i in range(count)]
+    client = MongoClient(mongo_uri)
+    try:
+        users = client[db_name]["users"]
+        for i, email in enumerate(emails):
+            users.update_one(
+                {"email": email},
+                {
+                    "$setOnInsert": {
+                        "id": str(uuid4()),
+                        "email": email,
+                        "first_name": "Load",
+                        "last_name": f"Test {i}",
+                        "password_hash": password_hash,
+                        "profile_pic_url": "https://api.dicebear.com/5.x/initials/svg?seed=Load%20Test",
+                    }
+                },
+                upsert=True,
+            )
+    finally:
+        client.close()
+    return emails
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--mongo-uri", help="real MongoDB instead of the stand-in")
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME)
+    parser.add_argument("--upload-latency-ms", type=float, default=0.0)
+    parser.add_argument("--random-weights", action="store_true", default=None)
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--users", type=int, default=10, help="users to seed")
+    parser.add_argument("--log-dir")
+    args = parser.parse_args(argv)
+
+    with Stack(
+        mongo_uri=args.mongo_uri,
+        db_name=args.db_name,
+        upload_latency_ms=args.upload_latency_ms,
+        random_weights=args.random_weights,
+        app_workers=args.app_workers,
+        log_dir=args.log_dir,
+    ) as stack:
+        seed_users(stack.mongo_uri, args.db_name, args.users)
+        print(
+            f"✅ Stack up, {args.users} users ({user_email(0)}, ...) with password "
+            f"'{DEFAULT_PASSWORD}'; logs in {stack.log_dir}. Ctrl+C to stop."
+        )
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import OperationFailure
+
+from loadtest.mongo_standin import MongoStandIn
+
+
+@pytest.fixture(scope="module")
+def mongo_uri():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(MongoStandIn().serve("127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"mongodb://127.0.0.1:{port}"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+@pytest.fixture
+def db(mongo_uri, request):
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    yield client[request.node.name]
+    client.close()
+
+
+def test_history_query_sorts_pages_and_counts(db):
+    now = datetime.now(timezone.utc)
+    db.predictions.insert_many(
+        [
+            {"user_id": f"u{i % 2}", "n": i, "created_at": now + timedelta(seconds=i)}
+            for i in range(10)
+        ]
+    )
+
+    page = db.predictions.find({"user_id": "u1"}).sort("created_at", -1).skip(1)
+    assert [doc["n"] for doc in page.limit(2)] == [7, 5]
+    assert db.predictions.count_documents({"user_id": "u1"}) == 5
+    assert db.predictions.count_documents({"n": {"$gte": 8}}) == 2
+    assert db.predictions.find_one({"n": {"$in": [4, 40]}})["user_id"] == "u0"
+
+
+def test_updates_upserts_and_deletes(db):
+    db.users.insert_one({"id": "a", "email": "a@example.com"})
+
+    updated = db.users.find_one_and_update(
+        {"id": "a"},
+        {"$set": {"first_name": "Ada"}, "$inc": {"token_version": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    assert (updated["first_name"], updated["token_version"]) == ("Ada", 1)
+
+    result = db.models.update_one(
+        {"alias": "resnet50"}, {"$set": {"version": "2"}}, upsert=True
+    )
+    assert db.models.find_one({"_id": result.upserted_id}, {"_id": 0}) == {
+        "alias": "resnet50",
+        "version": "2",
+    }
+
+    assert db.users.delete_one({"id": "a"}).deleted_count == 1
+    assert db.users.find_one({"id": "a"}) is None
+
+
+def test_change_streams_fail_like_a_standalone_server(db):
+    with pytest.raises(OperationFailure) as exc:
+        db.models.watch().close()
+    assert exc.value.code == 40573
+
+
+def test_motor_clients_connect(mongo_uri):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def roundtrip():
+        client = AsyncIOMotorClient(mongo_uri)
+        db = client["motor"]
+        await db.otps.create_index("expires_at", expireAfterSeconds=0)
+        await db.otps.insert_one({"email": "a@example.com", "otp": "123456"})
+        docs = await db.otps.find({"email": "a@example.com"}).to_list(length=None)
+        client.close()
+        return docs
+
+    assert [doc["otp"] for doc in asyncio.run(roundtrip())] == ["123456"]
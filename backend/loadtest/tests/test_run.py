@@ -0,0 +1,75 @@
+import asyncio
+from itertools import count
+
+import httpx
+from fastapi import FastAPI, File, HTTPException, Request, Response, UploadFile
+
+from loadtest.run import run_load
+
+
+def fake_app_service():
+    """app_service's routes and cookie handling, with a flaky dashboard"""
+    app = FastAPI()
+    dashboard_calls = count()
+
+    def require_user(request: Request):
+        if request.cookies.get("access_token") != "token":
+            raise HTTPException(status_code=401)
+
+    @app.post("/auth/login")
+    async def login(response: Response):
+        response.set_cookie("access_token", "token", httponly=True, secure=True)
+        response.set_cookie("refresh_token", "refresh", httponly=True, secure=True)
+        return {"message": "Login successful"}
+
+    @app.post("/prediction/get-user-predictions")
+    async def history(request: Request):
+        require_user(request)
+        return {"predictions": [], "total": 0}
+
+    @app.post("/prediction/{model_name}")
+    async def predict(model_name: str, request: Request, file: UploadFile = File(...)):
+        require_user(request)
+        return {"model_name": model_name, "bytes": len(await file.read())}
+
+    @app.get("/profile/users/get-dashboard-details")
+    async def dashboard(request: Request):
+        require_user(request)
+        if next(dashboard_calls) % 2:
+            raise HTTPException(status_code=500)
+        return {"total_analyses": 0}
+
+    return app
+
+
+def test_sessions_report_every_endpoint_and_error():
+    report = asyncio.run(
+        run_load(
+            "http://app",
+            ["a@example.com", "b@example.com"],
+            image=b"jpeg",
+            duration=0.5,
+            think_time=0,
+            session_iterations=2,
+            transport=httpx.ASGITransport(app=fake_app_service()),
+        )
+    )
+
+    endpoints = report["endpoints"]
+    assert set(endpoints) == {"login", "predict", "history", "dashboard"}
+    # Cookies from login authenticate the journey
+    for name in ("login", "predict", "history"):
+        assert endpoints[name]["errors"] == 0
+        assert set(endpoints[name]["outcomes"]) == {"200"}
+    # Every other dashboard call fails
+    dashboard = endpoints["dashboard"]
+    assert dashboard["outcomes"]["500"] == dashboard["errors"] > 0
+    assert 0.4 < dashboard["error_rate"] <= 0.5
+    # Logins happen once per session_iterations journeys
+    assert endpoints["login"]["requests"] <= endpoints["predict"]["requests"] / 2 + 2
+
+    total = report["total"]
+    assert total["requests"] == sum(e["requests"] for e in endpoints.values())
+    assert total["errors"] == dashboard["errors"]
+    assert total["p50_ms"] <= total["p95_ms"] <= total["p99_ms"] <= total["max_ms"]
+    assert total["throughput_rps"] > 0
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -8,6 +9,118 @@ class Settings(BaseSettings):
     NUM_CLASSES: int
     PORT: int
 
+    # Runtime for the base CNNs: "pytorch" (eager) or "onnx" (ONNX Runtime exports)
+    MODEL_BACKEND: str = "pytorch"
+    # Also serve "<name>_int8" quantized variants found in saved_models/int8
+    INT8_MODELS_ENABLED: bool = True
+
+    # Load-time graph optimizations per PyTorch model, e.g.
+    # "*=fuse,channels_last,freeze;efficientnet_b4=fuse,bf16" (see manager.optimizer)
+    MODEL_OPTIMIZATIONS: str = ""
+    MODEL_OPTIMIZATION_TOLERANCE: float = 1e-3
+    MODEL_OPTIMIZATION_BF16_TOLERANCE: float = 2e-2
+
+    # Load weights on first use (or when warmed) instead of at import,
+    # memory-mapping checkpoints so pages are shared and read on demand
+    MODEL_LAZY_LOADING: bool = True
+    MODEL_MMAP: bool = True
+    PRELOAD_MODELS: str = ""  # comma-separated names to warm at startup, or "all"
+
+    # Synthetic batches run through every model (WARMUP_MODELS: comma-separated or
+    # "all"; loads lazily registered models) before GET /ready reports ready
+    WARMUP_ENABLED: bool = True
+    WARMUP_BATCH_SIZES: str = "1,4,16"
+    WARMUP_MODELS: str = "all"
+
+    # Cache of per-image outputs keyed by upload digest + model name + version
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MAX_MB: float = 64.0
+    PREDICTION_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Micro-batching of concurrent /predict requests
+    BATCHING_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 16
+    BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Decode JPEG uploads at a reduced DCT scale, just above the preprocessing size
+    REDUCED_JPEG_DECODE: bool = True
+
+    # Upper bound on images in one /predict-batch request
+    BATCH_PREDICT_MAX_FILES: int = 64
+
+    # In-process cache of the model catalog (GET /model/models*). Entries also drop
+    # on change-stream events when MongoDB runs as a replica set.
+    MODEL_CATALOG_TTL_SECONDS: float = 300.0
+    # Cache-Control max-age for catalog responses; 0 makes clients revalidate
+    # (If-None-Match -> 304) on every read
+    MODEL_CATALOG_MAX_AGE: int = 0
+
+    # Hot-swap of model weights. POST /model/models/{name}/swap is enabled when a
+    # token is set (sent as X-Admin-Token); MODEL_WATCH_INTERVAL > 0 also polls the
+    # checkpoint files and swaps a model when its file is replaced.
+    MODEL_ADMIN_TOKEN: str = ""
+    MODEL_WATCH_INTERVAL: float = 0.0
+
+    # Serve the ensemble's meta-model from saved_models/stacking_head.npz
+    # (tools.export_stacking_head) instead of the scikit-learn pickle, when present
+    STACKING_HEAD_ENABLED: bool = True
+
+    # Run the ensemble's base models concurrently instead of one after another
+    ENSEMBLE_PARALLEL: bool = True
+
+    # "cascade" model: cheapest stage first, escalating while confidence/margin are low.
+    # saved_models/cascade_thresholds.json (tools.cascade_thresholds) overrides the
+    # default thresholds per stage.
+    CASCADE_ENABLED: bool = True
+    CASCADE_STAGES: str = "mobilenet_v3_large,efficientnet_b4,ensemble"
+    CASCADE_CONFIDENCE: float = 0.9
+    CASCADE_MARGIN: float = 0.5
+
+    # Bounded executor that keeps inference off the event loop
+    INFERENCE_WORKERS: int = 1
+    INFERENCE_MAX_QUEUE: int = 64
+    TORCH_INTRA_OP_THREADS: int = 0  # 0 = sized by CPU_TOPOLOGY
+    TORCH_INTER_OP_THREADS: int = 0  # 0 = sized by CPU_TOPOLOGY
+
+    # "auto": split the usable CPUs (affinity mask, capped by the cgroup CPU quota)
+    # between the inference processes and their INFERENCE_WORKERS threads;
+    # "off": keep torch's defaults. CPU_AFFINITY also pins each process to its own
+    # slice of CPUs. See manager.cpu_topology.
+    CPU_TOPOLOGY: str = "auto"
+    CPU_AFFINITY: bool = False
+
+    # "local": every worker loads its own models
+    # "host": models live in one inference-host process shared by all workers.
+    # gunicorn.conf.py fills in the socket address (in a private directory) and a
+    # random authkey on every launch; set them only to run the host standalone.
+    INFERENCE_MODE: str = "local"
+    INFERENCE_HOST_ADDRESS: str = ""
+    INFERENCE_HOST_AUTHKEY: str = ""
+    INFERENCE_HOST_REPLICAS: int = 1
+    INFERENCE_HOST_CONNECT_TIMEOUT: float = 30.0
+    INFERENCE_HOST_REQUEST_TIMEOUT: float = 120.0
+    INFERENCE_HOST_IDLE_TIMEOUT: float = 300.0
+
+    @property
+    def preload_models(self) -> Optional[List[str]]:
+        """PRELOAD_MODELS as a list; None means every registered model"""
+        if self.PRELOAD_MODELS.strip().lower() == "all":
+            return None
+        return [name.strip() for name in self.PRELOAD_MODELS.split(",") if name.strip()]
+
+    @property
+    def warmup_batch_sizes(self) -> List[int]:
+        return [
+            int(size) for size in self.WARMUP_BATCH_SIZES.split(",") if size.strip()
+        ]
+
+    @property
+    def warmup_models(self) -> Optional[List[str]]:
+        """WARMUP_MODELS as a list; None means every registered model"""
+        if self.WARMUP_MODELS.strip().lower() == "all":
+            return None
+        return [name.strip() for name in self.WARMUP_MODELS.split(",") if name.strip()]
+
     class Config:
         env_file = ".env"
 
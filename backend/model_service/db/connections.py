@@ -6,6 +6,20 @@ db = None
 models_collection = None
 
 
+# Fields the model catalog filters on
+MODEL_INDEX_FIELDS = ("alias", "model_id", "status", "type")
+
+
+async def ensure_indexes():
+    """Create the catalog's lookup indexes; a no-op when they already exist"""
+    try:
+        for field in MODEL_INDEX_FIELDS:
+            await models_collection.create_index(field)
+    except Exception as e:
+        # Missing indexes only slow down catalog cache misses
+        print(f"⚠️ Could not create model indexes: {e}")
+
+
 async def init_db(retries=5, delay=2):
     global db, models_collection
     for attempt in range(retries):
@@ -15,6 +29,7 @@ async def init_db(retries=5, delay=2):
             db = client[settings.MONGO_DB_NAME]
 
             models_collection = db["models"]
+            await ensure_indexes()
 
             return
 
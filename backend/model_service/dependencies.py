@@ -1,8 +1,58 @@
 # dependencies.py
-from manager.initializer import setup_models
+import hmac
+import time
+from typing import Optional
+from fastapi import Header, HTTPException
+from manager.initializer import setup_models, load_idx2label
+from manager.inference_host import RemoteModelManager
+from manager.batcher import BatchScheduler
+from manager.executor import InferenceExecutor
+from manager.cpu_topology import apply_plan, plan_from_settings
+from config.config import settings
+
+# Thread pools must be sized before torch does any work
+cpu_plan = plan_from_settings(settings)
+apply_plan(cpu_plan)
+print(f"🧵 CPU topology: {cpu_plan.summary()}")
 
 # Initialize once at import
-manager, IDX2LABEL = setup_models(idx2label_path="saved_models/utils/idx2label.json")
+startup_begin = time.perf_counter()
+if settings.INFERENCE_MODE == "host":
+    # Weights live in the shared inference host (see gunicorn.conf.py)
+    manager = RemoteModelManager(
+        settings.INFERENCE_HOST_ADDRESS,
+        settings.INFERENCE_HOST_AUTHKEY,
+        connect_timeout=settings.INFERENCE_HOST_CONNECT_TIMEOUT,
+        request_timeout=settings.INFERENCE_HOST_REQUEST_TIMEOUT,
+    )
+    IDX2LABEL = load_idx2label(idx2label_path="saved_models/utils/idx2label.json")
+else:
+    manager, IDX2LABEL = setup_models(
+        idx2label_path="saved_models/utils/idx2label.json"
+    )
+    # Every gunicorn worker serves its own copy; a swap request reaches only one
+    manager.allow_swap = cpu_plan.processes <= 1
+    if settings.PRELOAD_MODELS:
+        manager.warm(settings.preload_models)
+    for model_name, seconds in manager.load_times().items():
+        print(f"   {model_name}: {seconds:.2f}s")
+print(f"⏱️ Model setup finished in {time.perf_counter() - startup_begin:.2f}s")
+
+executor = InferenceExecutor(
+    max_workers=settings.INFERENCE_WORKERS,
+    max_queue=settings.INFERENCE_MAX_QUEUE,
+)
+
+scheduler = (
+    BatchScheduler(
+        manager,
+        max_batch_size=settings.BATCH_MAX_SIZE,
+        max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+        executor=executor,
+    )
+    if settings.BATCHING_ENABLED
+    else None
+)
 
 
 def get_manager():
@@ -11,3 +61,25 @@ def get_manager():
 
 def get_idx2label():
     return IDX2LABEL
+
+
+def get_executor():
+    return executor
+
+
+def get_scheduler():
+    return scheduler
+
+
+def get_cpu_plan():
+    return cpu_plan
+
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Guard for admin endpoints; they are disabled until MODEL_ADMIN_TOKEN is set"""
+    if not settings.MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(
+        x_admin_token, settings.MODEL_ADMIN_TOKEN
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -0,0 +1,66 @@
+# gunicorn.conf.py
+import multiprocessing
+import os
+import secrets
+import shutil
+from config.config import settings
+from manager.cpu_topology import (
+    PROCESSES_ENV,
+    WORKER_SLOT_ENV,
+    export_thread_env,
+    plan_from_settings,
+)
+
+inference_host = None
+socket_dir = None
+
+
+def on_starting(server):
+    """In inference-host mode, load the models once before any worker is forked."""
+    global inference_host, socket_dir
+    if settings.INFERENCE_MODE != "host":
+        return
+
+    from manager.inference_host import private_socket_address, run_inference_host
+
+    # A fresh secret and private socket directory per launch; the workers forked
+    # later inherit both through the environment and the settings object
+    address = private_socket_address(settings.INFERENCE_HOST_ADDRESS)
+    if not settings.INFERENCE_HOST_ADDRESS:
+        socket_dir = os.path.dirname(address)
+    authkey = secrets.token_hex(32)
+    settings.INFERENCE_HOST_ADDRESS = os.environ["INFERENCE_HOST_ADDRESS"] = address
+    settings.INFERENCE_HOST_AUTHKEY = os.environ["INFERENCE_HOST_AUTHKEY"] = authkey
+
+    ctx = multiprocessing.get_context("spawn")
+    inference_host = ctx.Process(
+        target=run_inference_host,
+        args=(address, authkey),
+        kwargs={"replicas": settings.INFERENCE_HOST_REPLICAS},
+        name="inference-host",
+    )
+    inference_host.start()
+
+
+def on_exit(server):
+    if inference_host is not None and inference_host.is_alive():
+        inference_host.terminate()
+        inference_host.join(timeout=10)
+    if socket_dir is not None:
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def pre_fork(server, worker):
+    """Give each worker the lowest free slot, so a restarted worker reuses its CPUs."""
+    used = {getattr(w, "cpu_slot", None) for w in server.WORKERS.values()}
+    worker.cpu_slot = next(i for i in range(len(used) + 1) if i not in used)
+
+
+def post_fork(server, worker):
+    """
+    Tell the worker its slot and how many workers share the CPUs, and size the
+    OpenMP / BLAS pools before the app imports numpy and torch.
+    """
+    os.environ[WORKER_SLOT_ENV] = str(worker.cpu_slot)
+    os.environ[PROCESSES_ENV] = str(server.cfg.workers)
+    export_thread_env(plan_from_settings(settings))
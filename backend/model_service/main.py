@@ -2,11 +2,18 @@ from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from routes.prediction_route import router as model_router
-from dependencies import get_manager
+from dependencies import get_manager, get_scheduler, get_executor, get_cpu_plan
 import db.connections as db_conn
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from prometheus_metrics import prometheus_middleware
+from services.model_catalog import get_catalog
+from services.model_rollout import watch_checkpoints
+from services.warmup import run_startup_warmup, warmup_state
+from manager.cpu_topology import effective_threads
+from manager import ModelManager
+from config.config import settings
+import asyncio
 
 
 # ------------------------
@@ -18,11 +25,51 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting up...")
     await db_conn.init_db()
     print("✅ Database initialized successfully")
+    background = [asyncio.create_task(get_catalog().watch(db_conn.models_collection))]
+    manager = get_manager()
+    cpu_plan = get_cpu_plan()
+    if settings.MODEL_WATCH_INTERVAL > 0:
+        if isinstance(manager, ModelManager):
+            background.append(
+                asyncio.create_task(
+                    watch_checkpoints(
+                        manager,
+                        settings.MODEL_WATCH_INTERVAL,
+                        workers=cpu_plan.processes,
+                        slot=cpu_plan.slot,
+                    )
+                )
+            )
+        else:
+            print(
+                "⚠️ Checkpoint watching needs INFERENCE_MODE=local; use the swap endpoint"
+            )
+
+    # Warm up in the background: /health answers meanwhile, /ready once done
+    if settings.WARMUP_ENABLED:
+        background.append(
+            asyncio.create_task(
+                run_startup_warmup(
+                    manager,
+                    get_executor(),
+                    batch_sizes=settings.warmup_batch_sizes,
+                    model_names=settings.warmup_models,
+                )
+            )
+        )
+    else:
+        warmup_state.mark_ready()
 
     yield
 
     # Shutdown: Cleanup if needed
     print("🔴 Shutting down...")
+    for task in background:
+        task.cancel()
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        await scheduler.close()
+    get_executor().shutdown()
 
 
 # ------------------------
@@ -74,6 +121,27 @@ async def health():
     return {"status": "ok", "database": db_status}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the database is connected and warmup has finished"""
+    db_status = "connected" if db_conn.models_collection is not None else "disconnected"
+    is_ready = warmup_state.ready and db_conn.models_collection is not None
+    return JSONResponse(
+        {
+            "status": "ready" if is_ready else "not_ready",
+            "database": db_status,
+            "warmup": warmup_state.summary(),
+        },
+        status_code=200 if is_ready else 503,
+    )
+
+
+@app.get("/topology")
+async def topology():
+    """CPU topology plan of this worker and the thread settings actually in effect"""
+    return {"plan": get_cpu_plan().as_dict(), "effective": effective_threads()}
+
+
 @app.get("/")
 async def root(manager=Depends(get_manager)):
     """
@@ -1,4 +1,23 @@
-from manager.plant_model import PlantModel
-from manager.manager import ModelManager
+"""
+The model classes are imported on first access, so light modules of this package
+(cpu_topology, inference_host, checkpoint_watcher) can be used without importing
+torch and numpy, e.g. by gunicorn's master before it forks the workers.
+"""
 
-__all__ = ["ModelManager", "PlantModel"]
+import importlib
+
+_EXPORTS = {
+    "ModelManager": "manager.manager",
+    "PlantModel": "manager.plant_model",
+    "CascadeModel": "manager.cascade",
+}
+
+__all__ = ["ModelManager", "PlantModel", "CascadeModel"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
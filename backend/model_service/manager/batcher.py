@@ -0,0 +1,151 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from prometheus_metrics import BATCH_QUEUE_WAIT, BATCH_SIZE
+from manager.manager import slice_output
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests for a single model and runs them as one
+    stacked forward pass.
+
+    A batch is dispatched as soon as `max_batch_size` requests are waiting, or
+    `max_wait_ms` after the first request of the batch arrived, whichever comes first.
+    Each caller gets back its own row of the batch output, in the same shape
+    `ModelManager.predict` returns for a single image.
+    """
+
+    def __init__(
+        self,
+        manager: Any,
+        model_name: str,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Any] = None,
+    ):
+        self.manager = manager
+        self.model_name = model_name
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # (Re)bind to the running loop, e.g. a fresh worker process or test loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, image: Any) -> Any:
+        """Queue one image and wait for its slice of the batch output."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((image, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                # Still take whatever is already queued without waiting
+                if self._queue.empty():
+                    break
+                batch.append(self._queue.get_nowait())
+                continue
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+
+            # Drop requests whose caller already went away
+            batch = [item for item in batch if not item[1].cancelled()]
+            if not batch:
+                continue
+
+            dispatched_at = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                BATCH_QUEUE_WAIT.labels(model_name=self.model_name).observe(
+                    dispatched_at - enqueued_at
+                )
+            BATCH_SIZE.labels(model_name=self.model_name).observe(len(batch))
+
+            images = [image for image, _, _ in batch]
+            try:
+                if self.executor is not None:
+                    output = await self.executor.run(
+                        self.manager.predict_batch, self.model_name, images
+                    )
+                else:
+                    output = self.manager.predict_batch(self.model_name, images)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for i, (_, future, _) in enumerate(batch):
+                if not future.done():
+                    future.set_result(slice_output(output, i))
+
+    async def close(self):
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+
+class BatchScheduler:
+    """Keeps one `MicroBatcher` per model name, created on first use."""
+
+    def __init__(
+        self,
+        manager: Any,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Any] = None,
+    ):
+        self.manager = manager
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.executor = executor
+        self.batchers: Dict[str, MicroBatcher] = {}
+
+    def get_batcher(self, model_name: str) -> MicroBatcher:
+        if model_name not in self.batchers:
+            # Only registered models get a queue, so bad names can't pile up batchers
+            if model_name not in self.manager.models:
+                raise ValueError(f"Model {model_name} not found")
+            self.batchers[model_name] = MicroBatcher(
+                self.manager,
+                model_name,
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_wait_ms,
+                executor=self.executor,
+            )
+        return self.batchers[model_name]
+
+    async def submit(self, model_name: str, image: Any) -> Any:
+        return await self.get_batcher(model_name).submit(image)
+
+    async def close(self):
+        for batcher in self.batchers.values():
+            await batcher.close()
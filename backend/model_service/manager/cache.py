@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+from prometheus_metrics import (
+    PREDICTION_CACHE_EVICTIONS,
+    PREDICTION_CACHE_HITS,
+    PREDICTION_CACHE_MISSES,
+)
+
+# Key under which the upload's digest travels in PIL's `Image.info`, so it follows
+# the image through the batcher, the executor and the inference-host socket
+CONTENT_HASH_KEY = "content_hash"
+
+
+def content_hash(data: bytes) -> str:
+    """Digest of the raw uploaded bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def image_content_hash(image: Any) -> Optional[str]:
+    info = getattr(image, "info", None)
+    return info.get(CONTENT_HASH_KEY) if info else None
+
+
+def _detach(value: Any) -> Any:
+    """
+    Own copies of any array views in `value`. A row sliced out of a batch output
+    would otherwise keep the whole batch alive while only the row is counted.
+    """
+    if isinstance(value, tuple):
+        return tuple(_detach(v) for v in value)
+    if isinstance(value, np.ndarray) and value.base is not None:
+        return value.copy()
+    return value
+
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    return value.nbytes if isinstance(value, np.ndarray) else 64
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of per-image model outputs, keyed by
+    (content hash, model name, model version).
+
+    Memory is bounded by the total size of the cached arrays (`max_bytes`), and
+    entries older than `ttl_seconds` are treated as misses.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, ttl_seconds: float = 3600.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str, str], tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, digest: str, model_name: str, version: str) -> Optional[Any]:
+        key = (digest, model_name, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                self._drop(key)
+                entry = None
+
+            if entry is None:
+                PREDICTION_CACHE_MISSES.labels(model_name=model_name).inc()
+                return None
+
+            self._entries.move_to_end(key)
+            PREDICTION_CACHE_HITS.labels(model_name=model_name).inc()
+            return entry[0]
+
+    def put(self, digest: str, model_name: str, version: str, value: Any):
+        key = (digest, model_name, version)
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        value = _detach(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic(), size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                PREDICTION_CACHE_EVICTIONS.labels(model_name=oldest[1]).inc()
+
+    def invalidate(self, model_name: str):
+        """Drop every entry produced by `model_name` (any version)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == model_name]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: tuple):
+        # Caller holds the lock
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
@@ -0,0 +1,166 @@
+"""
+Confidence-gated cascade.
+
+`CascadeModel` is a virtual model: it owns no weights and answers each image with the
+cheapest stage that is confident enough. Every image starts on the first stage (e.g.
+mobilenet_v3_large); images whose top-1 probability or top-1/top-2 margin fall below
+that stage's thresholds move on to the next one, ending at the stacking ensemble,
+which always answers. Base-model outputs computed by earlier stages are handed to the
+ensemble instead of being recomputed.
+
+Thresholds come from saved_models/cascade_thresholds.json when it exists (written by
+`python -m tools.cascade_thresholds`), else from CASCADE_CONFIDENCE / CASCADE_MARGIN.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from manager.cache import content_hash
+from prometheus_metrics import CASCADE_EXITS
+
+
+def confidence_and_margin(probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-1 probability and top-1 minus top-2 probability for each row"""
+    top2 = np.partition(probs, -2, axis=1)[:, -2:]
+    return top2[:, 1], top2[:, 1] - top2[:, 0]
+
+
+def accepts(probs: np.ndarray, confidence: float, margin: float) -> np.ndarray:
+    """Boolean mask of rows a stage may answer on its own"""
+    top1, top1_margin = confidence_and_margin(probs)
+    return (top1 >= confidence) & (top1_margin >= margin)
+
+
+def load_thresholds(path: str) -> Dict[str, Dict[str, float]]:
+    """Per-stage {"confidence": .., "margin": ..} from a tools.cascade_thresholds file"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)["thresholds"]
+
+
+class CascadeModel:
+    model_type = "cascade"
+
+    def __init__(
+        self,
+        name: str,
+        stages: List[str],
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None,
+        default_confidence: float = 0.9,
+        default_margin: float = 0.0,
+    ):
+        if len(stages) < 2:
+            raise ValueError("A cascade needs at least two stages.")
+
+        self.name = name
+        self.stages = list(stages)
+        # Every stage but the last can answer early
+        self.thresholds = {
+            stage: {
+                "confidence": float(
+                    (thresholds or {})
+                    .get(stage, {})
+                    .get("confidence", default_confidence)
+                ),
+                "margin": float(
+                    (thresholds or {}).get(stage, {}).get("margin", default_margin)
+                ),
+            }
+            for stage in self.stages[:-1]
+        }
+        # Cached cascade answers depend on the thresholds, so they key the version
+        self.version = content_hash(
+            json.dumps([self.stages, self.thresholds], sort_keys=True).encode()
+        )[:8]
+        self.load_time = None
+
+    # Dependencies on other models, used by ModelManager for warming / invalidation
+    @property
+    def model_order(self) -> List[str]:
+        return self.stages
+
+    # No weights of its own; the stages load themselves
+    @property
+    def is_loaded(self) -> bool:
+        return True
+
+    def ensure_loaded(self) -> "CascadeModel":
+        return self
+
+    def unload(self):
+        pass
+
+    @staticmethod
+    def _is_stacking(model: Any) -> bool:
+        return model.model_type == "sklearn" and bool(
+            getattr(model, "model_order", None)
+        )
+
+    def predict_batch(self, images: List[Any], manager: Optional[Any] = None) -> Any:
+        """
+        Returns (predictions, probs) with one row per image, like the stacking ensemble;
+        probs are those of whichever stage answered the image.
+        """
+        if manager is None:
+            raise ValueError("ModelManager is required to run a cascade.")
+        if not images:
+            raise ValueError("predict_batch() requires at least one image.")
+        for stage in self.stages:
+            if stage not in manager.models:
+                raise ValueError(f"Cascade stage '{stage}' not found in manager.")
+
+        remaining = np.arange(len(images))
+        predictions = np.zeros(len(images), dtype=np.int64)
+        probs = None
+        known: Dict[str, np.ndarray] = {}  # base-model probs for every image so far
+
+        for k, stage in enumerate(self.stages):
+            model = manager.models[stage]
+            subset = [images[i] for i in remaining]
+
+            if self._is_stacking(model):
+                base = model.base_model_probs(
+                    subset,
+                    manager,
+                    precomputed={n: p[remaining] for n, p in known.items()},
+                )
+                stage_pred, stage_probs = model.predict_stacked(
+                    model.stack_base_probs(base)
+                )
+                if stage_probs is None:
+                    # Meta-model without predict_proba: answer with a one-hot row
+                    num_classes = next(iter(base.values())).shape[1]
+                    stage_probs = np.eye(num_classes)[stage_pred]
+            else:
+                stage_probs = manager.predict_batch(stage, subset)
+                stage_pred = stage_probs.argmax(axis=1)
+                base = {stage: stage_probs}
+
+            for name, p in base.items():
+                if name not in known:
+                    known[name] = np.zeros((len(images), p.shape[1]), dtype=p.dtype)
+                known[name][remaining] = p
+            if probs is None:
+                probs = np.zeros((len(images), stage_probs.shape[1]), dtype=np.float64)
+
+            if k == len(self.stages) - 1:
+                done = np.ones(len(remaining), dtype=bool)
+            else:
+                done = accepts(stage_probs, **self.thresholds[stage])
+
+            predictions[remaining[done]] = stage_pred[done]
+            probs[remaining[done]] = stage_probs[done]
+            CASCADE_EXITS.labels(model_name=self.name, stage=stage).inc(int(done.sum()))
+
+            remaining = remaining[~done]
+            if not remaining.size:
+                break
+
+        return predictions, probs
+
+    def predict(self, input_data: Any, manager: Optional[Any] = None) -> Any:
+        return self.predict_batch([input_data], manager=manager)
@@ -0,0 +1,67 @@
+"""
+Detect replaced checkpoint files so their models can be hot-swapped.
+
+Roll out new weights by writing them next to the old file and renaming them over it
+(`mv resnet50.new.pth resnet50_final_finetuned.pth`). A rename leaves the old file's
+memory-mapped pages intact for requests still running on it; overwriting the file in
+place would change them underneath those requests.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+Signature = Tuple[int, int, int]
+
+
+def file_signature(path: str) -> Optional[Signature]:
+    """(inode, size, mtime) of `path`, or None when it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class CheckpointWatcher:
+    """
+    Polls the weights file of every registered model. A model is reported as changed
+    once its file differs from the one loaded and has stayed the same for one more
+    poll, so files still being written are not picked up.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._loaded: Dict[str, Signature] = {}
+        self._pending: Dict[str, Signature] = {}
+        for name, path in self._paths().items():
+            signature = file_signature(path)
+            if signature is not None:
+                self._loaded[name] = signature
+
+    def _paths(self) -> Dict[str, str]:
+        return {
+            name: model.model_path
+            for name, model in self.manager.models.items()
+            if getattr(model, "model_path", None)
+        }
+
+    def poll(self) -> List[str]:
+        """Names of models whose checkpoint was replaced and is ready to load"""
+        changed = []
+        for name, path in self._paths().items():
+            signature = file_signature(path)
+            if signature is None or signature == self._loaded.get(name):
+                self._pending.pop(name, None)
+                continue
+            if self._pending.get(name) == signature:
+                changed.append(name)
+            else:
+                self._pending[name] = signature
+        return changed
+
+    def mark_loaded(self, name: str):
+        """Record the current file of `name` as the one being served"""
+        self._pending.pop(name, None)
+        signature = file_signature(self._paths()[name])
+        if signature is not None:
+            self._loaded[name] = signature
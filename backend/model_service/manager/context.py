@@ -0,0 +1,34 @@
+from typing import Any, Dict, List, Optional
+
+from .cache import PredictionCache
+
+
+class PredictionContext:
+    """
+    Per-call state of one ModelManager prediction.
+
+    Models keep only configuration and weights; everything a call reads or produces
+    lives here or in local variables, so any number of threads can predict through
+    the same models at once. The context also pins the set of models the call
+    started with: an ensemble or cascade resolves every stage from this snapshot,
+    so a hot-swap in the middle of a request cannot mix two versions of a model
+    into one answer.
+
+    Ensembles and cascades receive the context where they used to receive the
+    manager; it offers the same `models`, `cache` and `predict_batch`.
+    """
+
+    def __init__(self, manager: Any, models: Optional[Dict[str, Any]] = None):
+        self._manager = manager
+        # A shallow copy: swapping a model replaces the manager's entry, not this one
+        self.models: Dict[str, Any] = dict(manager.models if models is None else models)
+        self.cache: Optional[PredictionCache] = manager.cache
+
+    def get_model(self, model_name: str) -> Any:
+        if model_name not in self.models:
+            raise ValueError(f"Model {model_name} not found")
+        return self.models[model_name]
+
+    def predict_batch(self, model_name: str, images: List[Any]) -> Any:
+        """Like ModelManager.predict_batch, with the model taken from the snapshot"""
+        return self._manager._predict_batch(self, model_name, images)
@@ -0,0 +1,234 @@
+"""
+Size inference thread pools to the CPUs a process may actually use.
+
+Torch defaults to one intra-op thread per host core in every process, so four
+gunicorn workers on an 8-core node (or in a 4-CPU container) run 32 threads that
+fight over the cores. `plan_threads` splits the usable CPUs (the affinity mask,
+capped by a cgroup CPU quota) between the processes that run inference, and then
+between the concurrent inference calls inside each process:
+
+    intra-op threads = usable CPUs // processes // INFERENCE_WORKERS
+
+Processes are the gunicorn workers in local mode, or the inference-host replicas in
+host mode (the HTTP workers then need a single thread). With CPU_AFFINITY each
+process is also pinned to its own slice of the CPUs.
+
+This module avoids importing torch so gunicorn's master can use it before forking.
+"""
+
+import math
+import os
+from typing import Dict, List, Optional
+
+# Thread-count variables read by OpenMP / BLAS runtimes when they start
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# Set by gunicorn.conf.py in each worker: its slot (0..workers-1) and the worker count
+WORKER_SLOT_ENV = "MODEL_SERVICE_WORKER_SLOT"
+PROCESSES_ENV = "MODEL_SERVICE_PROCESSES"
+
+
+def allowed_cpus() -> List[int]:
+    """CPUs this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cgroup_cpu_limit(root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """CPUs granted by a cgroup CFS quota (v2 or v1), or None when unlimited"""
+    try:  # cgroup v2: "<quota> <period>" or "max <period>"
+        with open(os.path.join(root, "cpu.max")) as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    for subdir in ("cpu", "cpu,cpuacct"):  # cgroup v1
+        try:
+            with open(os.path.join(root, subdir, "cpu.cfs_quota_us")) as f:
+                quota = int(f.read())
+            with open(os.path.join(root, subdir, "cpu.cfs_period_us")) as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            continue
+        return None if quota <= 0 else quota / period
+    return None
+
+
+class CpuPlan:
+    """Thread counts (and optionally CPUs) for one inference process"""
+
+    def __init__(
+        self,
+        cpus: List[int],
+        quota: Optional[float],
+        processes: int,
+        slot: int,
+        inference_workers: int,
+        intra_op_threads: int,
+        inter_op_threads: int,
+        affinity: Optional[List[int]],
+        mode: str,
+    ):
+        self.cpus = cpus
+        self.quota = quota
+        self.processes = processes
+        self.slot = slot
+        self.inference_workers = inference_workers
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.affinity = affinity
+        self.mode = mode
+
+    @property
+    def usable_cpus(self) -> int:
+        # A fractional quota is rounded down: the last partial CPU would throttle
+        limit = len(self.cpus)
+        if self.quota is not None:
+            limit = min(limit, max(1, math.floor(self.quota)))
+        return limit
+
+    def as_dict(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "allowed_cpus": len(self.cpus),
+            "cgroup_cpu_quota": self.quota,
+            "usable_cpus": self.usable_cpus,
+            "processes": self.processes,
+            "slot": self.slot,
+            "inference_workers": self.inference_workers,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "affinity": self.affinity,
+        }
+
+    def summary(self) -> str:
+        pinned = f", pinned to CPUs {self.affinity}" if self.affinity else ""
+        quota = f" (cgroup quota {self.quota:g})" if self.quota is not None else ""
+        return (
+            f"{self.usable_cpus} usable CPUs{quota} / {self.processes} process(es) / "
+            f"{self.inference_workers} inference worker(s) -> "
+            f"{self.intra_op_threads} intra-op, {self.inter_op_threads} inter-op "
+            f"threads{pinned}"
+        )
+
+
+def plan_threads(
+    processes: int = 1,
+    slot: int = 0,
+    inference_workers: int = 1,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    affinity: bool = False,
+    mode: str = "auto",
+    cpus: Optional[List[int]] = None,
+    quota: Optional[float] = None,
+    detect_quota: bool = True,
+) -> CpuPlan:
+    """
+    Thread counts for process `slot` of `processes`. Explicit intra/inter-op
+    counts (> 0) win over the derived ones; mode "off" derives nothing, keeping
+    torch's defaults.
+    """
+    cpus = allowed_cpus() if cpus is None else list(cpus)
+    if quota is None and detect_quota:
+        quota = cgroup_cpu_limit()
+    processes = max(1, processes)
+    slot = slot % processes
+    inference_workers = max(1, inference_workers)
+
+    plan = CpuPlan(cpus, quota, processes, slot, inference_workers, 0, 0, None, mode)
+    if mode == "off":
+        plan.intra_op_threads = intra_op_threads
+        plan.inter_op_threads = inter_op_threads
+        return plan
+
+    per_process = max(1, plan.usable_cpus // processes)
+    plan.intra_op_threads = intra_op_threads or max(1, per_process // inference_workers)
+    # Requests run on the executor's threads; torch needs no inter-op parallelism
+    plan.inter_op_threads = inter_op_threads or 1
+
+    if affinity and len(cpus) >= processes:
+        share = len(cpus) // processes
+        plan.affinity = cpus[slot * share : (slot + 1) * share]
+    return plan
+
+
+def export_thread_env(plan: CpuPlan):
+    """
+    Publish the intra-op count to OpenMP / BLAS runtimes. Only effective before
+    they initialize, i.e. before numpy / torch are imported in this process.
+    """
+    if plan.intra_op_threads > 0:
+        for var in THREAD_ENV_VARS:
+            os.environ[var] = str(plan.intra_op_threads)
+
+
+def apply_plan(plan: CpuPlan):
+    """Pin the process (if planned) and size torch's thread pools"""
+    from manager.executor import configure_torch_threads
+
+    if plan.affinity and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, plan.affinity)
+        except OSError as e:
+            print(f"⚠️ Could not pin to CPUs {plan.affinity}: {e}")
+            plan.affinity = None
+    export_thread_env(plan)
+    configure_torch_threads(
+        intra_op_threads=plan.intra_op_threads,
+        inter_op_threads=plan.inter_op_threads,
+    )
+
+
+def plan_from_settings(
+    settings, role: str = "worker", slot: Optional[int] = None
+) -> CpuPlan:
+    """
+    The plan for this process. `role` is "worker" for a gunicorn / uvicorn worker
+    and "host" for the inference host, whose replicas are `slot` 0..replicas-1.
+    """
+    if (
+        role == "worker"
+        and settings.INFERENCE_MODE == "host"
+        and settings.CPU_TOPOLOGY != "off"
+    ):
+        # Inference happens in the host; HTTP workers only decode and route
+        processes, inference_workers = 1, 1
+        intra, inter = 1, 1
+    else:
+        if role == "host":
+            processes = settings.INFERENCE_HOST_REPLICAS
+        else:
+            processes = int(os.environ.get(PROCESSES_ENV, 1))
+        inference_workers = settings.INFERENCE_WORKERS
+        intra = settings.TORCH_INTRA_OP_THREADS
+        inter = settings.TORCH_INTER_OP_THREADS
+
+    return plan_threads(
+        processes=processes,
+        slot=int(os.environ.get(WORKER_SLOT_ENV, 0)) if slot is None else slot,
+        inference_workers=inference_workers,
+        intra_op_threads=intra,
+        inter_op_threads=inter,
+        affinity=settings.CPU_AFFINITY,
+        mode=settings.CPU_TOPOLOGY,
+    )
+
+
+def effective_threads() -> Dict:
+    """What the process is actually running with"""
+    import torch
+
+    return {
+        "torch_intra_op_threads": torch.get_num_threads(),
+        "torch_inter_op_threads": torch.get_num_interop_threads(),
+        "cpu_affinity": allowed_cpus(),
+        "env": {var: os.environ.get(var) for var in THREAD_ENV_VARS},
+    }
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import torch
+
+from prometheus_metrics import INFERENCE_QUEUE_DEPTH, INFERENCE_QUEUE_WAIT
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the inference executor already holds its maximum backlog."""
+
+
+def configure_torch_threads(intra_op_threads: int = 0, inter_op_threads: int = 0):
+    """
+    Apply torch thread-pool sizes. A value of 0 keeps torch's default.
+    Inter-op threads can only be set before torch starts any parallel work,
+    so call this before the models are loaded.
+    """
+    if intra_op_threads > 0:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads > 0:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            print(f"⚠️ Could not set torch inter-op threads: {e}")
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model calls on a dedicated, bounded thread pool so the asyncio
+    event loop keeps serving other requests (including /health and /metrics).
+
+    At most `max_workers` calls run at once and at most `max_queue` more wait for a
+    free worker; beyond that `run` fails fast with `InferenceQueueFull`.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue: int = 64):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="inference"
+        )
+        # Only touched from the event loop thread, so no lock is needed
+        self._pending = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.max_workers + self.max_queue:
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self.max_queue} requests waiting)"
+            )
+
+        self._pending += 1
+        INFERENCE_QUEUE_DEPTH.inc()
+        enqueued_at = time.perf_counter()
+        # Whoever leaves the queue first (the task, or a cancelled or dropped
+        # call that never started) takes the call off the gauge
+        started = False
+        dequeue_lock = threading.Lock()
+
+        def dequeue() -> bool:
+            nonlocal started
+            with dequeue_lock:
+                first, started = not started, True
+            if first:
+                INFERENCE_QUEUE_DEPTH.dec()
+            return first
+
+        def task():
+            if dequeue():
+                INFERENCE_QUEUE_WAIT.observe(time.perf_counter() - enqueued_at)
+            return fn(*args)
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, task)
+        finally:
+            self._pending -= 1
+            dequeue()
+
+    @property
+    def pending(self) -> int:
+        """Calls currently running or waiting for a worker"""
+        return self._pending
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,385 @@
+"""
+Inference-host mode.
+
+The model weights are loaded once, in a dedicated process, and every gunicorn HTTP
+worker talks to it over a local socket through `RemoteModelManager`, which exposes
+the same `predict` / `predict_batch` / `predict_all` / `swap_model` / `models` /
+`allow_swap` surface as `ModelManager`. Adding HTTP workers therefore doesn't add
+another copy of every weight tensor.
+
+The host can fork several replicas after loading. They share the loaded weights
+copy-on-write and accept connections from the same listening socket, so
+`INFERENCE_HOST_REPLICAS` controls inference concurrency independently of the number
+of HTTP workers.
+
+The socket lives in a directory only this user can enter, and clients must prove they
+know INFERENCE_HOST_AUTHKEY before anything is unpickled; gunicorn.conf.py generates
+a fresh key (and socket directory) on every launch and hands both to the workers
+through the environment. Host mode refuses to start without a key.
+
+Run standalone with `INFERENCE_HOST_AUTHKEY=<secret> python -m manager.inference_host`;
+gunicorn.conf.py starts it automatically when INFERENCE_MODE=host.
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import (
+    Client,
+    Connection,
+    Listener,
+    answer_challenge,
+    deliver_challenge,
+)
+from typing import Any, Dict, List, Optional, Tuple
+
+# Seconds a peer may take to finish the authkey handshake or to send a whole request
+# once it has started; a stalled peer is cut off instead of holding its thread
+RECV_TIMEOUT = 10.0
+
+
+def private_socket_address(address: str = "") -> str:
+    """
+    Where to put the host's socket: `address` if its directory is private to this
+    user (created with mode 0700 when missing), otherwise an error. Without an
+    address, a socket in a fresh private temp directory.
+    """
+    if not address:
+        directory = tempfile.mkdtemp(prefix="model_service_")  # mode 0700
+        return os.path.join(directory, "inference.sock")
+
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(
+            f"Inference host socket directory {directory} must be private "
+            "(owned by this user, mode 0700)"
+        )
+    return address
+
+
+def require_authkey(authkey: str) -> bytes:
+    if not authkey:
+        raise RuntimeError(
+            "INFERENCE_HOST_AUTHKEY is not set; inference-host mode needs a secret key "
+            "(gunicorn.conf.py generates one per launch)"
+        )
+    return authkey.encode()
+
+
+def _dispatch(manager: Any, op: str, args: tuple) -> Any:
+    if op == "predict":
+        return manager.predict(*args)
+    if op == "predict_batch":
+        return manager.predict_batch(*args)
+    if op == "predict_all":
+        return manager.predict_all(*args)
+    if op == "swap_model":
+        return manager.swap_model(*args)
+    if op == "models":
+        return {name: model.model_type for name, model in manager.models.items()}
+    if op == "allow_swap":
+        return manager.allow_swap
+    raise ValueError(f"Unknown inference host operation '{op}'")
+
+
+def _cut_off(conn: Connection):
+    """Shut the socket down so a read blocked on it in another thread returns"""
+    try:
+        with socket.socket(fileno=os.dup(conn.fileno())) as sock:
+            sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _Deadline:
+    """Cut a connection off if the block doesn't finish within `seconds`"""
+
+    def __init__(self, conn: Connection, seconds: float):
+        self.timer = threading.Timer(seconds, _cut_off, args=(conn,))
+        self.timer.daemon = True
+
+    def __enter__(self):
+        self.timer.start()
+
+    def __exit__(self, *exc):
+        self.timer.cancel()
+
+
+def handle_connection(
+    conn: Connection,
+    manager: Any,
+    authkey: bytes,
+    lock: threading.Lock,
+    idle_timeout: float,
+):
+    """Authenticate a client, then answer its requests until it leaves or idles out"""
+    with conn:
+        try:
+            with _Deadline(conn, RECV_TIMEOUT):
+                deliver_challenge(conn, authkey)
+                answer_challenge(conn, authkey)
+        except Exception as e:
+            print(f"⚠️ Inference host rejected a connection: {e}")
+            return
+
+        while True:
+            try:
+                if not conn.poll(idle_timeout):
+                    return  # the client reconnects when it needs to
+                with _Deadline(conn, RECV_TIMEOUT):
+                    op, args = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            # One request at a time per replica, as before connections were kept
+            with lock:
+                try:
+                    reply = ("ok", _dispatch(manager, op, args))
+                except Exception as e:
+                    reply = ("error", type(e).__name__, str(e))
+            try:
+                conn.send(reply)
+            except OSError:
+                return
+
+
+def serve(
+    listener: Listener,
+    manager: Any,
+    authkey: bytes,
+    idle_timeout: float = 300.0,
+):
+    """
+    Accept connections until the listener closes. Each client keeps its connection
+    open and gets its own thread, so a slow or stalled client only holds up itself;
+    the requests still run one at a time.
+    """
+    lock = threading.Lock()
+    while True:
+        try:
+            conn = listener.accept()
+        except OSError as e:
+            print(f"⚠️ Inference host stopped accepting connections: {e}")
+            return
+
+        threading.Thread(
+            target=handle_connection,
+            args=(conn, manager, authkey, lock, idle_timeout),
+            name="inference-host-connection",
+            daemon=True,
+        ).start()
+
+
+def serve_replica(
+    listener: Listener,
+    manager: Any,
+    authkey: bytes,
+    idle_timeout: float,
+    cpus: Optional[List[int]] = None,
+):
+    """`serve` in a forked replica, pinned to `cpus` when given"""
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+        except (AttributeError, OSError) as e:
+            print(f"⚠️ Could not pin inference replica to CPUs {cpus}: {e}")
+    serve(listener, manager, authkey, idle_timeout)
+
+
+def run_inference_host(
+    address: str,
+    authkey: str,
+    replicas: int = 1,
+    idx2label_path: str = "saved_models/utils/idx2label.json",
+):
+    """Load every model once, then serve them from `replicas` processes."""
+    key = require_authkey(authkey)
+    address = private_socket_address(address)
+
+    # Imported here so the HTTP workers never pull in the model setup code
+    from config.config import settings
+    from manager.cpu_topology import apply_plan, plan_from_settings
+    from manager.initializer import setup_models
+
+    # Replicas inherit the thread pools; each is pinned to its own CPUs after forking
+    plans = [plan_from_settings(settings, role="host", slot=i) for i in range(replicas)]
+    apply_plan(plans[0])
+    print(f"🧵 Inference host CPU topology: {plans[0].summary()}")
+
+    start = time.perf_counter()
+    manager, _ = setup_models(idx2label_path=idx2label_path)
+    # Materialize everything before forking so the replicas share the weights
+    manager.warm()
+    print(
+        f"✅ Inference host loaded {len(manager.models)} models "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+    if os.path.exists(address):
+        os.remove(address)  # stale socket from a previous run
+    # Clients are authenticated per connection in serve(), off the accept loop
+    listener = Listener(address)
+    os.chmod(address, 0o600)
+    print(f"🚀 Inference host listening on {address} with {replicas} replica(s)")
+
+    idle_timeout = settings.INFERENCE_HOST_IDLE_TIMEOUT
+    if replicas <= 1:
+        serve(listener, manager, key, idle_timeout)
+        return
+
+    # Each replica would only swap its own copy of the models
+    manager.allow_swap = False
+
+    # Forked replicas share the already loaded weights copy-on-write
+    ctx = multiprocessing.get_context("fork")
+    workers = [
+        ctx.Process(
+            target=serve_replica,
+            args=(listener, manager, key, idle_timeout, plans[i].affinity),
+            name=f"inference-replica-{i}",
+            daemon=True,
+        )
+        for i in range(replicas)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Installed after forking so the replicas keep the default handler
+    def _shutdown(signum, frame):
+        for worker in workers:
+            worker.terminate()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    for worker in workers:
+        worker.join()
+
+
+class RemoteModelManager:
+    """
+    Client-side stand-in for `ModelManager` that forwards calls to the inference host.
+
+    Connections are kept open and pooled, so a request doesn't pay for a new socket
+    and authkey handshake; each thread (inference executor worker) takes one from the
+    pool for the duration of its call.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        authkey: str,
+        connect_timeout: float = 30.0,
+        request_timeout: float = 120.0,
+    ):
+        self.address = address
+        self.authkey = require_authkey(authkey)
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self._models = None
+        self._allow_swap = None
+        self._pool: List[Connection] = []
+        self._pool_lock = threading.Lock()
+
+    def _connect(self) -> Connection:
+        # The host may still be loading weights right after startup
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return Client(self.address, authkey=self.authkey)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(
+                        f"Inference host at {self.address} is not reachable"
+                    )
+                time.sleep(0.5)
+
+    def _acquire(self) -> Tuple[Connection, bool]:
+        """A connection and whether it was reused from the pool"""
+        with self._pool_lock:
+            if self._pool:
+                return self._pool.pop(), True
+        return self._connect(), False
+
+    def _release(self, conn: Connection):
+        with self._pool_lock:
+            self._pool.append(conn)
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+
+    def _request(self, op: str, args: tuple) -> tuple:
+        while True:
+            conn, reused = self._acquire()
+            try:
+                conn.send((op, args))
+                if not conn.poll(self.request_timeout):
+                    conn.close()  # a late reply would be read by the next request
+                    raise RuntimeError(
+                        f"Inference host did not answer within {self.request_timeout:g}s"
+                    )
+                reply = conn.recv()
+            except (EOFError, OSError):
+                conn.close()
+                if reused:
+                    continue  # the host closed this idle connection; use a new one
+                raise RuntimeError("Lost the connection to the inference host")
+            self._release(conn)
+            return reply
+
+    def _call(self, op: str, *args: Any) -> Any:
+        status, *payload = self._request(op, args)
+
+        if status == "ok":
+            return payload[0]
+
+        exc_name, message = payload
+        if exc_name == "ValueError":
+            raise ValueError(message)
+        raise RuntimeError(f"{exc_name}: {message}")
+
+    @property
+    def models(self) -> Dict[str, str]:
+        """Registered model names mapped to their model_type"""
+        if self._models is None:
+            self._models = self._call("models")
+        return self._models
+
+    @property
+    def allow_swap(self) -> bool:
+        """Whether the host can swap models (not once it forked several replicas)"""
+        if self._allow_swap is None:
+            self._allow_swap = self._call("allow_swap")
+        return self._allow_swap
+
+    def predict(self, model_name: str, input_data: Any):
+        return self._call("predict", model_name, input_data)
+
+    def predict_batch(self, model_name: str, images: List[Any]):
+        return self._call("predict_batch", model_name, images)
+
+    def predict_all(self, images: List[Any], model_names: List[str] = None):
+        return self._call("predict_all", images, model_names)
+
+    def swap_model(self, model_name: str, model_path: str = None, version: str = None):
+        return self._call("swap_model", model_name, model_path, version)
+
+
+if __name__ == "__main__":
+    from config.config import settings
+
+    run_inference_host(
+        settings.INFERENCE_HOST_ADDRESS,
+        settings.INFERENCE_HOST_AUTHKEY,
+        replicas=settings.INFERENCE_HOST_REPLICAS,
+    )
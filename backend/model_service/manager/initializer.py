@@ -1,62 +1,111 @@
 import json
+import os
 from manager.plant_model import PlantModel
 from manager.manager import ModelManager
+from manager.cache import PredictionCache
+from manager.cascade import CascadeModel, load_thresholds
+from manager.optimizer import parse_optimizations, optimizations_for
 from config.config import settings
 from saved_models.model_paths.model_paths import (
     RESNET50_PATH,
     DENSENET121_PATH,
     EFFICIENTNET_B4_PATH,
     ENSEMBLE_PATH,
+    STACKING_HEAD_PATH,
     MOBILENET_V3_PATH,
+    RESNET50_ONNX_PATH,
+    DENSENET121_ONNX_PATH,
+    EFFICIENTNET_B4_ONNX_PATH,
+    MOBILENET_V3_ONNX_PATH,
+    RESNET50_INT8_PATH,
+    DENSENET121_INT8_PATH,
+    EFFICIENTNET_B4_INT8_PATH,
+    MOBILENET_V3_INT8_PATH,
+    CASCADE_THRESHOLDS_PATH,
 )
 
+# Base models: name -> (PyTorch checkpoint, ONNX export)
+BASE_MODEL_PATHS = {
+    "resnet50": (RESNET50_PATH, RESNET50_ONNX_PATH),
+    "efficientnet_b4": (EFFICIENTNET_B4_PATH, EFFICIENTNET_B4_ONNX_PATH),
+    "mobilenet_v3_large": (MOBILENET_V3_PATH, MOBILENET_V3_ONNX_PATH),
+    "densenet121": (DENSENET121_PATH, DENSENET121_ONNX_PATH),
+}
+
+# INT8 quantized variants, registered as "<base name>_int8" when present
+INT8_MODEL_PATHS = {
+    "resnet50": RESNET50_INT8_PATH,
+    "efficientnet_b4": EFFICIENTNET_B4_INT8_PATH,
+    "mobilenet_v3_large": MOBILENET_V3_INT8_PATH,
+    "densenet121": DENSENET121_INT8_PATH,
+}
 
-def setup_models(idx2label_path="saved_models/utils/idx2label.json"):
 
+def load_idx2label(idx2label_path="saved_models/utils/idx2label.json"):
     with open(idx2label_path, "r") as f:
-        IDX2LABEL = json.load(f)
+        return json.load(f)
 
-    manager = ModelManager()
 
-    # Register base PyTorch models
-    manager.register_model(
-        PlantModel(
-            name="resnet50",
-            model_path=RESNET50_PATH,
-            model_type="pytorch",
-            num_classes=settings.NUM_CLASSES,
-        )
-    )
-    manager.register_model(
-        PlantModel(
-            name="efficientnet_b4",
-            model_path=EFFICIENTNET_B4_PATH,
-            model_type="pytorch",
-            num_classes=settings.NUM_CLASSES,
-        )
-    )
-    manager.register_model(
-        PlantModel(
-            name="mobilenet_v3_large",
-            model_path=MOBILENET_V3_PATH,
-            model_type="pytorch",
-            num_classes=settings.NUM_CLASSES,
+def setup_models(idx2label_path="saved_models/utils/idx2label.json"):
+
+    IDX2LABEL = load_idx2label(idx2label_path)
+
+    cache = (
+        PredictionCache(
+            max_bytes=int(settings.PREDICTION_CACHE_MAX_MB * 2**20),
+            ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
         )
+        if settings.PREDICTION_CACHE_ENABLED
+        else None
     )
-    manager.register_model(
-        PlantModel(
-            name="densenet121",
-            model_path=DENSENET121_PATH,
-            model_type="pytorch",
-            num_classes=settings.NUM_CLASSES,
+    manager = ModelManager(cache=cache)
+
+    # Register base models, served either by PyTorch or by ONNX Runtime
+    use_onnx = settings.MODEL_BACKEND == "onnx"
+    optimizations = parse_optimizations(settings.MODEL_OPTIMIZATIONS)
+    for name, (pytorch_path, onnx_path) in BASE_MODEL_PATHS.items():
+        model_optimizations = optimizations_for(name, optimizations)
+        manager.register_model(
+            PlantModel(
+                name=name,
+                model_path=onnx_path if use_onnx else pytorch_path,
+                model_type="onnx" if use_onnx else "pytorch",
+                num_classes=settings.NUM_CLASSES,
+                lazy=settings.MODEL_LAZY_LOADING,
+                mmap=settings.MODEL_MMAP,
+                optimizations=model_optimizations,
+                optimization_tolerance=(
+                    settings.MODEL_OPTIMIZATION_BF16_TOLERANCE
+                    if "bf16" in model_optimizations
+                    else settings.MODEL_OPTIMIZATION_TOLERANCE
+                ),
+            )
         )
-    )
 
-    # Register ensemble model with a defined stacking order
+    # Register INT8 variants that have been produced by tools.quantize
+    if settings.INT8_MODELS_ENABLED:
+        for name, int8_path in INT8_MODEL_PATHS.items():
+            if not os.path.exists(int8_path):
+                continue
+            manager.register_model(
+                PlantModel(
+                    name=f"{name}_int8",
+                    model_path=int8_path,
+                    model_type="onnx",
+                    num_classes=settings.NUM_CLASSES,
+                    lazy=settings.MODEL_LAZY_LOADING,
+                )
+            )
+
+    # Register ensemble model with a defined stacking order, served from the
+    # exported numpy stacking head when there is one
+    use_stacking_head = settings.STACKING_HEAD_ENABLED and os.path.exists(
+        STACKING_HEAD_PATH
+    )
     manager.register_model(
         PlantModel(
             name="ensemble",
-            model_path=ENSEMBLE_PATH,
+            model_path=STACKING_HEAD_PATH if use_stacking_head else ENSEMBLE_PATH,
             model_type="sklearn",
             model_order=[
                 "densenet121",
@@ -64,7 +113,24 @@ def setup_models(idx2label_path="saved_models/utils/idx2label.json"):
                 "mobilenet_v3_large",
                 "resnet50",
             ],  # must match training order
+            parallel_base_models=settings.ENSEMBLE_PARALLEL,
+            lazy=settings.MODEL_LAZY_LOADING,
+            mmap=settings.MODEL_MMAP,
         )
     )
 
+    # Register the cascade over models registered above
+    if settings.CASCADE_ENABLED:
+        manager.register_model(
+            CascadeModel(
+                name="cascade",
+                stages=[
+                    s.strip() for s in settings.CASCADE_STAGES.split(",") if s.strip()
+                ],
+                thresholds=load_thresholds(CASCADE_THRESHOLDS_PATH),
+                default_confidence=settings.CASCADE_CONFIDENCE,
+                default_margin=settings.CASCADE_MARGIN,
+            )
+        )
+
     return manager, IDX2LABEL
@@ -1,27 +1,285 @@
-from typing import Any
+from typing import Any, Dict, List, Optional
+import threading
+import time
+import weakref
+import numpy as np
+from PIL import Image
 from .plant_model import PlantModel
+from .cache import PredictionCache, content_hash, image_content_hash
+from .context import PredictionContext
+from prometheus_metrics import MODEL_SWAPS
+
+
+def slice_output(output: Any, i: int) -> Any:
+    """Pick row `i` out of a batch output, keeping the batch-of-one shape."""
+    if isinstance(output, tuple):
+        prediction, probs = output
+        return (
+            prediction[i : i + 1],
+            probs[i : i + 1] if probs is not None else None,
+        )
+    return output[i : i + 1]
+
+
+def stack_outputs(rows: List[Any]) -> Any:
+    """Inverse of `slice_output`: join batch-of-one outputs into one batch."""
+    if isinstance(rows[0], tuple):
+        probs = [r[1] for r in rows]
+        return (
+            np.concatenate([r[0] for r in rows]),
+            None if any(p is None for p in probs) else np.concatenate(probs),
+        )
+    return np.concatenate(rows)
 
 
 class ModelManager:
-    def __init__(self):
+    def __init__(self, cache: Optional[PredictionCache] = None):
         self.models = {}
+        self.cache = cache
+        # Forked inference-host replicas each hold their own copy of `models`, so a
+        # swap would reach only one of them; the host turns swapping off there
+        self.allow_swap = True
+        self._swap_lock = threading.Lock()
 
     def register_model(self, model: PlantModel):
         self.models[model.name] = model
 
-    def predict(self, model_name: str, input_data: Any):
+    def _get_model(self, model_name: str) -> PlantModel:
         if model_name not in self.models:
             raise ValueError(f"Model {model_name} not found")
+        return self.models[model_name]
 
-        model = self.models[model_name]
-
-        # For ensemble models, pass the manager so base model predictions can be collected
-        if (
+    @staticmethod
+    def _is_stacking(model: PlantModel) -> bool:
+        return (
             model.model_type == "sklearn"
             and hasattr(model, "model_order")
             and model.model_order
-        ):
-            return model.predict(input_data, manager=self)
+        )
+
+    @classmethod
+    def _needs_manager(cls, model: PlantModel) -> bool:
+        # Stacking ensembles and cascades run other models through the manager
+        return cls._is_stacking(model) or model.model_type == "cascade"
+
+    def _dependents(self, model_name: str) -> List[str]:
+        """Models that run `model_name`, directly or through another model"""
+        found = []
+        pending = [model_name]
+        while pending:
+            name = pending.pop()
+            for other in self.models.values():
+                if (
+                    self._needs_manager(other)
+                    and name in other.model_order
+                    and other.name not in found
+                ):
+                    found.append(other.name)
+                    pending.append(other.name)
+        return found
+
+    def _cache_version(self, models: Dict[str, Any], model: PlantModel) -> str:
+        """
+        Version `model`'s outputs are cached under. For stacking ensembles and
+        cascades it also covers the models they run (from the `models` snapshot),
+        so swapping any of those changes the key.
+        """
+        if not self._needs_manager(model):
+            return model.version
+        parts = [model.version] + [
+            self._cache_version(models, models[name])
+            for name in model.model_order
+            if name in models
+        ]
+        return content_hash("/".join(parts).encode())[:12]
+
+    def predict(self, model_name: str, input_data: Any):
+        # A single image is a batch of one, so it shares the batch path's cache
+        if isinstance(input_data, Image.Image):
+            return self.predict_batch(model_name, [input_data])
+
+        context = PredictionContext(self)
+        model = context.get_model(model_name)
+
+        # For ensemble models, pass the context so base model predictions can be collected
+        if self._needs_manager(model):
+            return model.predict(input_data, manager=context)
         else:
             # For PyTorch models or sklearn without stacking, manager is not needed
             return model.predict(input_data)
+
+    def _run_batch(
+        self, context: PredictionContext, model: PlantModel, images: List[Any]
+    ):
+        if self._needs_manager(model):
+            return model.predict_batch(images, manager=context)
+        else:
+            return model.predict_batch(images)
+
+    def predict_batch(self, model_name: str, images: List[Any]):
+        """
+        Run several images through one model in a single forward pass.
+        Images already seen by this model version are answered from the cache.
+        Safe to call from several threads at once.
+        """
+        return self._predict_batch(PredictionContext(self), model_name, images)
+
+    def _predict_batch(
+        self, context: PredictionContext, model_name: str, images: List[Any]
+    ):
+        model = context.get_model(model_name)
+        digests = [image_content_hash(img) for img in images]
+        if self.cache is None or not any(digests):
+            return self._run_batch(context, model, images)
+
+        version = self._cache_version(context.models, model)
+        rows = [self.cache.get(d, model_name, version) if d else None for d in digests]
+        misses = [i for i, row in enumerate(rows) if row is None]
+        if not misses:
+            return stack_outputs(rows)
+
+        output = self._run_batch(context, model, [images[i] for i in misses])
+        for j, i in enumerate(misses):
+            rows[i] = slice_output(output, j)
+            if digests[i]:
+                self.cache.put(digests[i], model_name, version, rows[i])
+        return stack_outputs(rows)
+
+    def predict_all(
+        self, images: List[Any], model_names: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run several models over the same images, each base model exactly once.
+
+        Stacking ensembles are computed from the base outputs produced in this same
+        pass rather than re-running their base models. `model_names` defaults to the
+        ensembles plus the base models they stack. Returns outputs keyed
+        by model name, in the same shapes as `predict_batch`.
+        """
+        context = PredictionContext(self)
+        if model_names is None:
+            # The ensembles and the base models they stack; every model without one
+            ensembles = [m for m in context.models.values() if self._is_stacking(m)]
+            model_names = [n for m in ensembles for n in m.model_order] + [
+                m.name for m in ensembles
+            ] or list(context.models)
+            model_names = list(dict.fromkeys(model_names))
+        models = [context.get_model(name) for name in model_names]
+        ensembles = [m for m in models if self._is_stacking(m)]
+        # Cascades pick their own stages per image; they run after the shared pass
+        cascades = [m for m in models if m.model_type == "cascade"]
+
+        # Base models requested directly or needed by a requested ensemble
+        base_names = []
+        for model in models:
+            if model in cascades:
+                continue
+            for name in (
+                model.model_order if self._is_stacking(model) else [model.name]
+            ):
+                if name not in base_names:
+                    base_names.append(name)
+
+        outputs = {}
+        if ensembles:
+            # One shared preprocessing + forward pass per base model
+            outputs.update(
+                ensembles[0].base_model_probs(
+                    images, context, base_model_names=base_names
+                )
+            )
+        else:
+            for name in base_names:
+                outputs[name] = context.predict_batch(name, images)
+
+        for ensemble in ensembles:
+            outputs[ensemble.name] = ensemble.predict_stacked(
+                ensemble.stack_base_probs(outputs)
+            )
+        for cascade in cascades:
+            outputs[cascade.name] = context.predict_batch(cascade.name, images)
+
+        return {name: outputs[name] for name in model_names}
+
+    def _invalidate_cached(self, model_name: str):
+        if self.cache is not None:
+            self.cache.invalidate(model_name)
+            for name in self._dependents(model_name):
+                self.cache.invalidate(name)
+
+    def swap_model(
+        self,
+        model_name: str,
+        model_path: Optional[str] = None,
+        version: Optional[str] = None,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Roll a model over to new weights without a restart.
+
+        The new version is loaded and warmed next to the one being served, then
+        replaces it in `models` with a single assignment. Requests that already hold
+        the old instance finish on it; its weights are freed once the last of them
+        lets go. Returns the new version and how long loading and warming took.
+
+        Refused when other processes serve their own copies (`allow_swap` is off),
+        unless `force`d by a caller that runs in each of them (the checkpoint watcher).
+        """
+        if not (self.allow_swap or force):
+            raise RuntimeError(
+                "Hot-swap would only reach this process; several processes serve "
+                "the models"
+            )
+
+        with self._swap_lock:
+            old = self._get_model(model_name)
+            if not hasattr(old, "with_weights"):
+                raise ValueError(f"Model {model_name} has no weights to swap")
+
+            start = time.perf_counter()
+            new = old.with_weights(model_path, version)
+            new.warm_up()
+            swap_time = time.perf_counter() - start
+
+            self.models[model_name] = new
+            self._invalidate_cached(model_name)
+            weakref.finalize(
+                old, print, f"🗑️ Released {model_name} version {old.version}"
+            )
+
+        MODEL_SWAPS.labels(model_name=model_name).inc()
+        print(
+            f"🔁 Swapped {model_name} {old.version} -> {new.version} "
+            f"(loaded and warmed in {swap_time:.2f}s)"
+        )
+        return {
+            "model": model_name,
+            "version": new.version,
+            "previous_version": old.version,
+            "load_time": new.load_time,
+            "swap_time": swap_time,
+        }
+
+    def warm(self, model_names: List[str] = None) -> Dict[str, float]:
+        """
+        Load lazily registered models now instead of on their first request.
+        Warming an ensemble also warms its base models. Returns load times in seconds.
+        """
+        names = list(self.models) if model_names is None else list(model_names)
+        # `names` grows while iterating, so dependencies of dependencies are warmed too
+        for name in names:
+            model = self._get_model(name)
+            if self._needs_manager(model):
+                names.extend(m for m in model.model_order if m not in names)
+
+        for name in names:
+            self._get_model(name).ensure_loaded()
+        return self.load_times()
+
+    def load_times(self) -> Dict[str, float]:
+        """Seconds each loaded model took to materialize"""
+        return {
+            name: model.load_time
+            for name, model in self.models.items()
+            if model.load_time is not None
+        }
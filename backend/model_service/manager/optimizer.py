@@ -0,0 +1,107 @@
+"""
+Opt-in inference graph optimizations applied when a PyTorch model is loaded.
+
+    fuse           fold BatchNorm into the preceding convolution (torch.fx)
+    channels_last  NHWC weights and inputs, which oneDNN convolutions prefer on CPU
+    freeze         trace to TorchScript, freeze weights as constants, optimize_for_inference
+    bf16           bfloat16 autocast, only on CPUs with native bf16 support
+
+The optimized model is checked against the eager one on a random batch and is only
+used when its probabilities agree within tolerance.
+"""
+
+from typing import List, Sequence
+
+import torch
+import torch.nn as nn
+
+SUPPORTED_OPTIMIZATIONS = ("fuse", "channels_last", "freeze", "bf16")
+
+
+def bf16_supported() -> bool:
+    """Whether this CPU can run bfloat16 kernels natively"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def parse_optimizations(spec: str) -> dict:
+    """
+    Parse a per-model spec such as "resnet50=fuse,freeze;*=channels_last"
+    into {"resnet50": [...], "*": [...]}.
+    """
+    per_model = {}
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        name, _, opts = entry.partition("=")
+        options = [o.strip() for o in opts.split(",") if o.strip()]
+        unknown = set(options) - set(SUPPORTED_OPTIMIZATIONS)
+        if unknown:
+            raise ValueError(f"Unknown model optimizations: {sorted(unknown)}")
+        per_model[name.strip()] = options
+    return per_model
+
+
+def optimizations_for(name: str, per_model: dict) -> List[str]:
+    """Options for one model, falling back to the "*" entry"""
+    return per_model.get(name, per_model.get("*", []))
+
+
+class _InferenceWrapper(nn.Module):
+    """Applies input memory format and autocast around the wrapped model"""
+
+    def __init__(self, model: nn.Module, channels_last: bool, bf16: bool):
+        super().__init__()
+        self.model = model
+        self.channels_last = channels_last
+        self.bf16 = bf16
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        if self.bf16:
+            with torch.autocast("cpu", dtype=torch.bfloat16):
+                return self.model(x).float()
+        return self.model(x)
+
+
+def optimize_model(
+    model: nn.Module,
+    optimizations: Sequence[str],
+    example_input: torch.Tensor,
+) -> nn.Module:
+    """Apply the requested optimizations to an eval-mode model."""
+    optimizations = set(optimizations)
+
+    if "fuse" in optimizations:
+        from torch.fx.experimental.optimization import fuse
+
+        model = fuse(model)
+
+    channels_last = "channels_last" in optimizations
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+
+    bf16 = "bf16" in optimizations and bf16_supported()
+    if "bf16" in optimizations and not bf16:
+        print("⚠️ bf16 requested but not supported on this CPU, staying in fp32")
+
+    if channels_last or bf16:
+        model = _InferenceWrapper(model, channels_last, bf16).eval()
+
+    if "freeze" in optimizations:
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example_input)
+        model = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+
+    return model
+
+
+def max_prob_difference(
+    reference: nn.Module, candidate: nn.Module, example_input: torch.Tensor
+) -> float:
+    """Largest absolute difference between the two models' softmax outputs"""
+    with torch.no_grad():
+        expected = torch.softmax(reference(example_input), dim=1)
+        actual = torch.softmax(candidate(example_input).float(), dim=1)
+    return float((expected - actual).abs().max())
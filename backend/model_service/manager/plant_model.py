@@ -1,13 +1,40 @@
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import os
+import threading
+import time
+import weakref
 import torch
 import joblib  # for ensemble.pkl
-from torchvision import models as tv_models, transforms
+from torchvision import models as tv_models
 import torch.nn as nn
 from PIL import Image
 import numpy as np
+from prometheus_metrics import MODEL_LOAD_TIME
+from manager.optimizer import optimize_model, max_prob_difference
+from manager.cache import content_hash, image_content_hash
+from manager.preprocessing import CROP_SIZE, get_preprocessor
+from manager.stacking_head import StackingHead
+
+# Model types that map an image batch to class probabilities and can feed the ensemble
+BASE_MODEL_TYPES = ("pytorch", "onnx")
+
+
+def checkpoint_version(path: str) -> str:
+    """Identifies the weights file currently at `path`; changes when it is replaced"""
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return content_hash(key.encode())[:12]
 
 
 class PlantModel:
+    """
+    A servable model. Instances hold configuration and (lazily loaded) weights only;
+    per-call data stays in local variables or the caller's PredictionContext, so one
+    instance serves any number of concurrent threads.
+    """
+
     def __init__(
         self,
         name: str,
@@ -16,34 +43,170 @@ class PlantModel:
         num_classes: int = None,
         model_order: list = None,
         device="cpu",
+        parallel_base_models: bool = False,
+        lazy: bool = False,
+        mmap: bool = False,
+        optimizations: list = None,
+        optimization_tolerance: float = 1e-3,
+        version: str = "1",
     ):
         """
-        model_type: 'pytorch' or 'sklearn'
+        model_type: 'pytorch', 'onnx' or 'sklearn' (a joblib pickle, or a .npz
+            exported by tools.export_stacking_head)
         num_classes: required for PyTorch models to rebuild the classifier
+        parallel_base_models: for stacking ensembles, run the base models concurrently
+        lazy: defer loading the weights until the model is first used (or warmed)
+        mmap: memory-map checkpoints so pages are loaded on demand and shared
+        optimizations: graph optimizations for PyTorch models (see manager.optimizer)
+        optimization_tolerance: max softmax difference allowed vs. the eager model
+        version: identifies the weights being served (part of the prediction cache key)
         """
         self.name = name
         self.device = device
         self.model_type = model_type
         self.model_path = model_path
         self.num_classes = num_classes
-        self.model = self.load_model()
-        self.last_output = None
         self.model_order = model_order
+        self.parallel_base_models = parallel_base_models
+        self._base_executor = None
+        self._base_executor_lock = threading.Lock()
+        self.lazy = lazy
+        self.mmap = mmap
+        self.optimizations = optimizations or []
+        self.optimization_tolerance = optimization_tolerance
+        self.version = version
+        self.load_time = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        if not lazy:
+            self.ensure_loaded()
+
+    @property
+    def model(self) -> Any:
+        return self.ensure_loaded()
+
+    @model.setter
+    def model(self, value: Any):
+        self._model = value
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def ensure_loaded(self) -> Any:
+        """Materialize the model on first use; later calls return the loaded instance"""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = self.load_model()
+                    self.load_time = time.perf_counter() - start
+                    MODEL_LOAD_TIME.labels(model_name=self.name).set(self.load_time)
+                    print(f"📦 Loaded {self.name} in {self.load_time:.2f}s")
+        return self._model
+
+    def unload(self):
+        """Release the weights; the next use loads them again"""
+        with self._load_lock:
+            self._model = None
+            self.load_time = None
+
+    def with_weights(
+        self, model_path: Optional[str] = None, version: Optional[str] = None
+    ) -> "PlantModel":
+        """
+        An unloaded copy of this model, with the same settings, reading `model_path`
+        (default: the same path, e.g. after a new checkpoint was moved over it).
+        `version` defaults to one derived from the file.
+        """
+        clone = copy.copy(self)
+        clone.model_path = model_path or self.model_path
+        clone.version = version or checkpoint_version(clone.model_path)
+        clone.load_time = None
+        clone._model = None
+        clone._base_executor = None
+        clone._base_executor_lock = threading.Lock()
+        clone._load_lock = threading.Lock()
+        return clone
+
+    def warm_up(self, batch_size: int = 1):
+        """
+        Load the weights and run a synthetic batch through them, so allocations and
+        lazy initialization happen before the first real request.
+        """
+        self.ensure_loaded()
+        if self.model_type in BASE_MODEL_TYPES:
+            images = [Image.new("RGB", (CROP_SIZE, CROP_SIZE))] * batch_size
+            self._forward_probs(self.preprocess_batch(images))
+        elif self.model_type == "sklearn" and hasattr(self.model, "n_features_in_"):
+            self.predict_stacked(
+                np.zeros((batch_size, self.model.n_features_in_), dtype=np.float32)
+            )
+
+    def _load_checkpoint(self) -> Any:
+        if self.mmap:
+            try:
+                return torch.load(self.model_path, map_location=self.device, mmap=True)
+            except RuntimeError as e:
+                # Legacy (non-zipfile) checkpoints can't be memory-mapped
+                print(f"⚠️ Could not mmap {self.model_path}, loading eagerly: {e}")
+        return torch.load(self.model_path, map_location=self.device)
 
     def load_model(self) -> Any:
         if self.model_type == "pytorch":
             model = self.build_model_arch()
-            checkpoint = torch.load(self.model_path, map_location=self.device)
+            checkpoint = self._load_checkpoint()
             state_dict = checkpoint.get("model_state", checkpoint)
-            model.load_state_dict(state_dict)
+            # assign=True keeps the (memory-mapped) checkpoint tensors as the
+            # parameters instead of copying them into freshly allocated ones
+            model.load_state_dict(state_dict, assign=self.mmap)
             model.to(self.device)
             model.eval()
+            if self.optimizations:
+                model = self._optimize(model)
             return model
+        elif self.model_type == "onnx":
+            return self._load_onnx_session()
         elif self.model_type == "sklearn":
-            return joblib.load(self.model_path)
+            # An exported stacking head needs numpy only; a pickle needs scikit-learn
+            if self.model_path.endswith(".npz"):
+                return StackingHead.load(self.model_path)
+            return joblib.load(self.model_path, mmap_mode="r" if self.mmap else None)
         else:
             raise ValueError("Unsupported model type")
 
+    def _optimize(self, model: nn.Module) -> nn.Module:
+        """Apply the configured optimizations, keeping the eager model if they drift"""
+        example = torch.randn(2, 3, 224, 224, device=self.device)
+        try:
+            optimized = optimize_model(model, self.optimizations, example)
+            diff = max_prob_difference(model, optimized, example)
+        except Exception as e:
+            print(f"⚠️ Optimizing {self.name} failed, serving the eager model: {e}")
+            return model
+
+        if diff > self.optimization_tolerance:
+            print(
+                f"⚠️ Optimized {self.name} differs from eager by {diff:.1e} "
+                f"(> {self.optimization_tolerance:.1e}), serving the eager model"
+            )
+            return model
+
+        print(f"⚡ Optimized {self.name} with {self.optimizations} (diff {diff:.1e})")
+        return optimized
+
+    def _load_onnx_session(self) -> Any:
+        # Only needed when an ONNX model is actually registered
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Follow the thread budget configured for torch
+        options.intra_op_num_threads = torch.get_num_threads()
+        return ort.InferenceSession(
+            self.model_path, options, providers=["CPUExecutionProvider"]
+        )
+
     def build_model_arch(self) -> nn.Module:
         """Rebuild the architecture with the correct number of classes"""
         if self.name.startswith("resnet"):
@@ -68,19 +231,38 @@ class PlantModel:
 
     def preprocess_input(self, image: Image.Image) -> torch.Tensor:
         """Apply standard preprocessing for PyTorch base models and return a batch tensor"""
-        image = image.convert("RGB")
-        transform = transforms.Compose(
-            [
-                transforms.Resize(256),
-                transforms.CenterCrop(224),
-                transforms.ToTensor(),
-                transforms.Normalize(
-                    mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]
-                ),
-            ]
-        )
-        input_tensor = transform(image).unsqueeze(0)  # Add batch dim
-        return input_tensor.to(self.device)
+        return self.preprocess_batch([image])
+
+    def preprocess_batch(self, images: List[Image.Image]) -> torch.Tensor:
+        """Preprocess several images into one (N, 3, 224, 224) batch tensor"""
+        return get_preprocessor()(images).to(self.device)
+
+    def _forward_probs(self, input_tensor: torch.Tensor) -> np.ndarray:
+        """Forward an already preprocessed batch and return softmax probabilities"""
+        if self.model_type == "onnx":
+            session = self.model
+            logits = session.run(
+                None, {session.get_inputs()[0].name: input_tensor.cpu().numpy()}
+            )[0]
+            return torch.softmax(torch.from_numpy(logits), dim=1).numpy()
+
+        with torch.no_grad():
+            out = self.model(input_tensor.to(self.device))  # logits
+            return torch.softmax(out, dim=1).cpu().numpy()  # (N, num_classes)
+
+    def _get_base_executor(self) -> ThreadPoolExecutor:
+        # One thread per base model; torch releases the GIL inside its kernels,
+        # so the forward passes genuinely overlap
+        if self._base_executor is None:
+            with self._base_executor_lock:
+                if self._base_executor is None:
+                    self._base_executor = ThreadPoolExecutor(
+                        max_workers=len(self.model_order),
+                        thread_name_prefix=f"{self.name}-base",
+                    )
+                    # A swapped-out ensemble takes its threads along when released
+                    weakref.finalize(self, self._base_executor.shutdown, wait=False)
+        return self._base_executor
 
     def _get_base_model_probs_from_manager(
         self, image: Image.Image, manager: Any
@@ -89,39 +271,142 @@ class PlantModel:
         Given a PIL image and a ModelManager, ask each non-ensemble PyTorch model for probabilities,
         then concatenate them into a single 1D feature vector (shape (1, total_features)).
         """
+        return self._get_base_model_probs_batch([image], manager)
+
+    def _get_base_model_probs_batch(
+        self, images: List[Image.Image], manager: Any
+    ) -> np.ndarray:
+        """
+        Batched version of `_get_base_model_probs_from_manager`: every base model runs one
+        forward pass over all images, and the per-model probabilities are concatenated
+        column-wise into stacked features of shape (N, sum(num_classes_per_model)).
+        """
+        return self.stack_base_probs(self.base_model_probs(images, manager))
+
+    def _resolve_base_models(
+        self, manager: Any, names: Optional[List[str]] = None
+    ) -> List["PlantModel"]:
         if manager is None:
             raise ValueError(
                 "ModelManager is required to assemble stacked features for ensemble model."
             )
 
-        probs_list = []
-        for m_name in self.model_order:
+        base_models = []
+        for m_name in self.model_order if names is None else names:
             if m_name not in manager.models:
                 raise ValueError(f"Base model '{m_name}' not found in manager.")
             plant_model = manager.models[m_name]
 
-            if plant_model.model_type != "pytorch":
-                raise ValueError(f"Base model '{m_name}' must be PyTorch for stacking.")
-
-            # Call base model predict with PIL image, manager=None to avoid recursion
-            base_out = plant_model.predict(image, manager=None)
-
-            # Ensure shape is (1, num_classes)
-            base_out = np.asarray(base_out)
-            if base_out.ndim == 1:
-                base_out = base_out.reshape(1, -1)
+            if plant_model.model_type not in BASE_MODEL_TYPES:
+                raise ValueError(
+                    f"Base model '{m_name}' must be PyTorch or ONNX for stacking."
+                )
 
-            probs_list.append(base_out.flatten())
+            base_models.append(plant_model)
 
-        if not probs_list:
+        if not base_models:
             raise ValueError(
                 "No base PyTorch models found in manager to build features for ensemble."
             )
+        return base_models
+
+    def base_model_probs(
+        self,
+        images: List[Image.Image],
+        manager: Any,
+        base_model_names: Optional[List[str]] = None,
+        precomputed: Optional[Dict[str, np.ndarray]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        (N, num_classes) probabilities from each base model, keyed by model name.
+
+        Defaults to the ensemble's own base models; `base_model_names` may add others
+        that share the same preprocessing, so they run alongside in the same pass.
+        Models in `precomputed` (name -> (N, num_classes)) are not run again.
+        """
+        base_models = self._resolve_base_models(manager, base_model_names)
+        precomputed = precomputed or {}
+
+        # Reuse base-model probabilities cached for these exact uploads
+        cache = getattr(manager, "cache", None)
+        digests = [image_content_hash(img) for img in images]
+        rows = {
+            m.name: (
+                [precomputed[m.name][i : i + 1] for i in range(len(images))]
+                if m.name in precomputed
+                else [
+                    cache.get(d, m.name, m.version) if cache is not None and d else None
+                    for d in digests
+                ]
+            )
+            for m in base_models
+        }
+        missing = sorted(
+            {i for m_rows in rows.values() for i, r in enumerate(m_rows) if r is None}
+        )
+        to_run = [
+            m for m in base_models if any(rows[m.name][i] is None for i in missing)
+        ]
+
+        if missing and to_run:
+            # All base models share the same ImageNet preprocessing, so do it once
+            input_tensor = base_models[0].preprocess_batch([images[i] for i in missing])
+
+            if self.parallel_base_models and len(to_run) > 1:
+                executor = self._get_base_executor()
+                outputs = list(
+                    executor.map(lambda m: m._forward_probs(input_tensor), to_run)
+                )
+            else:
+                outputs = [m._forward_probs(input_tensor) for m in to_run]
+
+            for m, probs in zip(to_run, outputs):
+                for j, i in enumerate(missing):
+                    rows[m.name][i] = probs[j : j + 1]
+                    if cache is not None and digests[i]:
+                        cache.put(digests[i], m.name, m.version, rows[m.name][i])
+
+        return {m.name: np.concatenate(rows[m.name]) for m in base_models}
+
+    def stack_base_probs(self, base_probs: Dict[str, np.ndarray]) -> np.ndarray:
+        """Concatenate per-model probabilities in `model_order` into meta-model features"""
+        return np.concatenate([base_probs[name] for name in self.model_order], axis=1)
+
+    def predict_stacked(self, stacked_features: np.ndarray) -> Any:
+        """Run the meta-model on stacked features; returns (predictions, probs)"""
+        if isinstance(self.model, StackingHead):
+            # Both from a single pass over the features
+            return self.model.predict_with_proba(stacked_features)
+
+        prediction = self.model.predict(stacked_features)  # class indices, (N,)
+        probs = None
 
-        stacked = np.concatenate(probs_list).reshape(
-            1, -1
-        )  # shape (1, sum(num_classes_per_model))
-        return stacked
+        if hasattr(self.model, "predict_proba"):
+            probs = self.model.predict_proba(stacked_features)  # (N, num_classes)
+
+        return prediction, probs
+
+    def predict_batch(
+        self, images: List[Image.Image], manager: Optional[Any] = None
+    ) -> Any:
+        """
+        Run a list of PIL images through the model as a single batch.
+
+        Returns an (N, num_classes) probability array for PyTorch/ONNX models, and a
+        (predictions, probs) tuple with N rows each for the sklearn stacking ensemble.
+        """
+        if not images:
+            raise ValueError("predict_batch() requires at least one image.")
+
+        if self.model_type in BASE_MODEL_TYPES:
+            return self._forward_probs(self.preprocess_batch(images))
+
+        elif self.model_type == "sklearn":
+            stacked_features = self._get_base_model_probs_batch(images, manager)
+            return self.predict_stacked(stacked_features)
+
+        else:
+            raise ValueError("Unsupported model type")
 
     def predict(self, input_data: Any, manager: Optional[Any] = None) -> Any:
         """
@@ -129,43 +414,11 @@ class PlantModel:
           - PIL.Image.Image (preferred for single-image prediction)
           - torch.Tensor (preprocessed batch tensor for pytorch)
           - numpy array / 2D features for sklearn
-        For sklearn ensemble models that need base model predictions, pass `manager` so features can be assembled.
+        For sklearn ensemble models that need base model predictions, pass `manager` (a ModelManager or PredictionContext) so features can be assembled.
         """
-        # If user passed a PIL image, handle preprocessing (or assembling stacked features)
+        # A single PIL image is just a batch of one
         if isinstance(input_data, Image.Image):
-            if self.model_type == "pytorch":
-                # preprocess and forward
-                input_tensor = self.preprocess_input(input_data)  # already on device
-                with torch.no_grad():
-                    out = self.model(input_tensor)  # logits
-                    probs = torch.softmax(out, dim=1).cpu().numpy()  # (1, num_classes)
-                self.last_output = probs
-                return probs
-
-            elif self.model_type == "sklearn":
-                # For the stacking ensemble: gather base model probs via manager and then call sklearn
-                stacked_features = self._get_base_model_probs_from_manager(
-                    input_data, manager
-                )
-
-                prediction = self.model.predict(
-                    stacked_features
-                )  # class indices, shape (1,)
-                probs = None
-
-                if hasattr(self.model, "predict_proba"):
-                    probs = self.model.predict_proba(
-                        stacked_features
-                    )  # (1, num_classes)
-
-                # Store last output as tuple (prediction, probs)
-                self.last_output = (prediction, probs)
-
-                # Always return both, so caller can decide how to use
-                return prediction, probs
-
-            else:
-                raise ValueError("Unsupported model type")
+            return self.predict_batch([input_data], manager=manager)
 
         # Fallback: unsupported input
         raise ValueError(
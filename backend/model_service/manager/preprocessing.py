@@ -0,0 +1,75 @@
+"""
+Batch preprocessing shared by every base model.
+
+All base models were trained on the same ImageNet-style input (resize the short side
+to 256, center-crop 224, normalize), so one `Preprocessor` per process serves them
+all. Each image is resized and cropped as uint8 with PIL, the crops are stacked into
+one uint8 batch, and the ToTensor scaling plus normalization run as a single fused
+multiply-add over the whole batch, instead of a float conversion and a separate
+normalize per image per model.
+"""
+
+import threading
+from typing import List, Sequence
+
+import numpy as np
+import torch
+import torchvision.transforms.functional as F
+from PIL import Image
+
+# Base-model preprocessing: resize the short side, then center-crop
+RESIZE_SIZE = 256
+CROP_SIZE = 224
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+class Preprocessor:
+    def __init__(
+        self,
+        resize_size: int = RESIZE_SIZE,
+        crop_size: int = CROP_SIZE,
+        mean: Sequence[float] = IMAGENET_MEAN,
+        std: Sequence[float] = IMAGENET_STD,
+    ):
+        self.resize_size = resize_size
+        self.crop_size = crop_size
+        mean = torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1)
+        std = torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1)
+        # (x / 255 - mean) / std == x * scale + shift
+        self._scale = 1.0 / (255.0 * std)
+        self._shift = -mean / std
+
+    def to_uint8(self, image: Image.Image) -> np.ndarray:
+        """Resize + center-crop one image, returned as an (H, W, 3) uint8 array"""
+        image = image.convert("RGB")
+        image = F.resize(image, [self.resize_size])
+        image = F.center_crop(image, [self.crop_size])
+        return np.asarray(image, dtype=np.uint8)
+
+    def uint8_batch(self, images: List[Image.Image]) -> torch.Tensor:
+        """(N, 3, crop, crop) uint8 batch, before normalization"""
+        batch = np.stack([self.to_uint8(img) for img in images])
+        return torch.from_numpy(batch).permute(0, 3, 1, 2)
+
+    def normalize(self, batch: torch.Tensor) -> torch.Tensor:
+        """uint8 (N, 3, H, W) -> normalized float32, in one pass"""
+        return torch.addcmul(self._shift, batch.float(), self._scale).contiguous()
+
+    def __call__(self, images: List[Image.Image]) -> torch.Tensor:
+        """Decoded images -> normalized (N, 3, crop, crop) float32 batch"""
+        return self.normalize(self.uint8_batch(images))
+
+
+_preprocessor = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_preprocessor() -> Preprocessor:
+    """The process-wide preprocessor, created on first use"""
+    global _preprocessor
+    if _preprocessor is None:
+        with _preprocessor_lock:
+            if _preprocessor is None:
+                _preprocessor = Preprocessor()
+    return _preprocessor
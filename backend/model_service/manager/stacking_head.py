@@ -0,0 +1,108 @@
+"""
+The ensemble's logistic-regression meta-model, evaluated with numpy alone.
+
+`python -m tools.export_stacking_head` copies the fitted coefficients, intercepts and
+class order out of logistic_meta_model.pkl into a small .npz file. Serving from that
+file keeps scikit-learn (and unpickling) out of the model service, and produces class
+probabilities and predictions from one matrix product per batch, where the pickle
+evaluated the linear model twice (`predict` and `predict_proba`).
+
+Probabilities follow LogisticRegression.predict_proba: a softmax over the decision
+values for multinomial models, normalized per-class sigmoids for one-vs-rest ones.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+MULTINOMIAL = "multinomial"
+OVR = "ovr"
+
+
+class StackingHead:
+    def __init__(
+        self,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        classes: np.ndarray,
+        multi_class: str = MULTINOMIAL,
+    ):
+        if multi_class not in (MULTINOMIAL, OVR):
+            raise ValueError(f"Unsupported multi_class '{multi_class}'")
+        # (features, outputs) so a batch is one (N, F) @ (F, K) product
+        self.weights = np.ascontiguousarray(np.asarray(coef, dtype=np.float64).T)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.multi_class = multi_class
+
+    @property
+    def n_features_in_(self) -> int:
+        return self.weights.shape[0]
+
+    @classmethod
+    def from_sklearn(cls, model) -> "StackingHead":
+        """Parameters of a fitted LogisticRegression, and how it turns them into probabilities"""
+        for attr in ("coef_", "intercept_", "classes_"):
+            if not hasattr(model, attr):
+                raise ValueError(
+                    f"{type(model).__name__} is not a fitted linear classifier "
+                    f"(missing {attr})"
+                )
+
+        # Same rule as LogisticRegression.predict_proba; newer scikit-learn versions
+        # dropped `multi_class` and are multinomial except for binary problems
+        multi_class = getattr(model, "multi_class", "auto")
+        binary = len(model.classes_) <= 2
+        if multi_class in ("ovr", "warn") or (
+            multi_class in ("auto", "deprecated")
+            and (binary or getattr(model, "solver", None) == "liblinear")
+        ):
+            mode = OVR
+        else:
+            mode = MULTINOMIAL
+        return cls(model.coef_, model.intercept_, model.classes_, mode)
+
+    @classmethod
+    def load(cls, path: str) -> "StackingHead":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["coef"],
+                data["intercept"],
+                data["classes"],
+                str(data["multi_class"]),
+            )
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            coef=self.weights.T,
+            intercept=self.intercept,
+            classes=self.classes,
+            multi_class=np.array(self.multi_class),
+        )
+
+    def predict_with_proba(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(class predictions, (N, num_classes) probabilities) from one pass"""
+        scores = np.asarray(features, dtype=np.float64) @ self.weights
+        scores += self.intercept
+
+        if self.multi_class == OVR:
+            probs = 1.0 / (1.0 + np.exp(-scores))
+            if probs.shape[1] == 1:  # binary: the single column is the positive class
+                probs = np.hstack([1.0 - probs, probs])
+            else:
+                probs /= probs.sum(axis=1, keepdims=True)
+        else:
+            if scores.shape[1] == 1:  # binary multinomial: decision values (-d, d)
+                scores = np.hstack([-scores, scores])
+            scores -= scores.max(axis=1, keepdims=True)
+            probs = np.exp(scores, out=scores)
+            probs /= probs.sum(axis=1, keepdims=True)
+
+        return self.classes[probs.argmax(axis=1)], probs
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return self.predict_with_proba(features)[1]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.predict_with_proba(features)[0]
@@ -3,17 +3,21 @@ from prometheus_client import (
     multiprocess,
     Counter,
     Histogram,
+    Gauge,
     generate_latest,
     CONTENT_TYPE_LATEST,
 )
 
 from fastapi import Request
 from fastapi.responses import Response
+import os
 import time
 import re
 
 registry = CollectorRegistry()
-multiprocess.MultiProcessCollector(registry)
+# Only gunicorn deployments set a multiprocess dir; offline tools (tools.*) don't
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    multiprocess.MultiProcessCollector(registry)
 
 
 REQUEST_COUNT = Counter(
@@ -42,11 +46,113 @@ MODEL_PREDICTIONS_FAILED = Counter(
     ["model_name"],
 )
 
+IMAGE_DECODE_TIME = Histogram(
+    "model_image_decode_seconds",
+    "Time taken to decode an uploaded image to RGB",
+    ["format"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+MODEL_PREDICT_ALL_LATENCY = Histogram(
+    "model_predict_all_latency_seconds",
+    "Time taken to predict one image with every model for /predict-all",
+)
+
+BATCH_SIZE = Histogram(
+    "model_batch_size",
+    "Number of images run together in one micro-batch",
+    ["model_name"],
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+BATCH_QUEUE_WAIT = Histogram(
+    "model_batch_queue_wait_seconds",
+    "Time a request waited in the micro-batch queue before dispatch",
+    ["model_name"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "model_inference_queue_depth",
+    "Inference calls waiting for a free executor worker",
+    multiprocess_mode="livesum",
+)
+
+INFERENCE_QUEUE_WAIT = Histogram(
+    "model_inference_queue_wait_seconds",
+    "Time an inference call waited for a free executor worker",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+MODEL_LOAD_TIME = Gauge(
+    "model_load_seconds",
+    "Time taken to load a model's weights",
+    ["model_name"],
+    multiprocess_mode="max",
+)
+
+PREDICTION_CACHE_HITS = Counter(
+    "model_prediction_cache_hits_total",
+    "Per-image model outputs served from the prediction cache",
+    ["model_name"],
+)
+
+PREDICTION_CACHE_MISSES = Counter(
+    "model_prediction_cache_misses_total",
+    "Per-image model outputs not found in the prediction cache",
+    ["model_name"],
+)
+
+PREDICTION_CACHE_EVICTIONS = Counter(
+    "model_prediction_cache_evictions_total",
+    "Prediction cache entries evicted to stay within the memory bound",
+    ["model_name"],
+)
+
+CASCADE_EXITS = Counter(
+    "model_cascade_exits_total",
+    "Images answered by each stage of a confidence-gated cascade",
+    ["model_name", "stage"],
+)
+
+WARMUP_TIME = Gauge(
+    "model_warmup_seconds",
+    "Time the startup warmup batch took, per model and batch size",
+    ["model_name", "batch_size"],
+    multiprocess_mode="max",
+)
+
+WARMUP_TOTAL_TIME = Gauge(
+    "model_warmup_total_seconds",
+    "Time from the start of the startup warmup until the worker was ready",
+    multiprocess_mode="max",
+)
+
+MODEL_SERVICE_READY = Gauge(
+    "model_service_ready",
+    "1 once the worker has finished its startup warmup (min across workers)",
+    multiprocess_mode="livemin",
+)
+
+MODEL_SWAPS = Counter(
+    "model_swaps_total",
+    "Models rolled over to new weights without a restart",
+    ["model_name"],
+)
+
+MODEL_CATALOG_LOOKUPS = Counter(
+    "model_catalog_lookups_total",
+    "Model catalog reads served from the in-process cache (hit) or MongoDB (miss)",
+    ["kind", "result"],
+)
+
 
 PATH_PATTERNS = [
-    (r"^/predict/[^/]+$", "/predict/{model_name}"),
-    (r"^/models/alias/[^/]+$", "/models/alias/{alias}"),
-    (r"^/models/[^/]+$", "/models/{model_id}"),
+    (r"^/model/predict/[^/]+$", "/model/predict/{model_name}"),
+    (r"^/model/predict-batch/[^/]+$", "/model/predict-batch/{model_name}"),
+    (r"^/model/models/alias/[^/]+$", "/model/models/alias/{alias}"),
+    (r"^/model/models/[^/]+/swap$", "/model/models/{model_name}/swap"),
+    (r"^/model/models/(?!active$)[^/]+$", "/model/models/{model_id}"),
 ]
 
 
@@ -1,44 +1,234 @@
-from fastapi import APIRouter, UploadFile, Depends, File, Body, HTTPException
-from services.prediction_service import predict_service
-from dependencies import get_manager, get_idx2label
+from fastapi import (
+    APIRouter,
+    UploadFile,
+    Depends,
+    File,
+    Body,
+    HTTPException,
+    Query,
+    Request,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from services.prediction_service import (
+    predict_service,
+    predict_batch_service,
+    predict_all_service,
+)
+from dependencies import (
+    get_manager,
+    get_idx2label,
+    get_scheduler,
+    get_executor,
+    verify_admin_token,
+)
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from config.config import settings
+from services.prediction_format import (
+    PREDICTION_MEDIA_TYPE,
+    encode_predictions,
+    negotiate_dtype,
+)
 from services.prediction_service import (
     get_all_models_service,
-    get_active_models_service,
-    get_model_by_alias_service,
-    get_model_by_id_service,
+    get_all_models_catalog,
+    get_model_by_alias_catalog,
+    get_model_by_id_catalog,
 )
+from services.model_rollout import swap_model_service
 import db.connections as db_conn
 from prometheus_metrics import (
     MODEL_PREDICTION_LATENCY,
     MODEL_PREDICTIONS,
     MODEL_PREDICTIONS_FAILED,
+    MODEL_PREDICT_ALL_LATENCY,
 )
 
 router = APIRouter()
 
 
+def is_raw_image_body(content_type: str) -> bool:
+    """Content types sent as the bare image bytes rather than a multipart form"""
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type == "application/octet-stream" or media_type.startswith("image/")
+
+
+def wants_probs(top_k: Optional[int], include_probs: Optional[bool]) -> bool:
+    """Full probability vectors are sent unless top_k trims the response"""
+    return include_probs if include_probs is not None else top_k is None
+
+
+def negotiated(request: Request, body: dict, results: List[dict]):
+    """JSON body by default; the compact binary encoding when the client accepts it"""
+    dtype = negotiate_dtype(request.headers.get("accept", ""))
+    if dtype is None:
+        return body
+    return Response(
+        content=encode_predictions(results, dtype),
+        media_type=f"{PREDICTION_MEDIA_TYPE}; dtype={dtype}",
+    )
+
+
+def catalog_response(request: Request, body: dict, etag: str):
+    """Catalog body with its ETag; 304 when the client's cached copy is current"""
+    max_age = settings.MODEL_CATALOG_MAX_AGE
+    headers = {
+        "ETag": etag,
+        "Cache-Control": (
+            f"max-age={max_age}, must-revalidate" if max_age > 0 else "no-cache"
+        ),
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jsonable_encoder(body), headers=headers)
+
+
 @router.post("/predict/{model_name}")
 async def predict(
     model_name: str,
-    file: UploadFile = File(...),
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    top_k: Optional[int] = Query(None, ge=1),
+    include_probs: Optional[bool] = None,
     manager=Depends(get_manager),
     idx2label=Depends(get_idx2label),
+    scheduler=Depends(get_scheduler),
+    executor=Depends(get_executor),
 ):
     """
     Upload an image and get prediction from the specified model.
+
+    The image is either the multipart form field `file`, or the whole request body
+    with Content-Type application/octet-stream or image/*, which skips multipart
+    parsing entirely. `Accept: application/vnd.plant-prediction` returns the compact
+    binary encoding from services/prediction_format.py instead of JSON.
+
+    `top_k` adds the k most likely classes as top_predictions and drops the full
+    raw_output vector unless `include_probs=true`.
     """
+    if file is not None:
+        upload = file
+    else:
+        content_type = request.headers.get("content-type", "")
+        if content_type.lower().startswith("multipart/"):
+            raise HTTPException(status_code=422, detail="Form field 'file' is required")
+        if not is_raw_image_body(content_type):
+            raise HTTPException(
+                status_code=415,
+                detail="Send the image as multipart field 'file' or as an "
+                "application/octet-stream / image/* request body",
+            )
+        upload = await request.body()
+        if not upload:
+            raise HTTPException(status_code=400, detail="Empty request body")
+
     try:
         with MODEL_PREDICTION_LATENCY.labels(model_name=model_name).time():
-            result = await predict_service(model_name, file, manager, idx2label)
+            result = await predict_service(
+                model_name,
+                upload,
+                manager,
+                idx2label,
+                scheduler=scheduler,
+                executor=executor,
+                top_k=top_k,
+                include_probs=wants_probs(top_k, include_probs),
+            )
         MODEL_PREDICTIONS.labels(model_name=model_name).inc()
-        return result
+        return negotiated(request, result, [result])
+    except HTTPException:
+        # Keep the service's status code (e.g. 503 when the inference queue is full)
+        MODEL_PREDICTIONS_FAILED.labels(model_name=model_name).inc()
+        raise
     except Exception as e:
         MODEL_PREDICTIONS_FAILED.labels(model_name=model_name).inc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/predict-batch/{model_name}")
+async def predict_batch(
+    model_name: str,
+    request: Request,
+    files: List[UploadFile] = File(...),
+    top_k: Optional[int] = Query(None, ge=1),
+    include_probs: Optional[bool] = None,
+    manager=Depends(get_manager),
+    idx2label=Depends(get_idx2label),
+    executor=Depends(get_executor),
+):
+    """
+    Upload several images and get one prediction per image, in upload order.
+    Images that fail are reported in their own entry with an "error" field.
+    """
+    if len(files) > settings.BATCH_PREDICT_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BATCH_PREDICT_MAX_FILES} images per request",
+        )
+
+    with MODEL_PREDICTION_LATENCY.labels(model_name=model_name).time():
+        results = await predict_batch_service(
+            model_name,
+            files,
+            manager,
+            idx2label,
+            executor=executor,
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            top_k=top_k,
+            include_probs=wants_probs(top_k, include_probs),
+        )
+
+    failed = sum(1 for r in results if "error" in r)
+    MODEL_PREDICTIONS.labels(model_name=model_name).inc(len(results) - failed)
+    if failed:
+        MODEL_PREDICTIONS_FAILED.labels(model_name=model_name).inc(failed)
+    body = {"model": model_name, "count": len(results), "results": results}
+    return negotiated(request, body, results)
+
+
+@router.post("/predict-all")
+async def predict_all(
+    request: Request,
+    file: UploadFile = File(...),
+    models: Optional[str] = None,
+    top_k: Optional[int] = Query(None, ge=1),
+    include_probs: Optional[bool] = None,
+    manager=Depends(get_manager),
+    idx2label=Depends(get_idx2label),
+    executor=Depends(get_executor),
+):
+    """
+    Upload an image and get predictions from every model in one pass.
+    `models` optionally restricts the comparison to a comma-separated list of names.
+    """
+    model_names = (
+        [m.strip() for m in models.split(",") if m.strip()] if models else None
+    )
+    try:
+        with MODEL_PREDICT_ALL_LATENCY.time():
+            results = await predict_all_service(
+                file,
+                manager,
+                idx2label,
+                model_names=model_names,
+                executor=executor,
+                top_k=top_k,
+                include_probs=wants_probs(top_k, include_probs),
+            )
+    except HTTPException:
+        for name in model_names or []:
+            MODEL_PREDICTIONS_FAILED.labels(model_name=name).inc()
+        raise
+
+    for name in results:
+        MODEL_PREDICTIONS.labels(model_name=name).inc()
+    body = {"results": results, "count": len(results)}
+    return negotiated(request, body, list(results.values()))
+
+
 # Request body models
 class ModelFilterRequest(BaseModel):
     status: Optional[str] = None
@@ -53,35 +243,39 @@ class ModelIdRequest(BaseModel):
     model_id: str
 
 
-# GET endpoints (original)
+class ModelSwapRequest(BaseModel):
+    version: Optional[str] = None
+
+
+# GET endpoints (original), served from the catalog cache with ETag revalidation
 @router.get("/models")
 async def get_all_models(
-    status: Optional[str] = None, model_type: Optional[str] = None
+    request: Request, status: Optional[str] = None, model_type: Optional[str] = None
 ):
     """Get all models with optional filters via query parameters"""
-    models = await get_all_models_service(status, model_type)
-    return {"models": models, "count": len(models)}
+    models, etag = await get_all_models_catalog(status, model_type)
+    return catalog_response(request, {"models": models, "count": len(models)}, etag)
 
 
 @router.get("/models/active")
-async def get_active_models():
+async def get_active_models(request: Request):
     """Get only active models"""
-    models = await get_active_models_service()
-    return {"models": models, "count": len(models)}
+    models, etag = await get_all_models_catalog(status="active")
+    return catalog_response(request, {"models": models, "count": len(models)}, etag)
 
 
 @router.get("/models/alias/{alias}")
-async def get_model_by_alias(alias: str):
+async def get_model_by_alias(alias: str, request: Request):
     """Get model by alias via path parameter"""
-    model = await get_model_by_alias_service(alias)
-    return {"model": model}
+    model, etag = await get_model_by_alias_catalog(alias)
+    return catalog_response(request, {"model": model}, etag)
 
 
 @router.get("/models/{model_id}")
-async def get_model_by_id(model_id: str):
+async def get_model_by_id(model_id: str, request: Request):
     """Get model by ID via path parameter"""
-    model = await get_model_by_id_service(model_id)
-    return {"model": model}
+    model, etag = await get_model_by_id_catalog(model_id)
+    return catalog_response(request, {"model": model}, etag)
 
 
 # POST endpoints (for request body support in Postman)
@@ -93,6 +287,22 @@ async def search_models(request: ModelFilterRequest = Body(...)):
     return {"models": models, "count": len(models)}
 
 
+# Admin: roll a model over to new weights
+@router.post("/models/{model_name}/swap", dependencies=[Depends(verify_admin_token)])
+async def swap_model(
+    model_name: str,
+    request: Optional[ModelSwapRequest] = Body(None),
+    manager=Depends(get_manager),
+):
+    """
+    Load the current weights file of a model, warm it and switch traffic to it
+    without a restart. `version` (default: derived from the file) is recorded in
+    the models catalog.
+    """
+    version = request.version if request else None
+    return await swap_model_service(model_name, manager, version)
+
+
 # no test created for this
 
 
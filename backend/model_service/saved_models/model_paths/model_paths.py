@@ -11,3 +11,22 @@ EFFICIENTNET_B4_PATH = f"{BASE_MODEL_DIR}/efficientnet_b4_final_finetuned.pth"
 
 # Ensemble model (sklearn)
 ENSEMBLE_PATH = f"{BASE_MODEL_DIR}/logistic_meta_model.pkl"
+# Its coefficients as plain arrays (python -m tools.export_stacking_head)
+STACKING_HEAD_PATH = f"{BASE_MODEL_DIR}/stacking_head.npz"
+
+# Per-stage thresholds of the "cascade" model (python -m tools.cascade_thresholds)
+CASCADE_THRESHOLDS_PATH = f"{BASE_MODEL_DIR}/cascade_thresholds.json"
+
+# ONNX exports of the PyTorch models (python -m tools.export_onnx)
+ONNX_MODEL_DIR = f"{BASE_MODEL_DIR}/onnx"
+RESNET50_ONNX_PATH = f"{ONNX_MODEL_DIR}/resnet50.onnx"
+DENSENET121_ONNX_PATH = f"{ONNX_MODEL_DIR}/densenet121.onnx"
+MOBILENET_V3_ONNX_PATH = f"{ONNX_MODEL_DIR}/mobilenet_v3_large.onnx"
+EFFICIENTNET_B4_ONNX_PATH = f"{ONNX_MODEL_DIR}/efficientnet_b4.onnx"
+
+# INT8 quantized ONNX variants (python -m tools.quantize)
+INT8_MODEL_DIR = f"{BASE_MODEL_DIR}/int8"
+RESNET50_INT8_PATH = f"{INT8_MODEL_DIR}/resnet50_int8.onnx"
+DENSENET121_INT8_PATH = f"{INT8_MODEL_DIR}/densenet121_int8.onnx"
+MOBILENET_V3_INT8_PATH = f"{INT8_MODEL_DIR}/mobilenet_v3_large_int8.onnx"
+EFFICIENTNET_B4_INT8_PATH = f"{INT8_MODEL_DIR}/efficientnet_b4_int8.onnx"
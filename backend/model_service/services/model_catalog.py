@@ -0,0 +1,118 @@
+"""
+In-process cache of the `models` collection for the catalog GET endpoints.
+
+The collection changes about once per deploy while the frontend reads it on every
+page load, so query results are kept per (kind, filter) and served from memory.
+Entries are dropped when:
+
+- they are older than MODEL_CATALOG_TTL_SECONDS,
+- the change stream started by `watch` reports any write to the collection
+  (replica sets only; a standalone server falls back to the TTL), or
+- `db_conn.models_collection` is a different handle than the one they were read from
+  (e.g. after a reconnect).
+
+Every entry carries an ETag derived from its content, so it is the same across
+gunicorn workers and restarts, and clients revalidating with If-None-Match get a 304.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from config.config import settings
+from prometheus_metrics import MODEL_CATALOG_LOOKUPS
+
+
+def catalog_etag(value: Any) -> str:
+    """Strong ETag of a JSON-serializable catalog result"""
+    body = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.blake2b(body.encode(), digest_size=12).hexdigest() + '"'
+
+
+class ModelCatalog:
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        # Bumped on every invalidation; a fill that started before one is not stored
+        self.generation = 0
+        self._entries: Dict[Hashable, Tuple[Any, str, float]] = {}
+        self._collection = None
+
+    def invalidate(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def _bind(self, collection):
+        if collection is not self._collection:
+            self.invalidate()
+            self._collection = collection
+
+    def _fresh(self, key: Hashable) -> Optional[Tuple[Any, str, float]]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[2] <= self.ttl_seconds:
+            return entry
+        return None
+
+    async def get(
+        self,
+        collection,
+        key: Hashable,
+        load: Callable[[], Awaitable[Any]],
+        kind: str = "query",
+    ) -> Tuple[Any, str]:
+        """(value, etag) for `key`, calling `load` on a miss; callers get their own copy"""
+        self._bind(collection)
+        entry = self._fresh(key)
+        if entry is None:
+            MODEL_CATALOG_LOOKUPS.labels(kind=kind, result="miss").inc()
+            generation = self.generation
+            value = await load()
+            entry = (value, catalog_etag(value), time.monotonic())
+            # A write seen while loading may not be reflected in `value`
+            if generation == self.generation:
+                self._entries[key] = entry
+        else:
+            MODEL_CATALOG_LOOKUPS.labels(kind=kind, result="hit").inc()
+        return copy.deepcopy(entry[0]), entry[1]
+
+    async def watch(self, collection, retry_delay: float = 30.0):
+        """
+        Invalidate on every change to `collection` until cancelled. Change streams
+        need a replica set; when they are unavailable the TTL alone keeps entries
+        fresh.
+        """
+        if collection is None:
+            return
+        while True:
+            try:
+                async with collection.watch() as stream:
+                    print("👀 Watching the models collection for catalog changes")
+                    async for _ in stream:
+                        self.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 40573: "The $changeStream stage is only supported on replica sets"
+                if getattr(e, "code", None) == 40573 or "replica set" in str(e):
+                    print(
+                        "ℹ️ Change streams unavailable, model catalog refreshes "
+                        f"every {self.ttl_seconds:.0f}s"
+                    )
+                    return
+                print(f"⚠️ Model catalog change stream failed: {e}")
+            # Writes may have been missed while the stream was down
+            self.invalidate()
+            await asyncio.sleep(retry_delay)
+
+
+_catalog = None
+
+
+def get_catalog() -> ModelCatalog:
+    """The process-wide catalog cache"""
+    global _catalog
+    if _catalog is None:
+        _catalog = ModelCatalog(ttl_seconds=settings.MODEL_CATALOG_TTL_SECONDS)
+    return _catalog
@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+import db.connections as db_conn
+from manager import ModelManager
+from manager.checkpoint_watcher import CheckpointWatcher
+from services.model_catalog import get_catalog
+
+
+async def record_model_version(model_name: str, version: str):
+    """Reflect a swapped-in version in the models catalog (matched on alias)"""
+    if db_conn.models_collection is None:
+        return
+    try:
+        result = await db_conn.models_collection.update_one(
+            {"alias": model_name},
+            {
+                "$set": {"version": version, "updated_at": datetime.now(timezone.utc)},
+                "$unset": {"rollout": ""},
+            },
+        )
+        if result.matched_count == 0:
+            print(f"⚠️ No catalog entry with alias '{model_name}' to update")
+    except Exception as e:
+        print(f"⚠️ Could not record {model_name} version {version}: {e}")
+    # Other workers see the write through the change stream or the catalog TTL
+    get_catalog().invalidate()
+
+
+async def record_worker_swap(
+    model_name: str, version: str, slot: int, workers: int
+) -> bool:
+    """
+    Note on the catalog entry that worker `slot` serves `version` of `model_name`.
+    True once all `workers` do, so the version is recorded only then.
+    """
+    if workers <= 1 or db_conn.models_collection is None:
+        return True
+    try:
+        # The first worker to report a version starts its rollout afresh
+        await db_conn.models_collection.update_one(
+            {"alias": model_name, "rollout.version": {"$ne": version}},
+            {"$set": {"rollout": {"version": version, "workers": []}}},
+        )
+        entry = await db_conn.models_collection.find_one_and_update(
+            {"alias": model_name, "rollout.version": version},
+            {"$addToSet": {"rollout.workers": slot}},
+            return_document=ReturnDocument.AFTER,
+        )
+    except Exception as e:
+        print(f"⚠️ Could not record the swap of {model_name} in worker {slot}: {e}")
+        return False
+    if entry is None:
+        print(f"⚠️ No catalog entry with alias '{model_name}' to update")
+        return False
+    swapped = len(entry["rollout"]["workers"])
+    print(f"🔁 {model_name} version {version} served by {swapped}/{workers} workers")
+    return swapped >= workers
+
+
+async def swap_model_service(
+    model_name: str, manager, version: Optional[str] = None
+) -> dict:
+    """
+    Load, warm and swap in the current weights file of `model_name`.
+
+    Loading runs in a worker thread, so the event loop keeps serving requests (on
+    the old version) in the meantime.
+    """
+    if model_name not in manager.models:
+        raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
+    if not manager.allow_swap:
+        # Only the worker (or inference-host replica) handling this request would change
+        hint = (
+            "replace the checkpoint file with MODEL_WATCH_INTERVAL set to swap all of them"
+            if isinstance(manager, ModelManager)
+            else "restart the service to load new weights"
+        )
+        raise HTTPException(
+            status_code=409,
+            detail=f"Several processes serve the models; {hint}",
+        )
+
+    try:
+        result = await asyncio.to_thread(manager.swap_model, model_name, None, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Swapping {model_name} failed, still serving the old version: {e}")
+        raise HTTPException(status_code=500, detail=f"Model swap failed: {str(e)}")
+
+    await record_model_version(model_name, result["version"])
+    return result
+
+
+async def watch_checkpoints(manager, interval: float, workers: int = 1, slot: int = 0):
+    """
+    Swap in any model whose checkpoint file is replaced, until cancelled. Runs in
+    each of the `workers` processes (this one being `slot`); the catalog records
+    the new version once every one of them has swapped.
+    """
+    watcher = CheckpointWatcher(manager)
+    print(f"👀 Watching model checkpoints every {interval:g}s")
+    while True:
+        await asyncio.sleep(interval)
+        for name in await asyncio.to_thread(watcher.poll):
+            try:
+                result = await asyncio.to_thread(
+                    manager.swap_model, name, None, None, True
+                )
+            except Exception as e:
+                # Wait for the next replacement
+                print(f"❌ Swapping {name} failed, still serving the old version: {e}")
+            else:
+                if await record_worker_swap(name, result["version"], slot, workers):
+                    await record_model_version(name, result["version"])
+            watcher.mark_loaded(name)
@@ -0,0 +1,96 @@
+"""
+Compact binary encoding of prediction results, for service-to-service calls.
+
+Clients opt in with `Accept: application/vnd.plant-prediction` (float32 probabilities)
+or `application/vnd.plant-prediction; dtype=float16`; everything else gets JSON.
+
+Layout, little-endian:
+
+    magic     4s  b"PLNT"
+    version   B   1
+    dtype     B   1 = float32, 2 = float16
+    count     H   number of results
+    classes   H   probabilities per result
+    meta_len  I   bytes of JSON metadata that follow
+    meta          JSON list, one object per result: every field except a present
+                  raw_output
+    data          count x classes probabilities, row-major; NaN rows for results
+                  without probabilities (e.g. per-item errors in a batch)
+
+The probability vector, which dominates the JSON body, becomes 4 (or 2) bytes per
+class instead of ~20 characters of float text, and parses without a JSON float scan.
+"""
+
+import json
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+PREDICTION_MEDIA_TYPE = "application/vnd.plant-prediction"
+
+MAGIC = b"PLNT"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHHI")
+DTYPES = {"float32": (1, np.dtype("<f4")), "float16": (2, np.dtype("<f2"))}
+DTYPE_CODES = {code: dtype for code, dtype in DTYPES.values()}
+
+
+def negotiate_dtype(accept: str) -> Optional[str]:
+    """The binary dtype the Accept header asks for, or None for JSON"""
+    for part in accept.split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        if media_type.lower() != PREDICTION_MEDIA_TYPE:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "dtype" and value.strip().lower() in DTYPES:
+                return value.strip().lower()
+        return "float32"
+    return None
+
+
+def encode_predictions(results: List[dict], dtype: str = "float32") -> bytes:
+    """Encode result dicts (as built by format_prediction) into the binary layout"""
+    code, np_dtype = DTYPES[dtype]
+    rows = [r.get("raw_output") for r in results]
+    classes = max((len(row) for row in rows if row is not None), default=0)
+
+    data = np.full((len(results), classes), np.nan, dtype=np_dtype)
+    for i, row in enumerate(rows):
+        if row is not None:
+            data[i] = row
+
+    # Probabilities move to the data block; a null raw_output stays in the metadata
+    meta = json.dumps(
+        [
+            {k: v for k, v in r.items() if k != "raw_output" or v is None}
+            for r in results
+        ],
+        separators=(",", ":"),
+    ).encode()
+    header = HEADER.pack(MAGIC, VERSION, code, len(results), classes, len(meta))
+    return header + meta + data.tobytes()
+
+
+def decode_predictions(payload: bytes) -> List[dict]:
+    """Inverse of `encode_predictions`; raw_output comes back as a list of floats"""
+    magic, version, code, count, classes, meta_len = HEADER.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a plant-prediction payload")
+
+    offset = HEADER.size
+    meta = json.loads(payload[offset : offset + meta_len])
+    data = np.frombuffer(
+        payload,
+        dtype=DTYPE_CODES[code],
+        count=count * classes,
+        offset=offset + meta_len,
+    ).reshape(count, classes)
+
+    results = []
+    for item, row in zip(meta, data):
+        if classes and not np.isnan(row).all():
+            item["raw_output"] = row.astype(np.float64).tolist()
+        results.append(item)
+    return results
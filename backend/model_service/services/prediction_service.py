@@ -1,67 +1,279 @@
 from fastapi import UploadFile, HTTPException
 from PIL import Image
+import io
+import numpy as np
+import asyncio
+import time
 from manager import ModelManager
-from typing import List, Optional
+from manager.batcher import BatchScheduler
+from manager.executor import InferenceExecutor, InferenceQueueFull
+from manager.cache import CONTENT_HASH_KEY, content_hash
+from manager.manager import slice_output
+from manager.preprocessing import RESIZE_SIZE
+from config.config import settings
+from prometheus_metrics import IMAGE_DECODE_TIME
+from services.model_catalog import get_catalog
+from typing import List, Optional, Tuple, Union
 from bson import ObjectId
 import db.connections as db_conn
 
 
+def decode_image(data: bytes) -> Image.Image:
+    """Decode an upload to RGB, tagging it with a digest of the bytes for the prediction cache"""
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    image_format = (image.format or "unknown").lower()
+
+    # JPEG can decode straight to 1/2, 1/4 or 1/8 scale; draft() picks the smallest
+    # scale that keeps the short side at or above the preprocessing resize, so a 12 MP
+    # photo never gets decoded at full size. Other formats decode normally.
+    if settings.REDUCED_JPEG_DECODE and image_format == "jpeg":
+        image.draft("RGB", (RESIZE_SIZE, RESIZE_SIZE))
+
+    image = image.convert("RGB")
+    IMAGE_DECODE_TIME.labels(format=image_format).observe(time.perf_counter() - start)
+
+    image.info[CONTENT_HASH_KEY] = content_hash(data)
+    return image
+
+
+def _read_and_decode(file: Union[UploadFile, bytes]) -> Image.Image:
+    return decode_image(file if isinstance(file, bytes) else file.file.read())
+
+
+async def load_image(file: Union[UploadFile, bytes]) -> Image.Image:
+    """Read and decode an upload off the event loop; PIL releases the GIL while decoding"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _read_and_decode, file)
+
+
+def top_k_predictions(probs: np.ndarray, k: int, idx2label) -> List[dict]:
+    """The k most likely classes, best first, using a partial selection"""
+    k = min(k, probs.shape[-1])
+    top = np.argpartition(probs, -k)[-k:]  # O(C), unordered
+    top = top[np.argsort(probs[top])[::-1]]  # only the k winners get sorted
+    return [
+        {
+            "class_idx": int(i),
+            "label": idx2label[str(int(i))],
+            "confidence": float(probs[i]),
+        }
+        for i in top
+    ]
+
+
+def format_prediction(
+    model_name: str,
+    output,
+    idx2label,
+    top_k: Optional[int] = None,
+    include_probs: bool = True,
+) -> dict:
+    """
+    Turn one image's model output into the response body.
+
+    With `top_k`, the body also lists the k most likely classes; `include_probs`
+    controls whether the full probability vector is sent as raw_output.
+    """
+    # Handle sklearn vs torch output
+    if isinstance(output, tuple):
+        prediction, probs = output  # unpack tuple
+        predicted_idx = int(prediction[0])
+        probs = probs[0] if probs is not None else None
+    else:
+        probs = output[0]  # since output is (1, num_classes) numpy array
+        predicted_idx = int(probs.argmax())
+
+    result = {
+        "model": model_name,
+        "prediction": idx2label[str(predicted_idx)],
+        "confidence": float(probs[predicted_idx]) if probs is not None else None,
+    }
+
+    if top_k is not None:
+        if probs is not None:
+            result["top_predictions"] = top_k_predictions(probs, top_k, idx2label)
+        else:
+            # Meta-model without probabilities: only its own prediction is known
+            result["top_predictions"] = [
+                {
+                    "class_idx": predicted_idx,
+                    "label": result["prediction"],
+                    "confidence": None,
+                }
+            ]
+
+    if include_probs:
+        result["raw_output"] = probs.tolist() if probs is not None else None
+
+    return result
+
+
 async def predict_service(
-    model_name: str, file: UploadFile, manager: ModelManager, idx2label
+    model_name: str,
+    file: Union[UploadFile, bytes],
+    manager: ModelManager,
+    idx2label,
+    scheduler: Optional[BatchScheduler] = None,
+    executor: Optional[InferenceExecutor] = None,
+    top_k: Optional[int] = None,
+    include_probs: bool = True,
 ):
     try:
-        # Load image
-        image = Image.open(file.file).convert("RGB")
-
-        # Predict
-        output = manager.predict(model_name, image)
-
-        # Handle sklearn vs torch output
-        if model_name == "ensemble":
-            prediction, probs = output  # unpack tuple
-            predicted_idx = int(prediction[0])
-            predicted_class = idx2label[str(predicted_idx)]
-            confidence = float(probs[0][predicted_idx]) if probs is not None else None
-
-            result = {
-                "model": model_name,
-                "prediction": predicted_class,
-                "confidence": confidence,
-                "raw_output": probs[0].tolist() if probs is not None else None,
-            }
+        # Load image (raw request bodies arrive as bytes, multipart as an UploadFile)
+        image = await load_image(file)
+
+        # Predict (through the micro-batcher / inference executor when configured)
+        if scheduler is not None:
+            output = await scheduler.submit(model_name, image)
+        elif executor is not None:
+            output = await executor.run(manager.predict, model_name, image)
+        else:
+            output = manager.predict(model_name, image)
+
+        return format_prediction(
+            model_name, output, idx2label, top_k=top_k, include_probs=include_probs
+        )
 
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print("....THE ERROR....", str(e))
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+async def predict_batch_service(
+    model_name: str,
+    files: List[UploadFile],
+    manager: ModelManager,
+    idx2label,
+    executor: Optional[InferenceExecutor] = None,
+    max_batch_size: int = 16,
+    top_k: Optional[int] = None,
+    include_probs: bool = True,
+) -> List[dict]:
+    """
+    Predict every uploaded image with one model.
+
+    Uploads are decoded concurrently, then run through the model in tensor batches of
+    at most max_batch_size. Results come back in upload order; an image that cannot be
+    decoded or predicted gets an error entry instead of failing the whole request.
+    """
+    if model_name not in manager.models:
+        raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
+
+    # Decode off the event loop; PIL releases the GIL while decoding
+    loop = asyncio.get_running_loop()
+    payloads = [await file.read() for file in files]
+    decoded = await asyncio.gather(
+        *(loop.run_in_executor(None, decode_image, data) for data in payloads),
+        return_exceptions=True,
+    )
+
+    results: List[dict] = [None] * len(files)
+    ready = []
+    for i, image in enumerate(decoded):
+        if isinstance(image, Exception):
+            results[i] = {"error": f"Could not decode image: {image}"}
         else:
-            probs = output[0]  # since output is (1, num_classes) numpy array
-            predicted_idx = int(probs.argmax())
-            predicted_class = idx2label[str(predicted_idx)]
-            confidence = float(probs[predicted_idx])
+            ready.append((i, image))
+
+    for start in range(0, len(ready), max(1, max_batch_size)):
+        chunk = ready[start : start + max_batch_size]
+        images = [image for _, image in chunk]
+        try:
+            if executor is not None:
+                output = await executor.run(manager.predict_batch, model_name, images)
+            else:
+                output = manager.predict_batch(model_name, images)
+        except InferenceQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            print("....THE ERROR....", str(e))
+            for i, _ in chunk:
+                results[i] = {"error": f"Prediction failed: {e}"}
+            continue
+
+        for j, (i, _) in enumerate(chunk):
+            try:
+                results[i] = format_prediction(
+                    model_name,
+                    slice_output(output, j),
+                    idx2label,
+                    top_k=top_k,
+                    include_probs=include_probs,
+                )
+            except Exception as e:
+                results[i] = {"error": f"Prediction failed: {e}"}
+
+    return [
+        {"index": i, "filename": file.filename, **result}
+        for i, (file, result) in enumerate(zip(files, results))
+    ]
+
+
+async def predict_all_service(
+    file: UploadFile,
+    manager: ModelManager,
+    idx2label,
+    model_names: Optional[List[str]] = None,
+    executor: Optional[InferenceExecutor] = None,
+    top_k: Optional[int] = None,
+    include_probs: bool = True,
+) -> dict:
+    """
+    Predict one image with every model for side-by-side comparison. Each base model
+    runs once and the ensemble is computed from those same outputs.
+    """
+    unknown = [name for name in model_names or [] if name not in manager.models]
+    if unknown:
+        raise HTTPException(
+            status_code=404, detail=f"Model(s) not found: {', '.join(unknown)}"
+        )
+
+    try:
+        image = await load_image(file)
 
-            result = {
-                "model": model_name,
-                "prediction": predicted_class,
-                "confidence": confidence,
-                "raw_output": probs.tolist(),
-            }
+        if executor is not None:
+            outputs = await executor.run(manager.predict_all, [image], model_names)
+        else:
+            outputs = manager.predict_all([image], model_names)
 
-        return result
+        return {
+            name: format_prediction(
+                name, output, idx2label, top_k=top_k, include_probs=include_probs
+            )
+            for name, output in outputs.items()
+        }
 
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print("....THE ERROR....", str(e))
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
-async def get_all_models_service(
+def _stringify_ids(model: dict) -> dict:
+    """Convert ObjectId fields to strings for JSON serialization"""
+    if "_id" in model:
+        model["_id"] = str(model["_id"])
+    if "model_id" in model:
+        model["model_id"] = str(model["model_id"])
+    return model
+
+
+async def get_all_models_catalog(
     status: Optional[str] = None, model_type: Optional[str] = None
-) -> List[dict]:
+) -> Tuple[List[dict], str]:
     """
-    Fetch all model details from the database.
+    Models matching the filters, with their ETag, through the catalog cache.
 
     Args:
         status: Optional filter by status (active/deprecated)
         model_type: Optional filter by model type (CNN, ResNet, etc.)
 
     Returns:
-        List of model documents
+        (list of model documents, ETag)
     """
     try:
         # Build query filter
@@ -71,49 +283,63 @@ async def get_all_models_service(
         if model_type:
             query["type"] = model_type
 
-        # Fetch models from database
-        cursor = db_conn.models_collection.find(query)
-        models = await cursor.to_list(length=None)
+        async def load():
+            cursor = db_conn.models_collection.find(query)
+            models = await cursor.to_list(length=None)
+            return [_stringify_ids(model) for model in models]
 
-        # Convert ObjectId to string for JSON serialization
-        for model in models:
-            if "_id" in model:
-                model["_id"] = str(model["_id"])
-            if "model_id" in model:
-                model["model_id"] = str(model["model_id"])
-
-        return models
+        return await get_catalog().get(
+            db_conn.models_collection, ("models", status, model_type), load, "list"
+        )
 
     except Exception as e:
         print(f"Error fetching models: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch models: {str(e)}")
 
 
-async def get_model_by_alias_service(alias: str) -> dict:
+async def get_all_models_service(
+    status: Optional[str] = None, model_type: Optional[str] = None
+) -> List[dict]:
     """
-    Fetch a specific model by its alias.
+    Fetch all model details from the database.
+
+    Args:
+        status: Optional filter by status (active/deprecated)
+        model_type: Optional filter by model type (CNN, ResNet, etc.)
+
+    Returns:
+        List of model documents
+    """
+    models, _ = await get_all_models_catalog(status, model_type)
+    return models
+
+
+async def get_model_by_alias_catalog(alias: str) -> Tuple[dict, str]:
+    """
+    A model by its alias, with its ETag, through the catalog cache.
 
     Args:
         alias: Model alias (e.g., "densenet121")
 
     Returns:
-        Model document
+        (model document, ETag)
     """
     try:
-        model = await db_conn.models_collection.find_one({"alias": alias})
+
+        async def load():
+            model = await db_conn.models_collection.find_one({"alias": alias})
+            return _stringify_ids(model) if model else None
+
+        model, etag = await get_catalog().get(
+            db_conn.models_collection, ("alias", alias), load, "alias"
+        )
 
         if not model:
             raise HTTPException(
                 status_code=404, detail=f"Model with alias '{alias}' not found"
             )
 
-        # Convert ObjectId to string
-        if "_id" in model:
-            model["_id"] = str(model["_id"])
-        if "model_id" in model:
-            model["model_id"] = str(model["model_id"])
-
-        return model
+        return model, etag
 
     except HTTPException:
         raise
@@ -122,6 +348,20 @@ async def get_model_by_alias_service(alias: str) -> dict:
         raise HTTPException(status_code=500, detail=f"Failed to fetch model: {str(e)}")
 
 
+async def get_model_by_alias_service(alias: str) -> dict:
+    """
+    Fetch a specific model by its alias.
+
+    Args:
+        alias: Model alias (e.g., "densenet121")
+
+    Returns:
+        Model document
+    """
+    model, _ = await get_model_by_alias_catalog(alias)
+    return model
+
+
 async def get_active_models_service() -> List[dict]:
     """
     Fetch only active models.
@@ -132,38 +372,52 @@ async def get_active_models_service() -> List[dict]:
     return await get_all_models_service(status="active")
 
 
-async def get_model_by_id_service(model_id: str) -> dict:
+async def get_model_by_id_catalog(model_id: str) -> Tuple[dict, str]:
     """
-    Fetch a specific model by its ID.
+    A model by its ID, with its ETag, through the catalog cache.
 
     Args:
         model_id: Model ID (ObjectId as string)
 
     Returns:
-        Model document
+        (model document, ETag)
     """
     try:
         # Validate ObjectId format
         if not ObjectId.is_valid(model_id):
             raise HTTPException(status_code=400, detail="Invalid model ID format")
 
-        model = await db_conn.models_collection.find_one({"model_id": model_id})
+        async def load():
+            model = await db_conn.models_collection.find_one({"model_id": model_id})
+            return _stringify_ids(model) if model else None
+
+        model, etag = await get_catalog().get(
+            db_conn.models_collection, ("model_id", model_id), load, "model_id"
+        )
 
         if not model:
             raise HTTPException(
                 status_code=404, detail=f"Model with ID '{model_id}' not found"
             )
 
-        # Convert ObjectId to string
-        if "_id" in model:
-            model["_id"] = str(model["_id"])
-        if "model_id" in model:
-            model["model_id"] = str(model["model_id"])
-
-        return model
+        return model, etag
 
     except HTTPException:
         raise
     except Exception as e:
         print(f"Error fetching model: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch model: {str(e)}")
+
+
+async def get_model_by_id_service(model_id: str) -> dict:
+    """
+    Fetch a specific model by its ID.
+
+    Args:
+        model_id: Model ID (ObjectId as string)
+
+    Returns:
+        Model document
+    """
+    model, _ = await get_model_by_id_catalog(model_id)
+    return model
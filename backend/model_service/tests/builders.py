@@ -0,0 +1,80 @@
+"""Tiny stand-ins for the served models, shared by the unit tests"""
+
+from typing import Any, Optional, Sequence, Tuple
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from manager import ModelManager, PlantModel
+from manager.cache import PredictionCache
+
+BASE_MODELS = ("densenet121", "efficientnet_b4", "mobilenet_v3_large", "resnet50")
+
+
+def tiny_network(seed: Optional[int] = None, num_classes: int = 3) -> nn.Module:
+    """Averages the image into 2x2 cells and maps them to `num_classes` logits"""
+    if seed is not None:
+        torch.manual_seed(seed)
+    return nn.Sequential(
+        nn.AdaptiveAvgPool2d(2), nn.Flatten(), nn.Linear(12, num_classes)
+    ).eval()
+
+
+def constant_network(class_idx: int, num_classes: int = 3) -> nn.Module:
+    """Tiny network that always favours `class_idx`"""
+    linear = nn.Linear(3, num_classes)
+    with torch.no_grad():
+        linear.weight.zero_()
+        linear.bias.zero_()
+        linear.bias[class_idx] = 5.0
+    return nn.Sequential(nn.AdaptiveAvgPool2d(1), nn.Flatten(), linear).eval()
+
+
+def tiny_model(name: str, network: Optional[nn.Module] = None, **kwargs) -> PlantModel:
+    """PlantModel running `network` (default: a fresh tiny_network) instead of a checkpoint"""
+    kwargs.setdefault("model_path", "unused")
+    kwargs.setdefault("num_classes", 3)
+    network = tiny_network() if network is None else network
+    with patch.object(PlantModel, "load_model", return_value=network):
+        return PlantModel(name=name, model_type="pytorch", **kwargs)
+
+
+def mock_meta_model(probs: Sequence[float] = (0.9, 0.1)) -> MagicMock:
+    """Meta-model predicting class 0 with the same `probs` for every row"""
+    meta_model = MagicMock()
+    meta_model.predict.side_effect = lambda X: np.zeros(len(X), dtype=int)
+    meta_model.predict_proba.side_effect = lambda X: np.tile(probs, (len(X), 1))
+    return meta_model
+
+
+def ensemble_manager(
+    base_models: Sequence[str] = BASE_MODELS,
+    meta_model: Any = None,
+    cache: Optional[PredictionCache] = None,
+    parallel_base_models: bool = True,
+    seed: Optional[int] = None,
+) -> Tuple[ModelManager, Any]:
+    """
+    Tiny base models plus a stacking "ensemble" over them, and its meta-model
+    (default: mock_meta_model()). With a `seed`, base model i gets the weights of
+    tiny_network(seed + i), so managers built alike predict alike.
+    """
+    manager = ModelManager(cache=cache)
+    for i, name in enumerate(base_models):
+        network = tiny_network(None if seed is None else seed + i)
+        manager.register_model(tiny_model(name, network))
+
+    meta_model = mock_meta_model() if meta_model is None else meta_model
+    with patch.object(PlantModel, "load_model", return_value=meta_model):
+        manager.register_model(
+            PlantModel(
+                name="ensemble",
+                model_path="unused",
+                model_type="sklearn",
+                model_order=list(base_models),
+                parallel_base_models=parallel_base_models,
+            )
+        )
+    return manager, meta_model
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+# prometheus_metrics builds a multiprocess registry at import time,
+# which needs somewhere to write its shard files
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prom_"))
+
+import io
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from PIL import Image
+
+IDX2LABEL = {"0": "healthy", "1": "diseased", "2": "pest"}
+
+
+@pytest.fixture
+def client_and_manager():
+    """Prediction routes on a test client, backed by a mock manager"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from dependencies import get_executor, get_idx2label, get_manager, get_scheduler
+    from routes.prediction_route import router
+
+    manager = MagicMock()
+    manager.predict.return_value = np.array([[0.1, 0.8, 0.1]])
+
+    app = FastAPI()
+    app.include_router(router, prefix="/model")
+    app.dependency_overrides[get_manager] = lambda: manager
+    app.dependency_overrides[get_idx2label] = lambda: IDX2LABEL
+    app.dependency_overrides[get_scheduler] = lambda: None
+    app.dependency_overrides[get_executor] = lambda: None
+    return TestClient(app), manager
+
+
+@pytest.fixture
+def jpeg_bytes():
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 300), color="green").save(buf, format="JPEG")
+    return buf.getvalue()
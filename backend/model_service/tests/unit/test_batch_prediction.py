@@ -0,0 +1,161 @@
+import io
+import pytest
+import numpy as np
+from unittest.mock import MagicMock, AsyncMock
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from manager import ModelManager
+from services.prediction_service import predict_batch_service, predict_all_service
+from tests.builders import tiny_model
+
+IDX2LABEL = {"0": "healthy", "1": "diseased", "2": "pest"}
+
+
+def make_upload(filename, color="red", data=None):
+    """UploadFile stand-in holding a JPEG (or raw bytes when `data` is given)"""
+    if data is None:
+        buf = io.BytesIO()
+        Image.new("RGB", (280, 260), color=color).save(buf, format="JPEG")
+        data = buf.getvalue()
+    upload = MagicMock(spec=UploadFile)
+    upload.filename = filename
+    upload.read = AsyncMock(return_value=data)
+    return upload
+
+
+@pytest.mark.asyncio
+async def test_predict_batch_returns_results_in_upload_order():
+    """Each upload gets its own result, matching single-image predictions"""
+    manager = ModelManager()
+    manager.register_model(tiny_model("resnet50"))
+    files = [make_upload(f"{c}.jpg", c) for c in ("red", "green", "blue")]
+
+    results = await predict_batch_service("resnet50", files, manager, IDX2LABEL)
+
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert [r["filename"] for r in results] == ["red.jpg", "green.jpg", "blue.jpg"]
+    for upload, result in zip(files, results):
+        data = await upload.read()
+        expected = manager.predict(
+            "resnet50", Image.open(io.BytesIO(data)).convert("RGB")
+        )
+        np.testing.assert_allclose(result["raw_output"], expected[0], rtol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_predict_batch_reports_undecodable_image_per_item():
+    """A corrupt upload gets an error entry while the others still succeed"""
+    manager = ModelManager()
+    manager.register_model(tiny_model("resnet50"))
+    files = [
+        make_upload("ok.jpg"),
+        make_upload("broken.jpg", data=b"not an image"),
+        make_upload("ok2.jpg", "blue"),
+    ]
+
+    results = await predict_batch_service("resnet50", files, manager, IDX2LABEL)
+
+    assert "error" in results[1]
+    assert "prediction" not in results[1]
+    assert results[0]["prediction"] in IDX2LABEL.values()
+    assert results[2]["prediction"] in IDX2LABEL.values()
+
+
+@pytest.mark.asyncio
+async def test_predict_batch_splits_into_tensor_batches():
+    """Uploads run through predict_batch in chunks of max_batch_size"""
+    manager = MagicMock()
+    manager.models = {"resnet50": None}
+    manager.predict_batch.side_effect = lambda name, images: np.tile(
+        [[0.1, 0.7, 0.2]], (len(images), 1)
+    )
+    files = [make_upload(f"{i}.jpg") for i in range(5)]
+
+    results = await predict_batch_service(
+        "resnet50", files, manager, IDX2LABEL, max_batch_size=2
+    )
+
+    sizes = [len(call.args[1]) for call in manager.predict_batch.call_args_list]
+    assert sizes == [2, 2, 1]
+    assert all(r["prediction"] == "diseased" for r in results)
+
+
+@pytest.mark.asyncio
+async def test_predict_batch_ensemble_tuple_output():
+    """Ensemble batches unpack (prediction, probs) per image"""
+    manager = MagicMock()
+    manager.models = {"ensemble": None}
+    manager.predict_batch.return_value = (
+        np.array([2, 0]),
+        np.array([[0.1, 0.2, 0.7], [0.6, 0.3, 0.1]]),
+    )
+    files = [make_upload("a.jpg"), make_upload("b.jpg")]
+
+    results = await predict_batch_service("ensemble", files, manager, IDX2LABEL)
+
+    assert [r["prediction"] for r in results] == ["pest", "healthy"]
+    assert results[0]["confidence"] == pytest.approx(0.7)
+
+
+@pytest.mark.asyncio
+async def test_predict_batch_failed_chunk_does_not_fail_request():
+    """A model error marks that chunk's items as failed and the next chunk still runs"""
+    manager = MagicMock()
+    manager.models = {"resnet50": None}
+    manager.predict_batch.side_effect = [
+        RuntimeError("boom"),
+        np.array([[0.9, 0.05, 0.05]]),
+    ]
+    files = [make_upload(f"{i}.jpg") for i in range(3)]
+
+    results = await predict_batch_service(
+        "resnet50", files, manager, IDX2LABEL, max_batch_size=2
+    )
+
+    assert "boom" in results[0]["error"] and "boom" in results[1]["error"]
+    assert results[2]["prediction"] == "healthy"
+
+
+@pytest.mark.asyncio
+async def test_predict_batch_unknown_model():
+    """Unknown model names fail the request up front"""
+    manager = MagicMock()
+    manager.models = {}
+
+    with pytest.raises(HTTPException) as exc_info:
+        await predict_batch_service("vgg", [make_upload("a.jpg")], manager, IDX2LABEL)
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_predict_all_formats_every_model():
+    """predict-all formats base probability arrays and the ensemble tuple alike"""
+    manager = MagicMock()
+    manager.models = {"resnet50": None, "ensemble": None}
+    manager.predict_all.return_value = {
+        "resnet50": np.array([[0.2, 0.5, 0.3]]),
+        "ensemble": (np.array([2]), np.array([[0.1, 0.1, 0.8]])),
+    }
+    upload = MagicMock(spec=UploadFile)
+    upload.file = io.BytesIO(await make_upload("a.jpg").read())
+
+    results = await predict_all_service(upload, manager, IDX2LABEL)
+
+    assert results["resnet50"]["prediction"] == "diseased"
+    assert results["ensemble"]["prediction"] == "pest"
+    assert results["ensemble"]["confidence"] == pytest.approx(0.8)
+    manager.predict_all.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_predict_all_unknown_model():
+    """Asking to compare an unregistered model is a 404"""
+    manager = MagicMock()
+    manager.models = {"resnet50": None}
+    upload = MagicMock(spec=UploadFile)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await predict_all_service(upload, manager, IDX2LABEL, model_names=["vgg"])
+
+    assert exc_info.value.status_code == 404
@@ -0,0 +1,93 @@
+import pytest
+import asyncio
+import numpy as np
+from unittest.mock import MagicMock
+from PIL import Image
+from manager import ModelManager
+from manager.batcher import BatchScheduler, MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_batcher_groups_concurrent_requests():
+    """Concurrent submits should be served by a single predict_batch call"""
+    mock_manager = MagicMock()
+    mock_manager.predict_batch.side_effect = lambda name, images: np.arange(
+        len(images) * 2, dtype=float
+    ).reshape(len(images), 2)
+
+    batcher = MicroBatcher(mock_manager, "resnet50", max_batch_size=8, max_wait_ms=50)
+    results = await asyncio.gather(*[batcher.submit(f"img{i}") for i in range(4)])
+    await batcher.close()
+
+    mock_manager.predict_batch.assert_called_once()
+    assert mock_manager.predict_batch.call_args[0][1] == [
+        "img0",
+        "img1",
+        "img2",
+        "img3",
+    ]
+    for i, result in enumerate(results):
+        assert result.shape == (1, 2)
+        assert result[0].tolist() == [2 * i, 2 * i + 1]
+
+
+@pytest.mark.asyncio
+async def test_batcher_respects_max_batch_size():
+    """Requests beyond max_batch_size go into a following batch"""
+    mock_manager = MagicMock()
+    mock_manager.predict_batch.side_effect = lambda name, images: np.ones(
+        (len(images), 2)
+    )
+
+    batcher = MicroBatcher(mock_manager, "resnet50", max_batch_size=2, max_wait_ms=50)
+    await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+    await batcher.close()
+
+    sizes = [len(call[0][1]) for call in mock_manager.predict_batch.call_args_list]
+    assert sum(sizes) == 5
+    assert max(sizes) <= 2
+
+
+@pytest.mark.asyncio
+async def test_batcher_scatters_ensemble_tuples():
+    """Ensemble output (prediction, probs) is split per request"""
+    mock_manager = MagicMock()
+    mock_manager.predict_batch.return_value = (
+        np.array([1, 0]),
+        np.array([[0.2, 0.8], [0.9, 0.1]]),
+    )
+
+    batcher = MicroBatcher(mock_manager, "ensemble", max_batch_size=2, max_wait_ms=50)
+    first, second = await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+    await batcher.close()
+
+    assert first[0].tolist() == [1]
+    assert first[1].tolist() == [[0.2, 0.8]]
+    assert second[0].tolist() == [0]
+    assert second[1].tolist() == [[0.9, 0.1]]
+
+
+@pytest.mark.asyncio
+async def test_batcher_propagates_errors_to_all_waiters():
+    """A failing batch fails every request in it"""
+    mock_manager = MagicMock()
+    mock_manager.predict_batch.side_effect = RuntimeError("forward failed")
+
+    batcher = MicroBatcher(mock_manager, "resnet50", max_batch_size=4, max_wait_ms=20)
+    results = await asyncio.gather(
+        batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+    )
+    await batcher.close()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_unknown_model():
+    """Unknown model names don't get a batcher"""
+    manager = ModelManager()
+    scheduler = BatchScheduler(manager)
+
+    with pytest.raises(ValueError):
+        await scheduler.submit("vgg16", Image.new("RGB", (32, 32)))
+    assert scheduler.batchers == {}
@@ -0,0 +1,101 @@
+import json
+import pytest
+from tools.bench_models import compare_reports, main, run_benchmark
+
+
+def result(**overrides):
+    values = dict(
+        model="resnet50",
+        backend="pytorch",
+        threads=2,
+        batch_size=8,
+        resolution="640x480",
+        p50_ms=100.0,
+        p95_ms=120.0,
+        p99_ms=150.0,
+        images_per_sec=80.0,
+        peak_rss_mb=900.0,
+    )
+    values.update(overrides)
+    return values
+
+
+def report(*results, **environment):
+    return {"environment": {"torch": "2.0", **environment}, "results": list(results)}
+
+
+def test_random_weights_sweep_reports_every_configuration():
+    bench = run_benchmark(
+        models=["mobilenet_v3_small"],
+        backends=["pytorch", "int8"],
+        batch_sizes=[1, 2],
+        threads=[1],
+        resolutions=[(64, 48), (96, 72)],
+        iterations=3,
+        warmup=1,
+        num_classes=3,
+    )
+
+    assert len(bench["results"]) == 4
+    assert bench["skipped"] == [
+        {
+            "model": "mobilenet_v3_small",
+            "backend": "int8",
+            "reason": "no INT8 export (python -m tools.quantize)",
+        }
+    ]
+    for r in bench["results"]:
+        assert r["weights"] == "random"
+        assert 0 < r["p50_ms"] <= r["p95_ms"] <= r["p99_ms"]
+        assert r["images_per_sec"] > 0
+        assert r["peak_rss_mb"] > 0
+    json.dumps(bench)  # machine-readable as-is
+
+
+def test_compare_flags_changes_beyond_threshold():
+    baseline = report(
+        result(),
+        result(batch_size=1, p50_ms=20.0, images_per_sec=50.0),
+    )
+    current = report(
+        result(p50_ms=130.0, p95_ms=125.0),  # +30% latency, +4% within noise
+        result(batch_size=1, p50_ms=20.0, images_per_sec=40.0),  # -20% throughput
+        result(batch_size=32),  # not benchmarked before
+        torch="2.1",
+    )
+
+    comparison = compare_reports(current, baseline, threshold=0.10)
+
+    assert {(r["batch_size"], r["metric"]) for r in comparison["regressions"]} == {
+        (8, "p50_ms"),
+        (1, "images_per_sec"),
+    }
+    assert comparison["improvements"] == []
+    assert [u["batch_size"] for u in comparison["unmatched"]] == [32]
+    assert comparison["environment_differences"] == {
+        "torch": {"baseline": "2.0", "current": "2.1"}
+    }
+
+
+def test_faster_results_are_improvements():
+    comparison = compare_reports(
+        report(result(p50_ms=50.0, images_per_sec=160.0)), report(result())
+    )
+
+    assert comparison["regressions"] == []
+    assert {r["metric"] for r in comparison["improvements"]} == {
+        "p50_ms",
+        "images_per_sec",
+    }
+
+
+def test_compare_mode_exits_non_zero_on_regression(tmp_path):
+    baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+    baseline.write_text(json.dumps(report(result())))
+    current.write_text(json.dumps(report(result(peak_rss_mb=1200.0))))
+
+    with pytest.raises(SystemExit) as exc:
+        main(["--compare", str(current), "--baseline", str(baseline)])
+    assert exc.value.code == 1
+
+    main(["--compare", str(baseline), "--baseline", str(baseline)])
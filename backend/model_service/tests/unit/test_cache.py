@@ -0,0 +1,166 @@
+import time
+import numpy as np
+import torch.nn as nn
+from unittest.mock import patch
+from PIL import Image
+from manager import PlantModel
+from manager.cache import CONTENT_HASH_KEY, PredictionCache, content_hash
+from manager.context import PredictionContext
+from tests.builders import ensemble_manager
+
+
+def make_image(color, digest=None):
+    image = Image.new("RGB", (256, 256), color=color)
+    if digest:
+        image.info[CONTENT_HASH_KEY] = digest
+    return image
+
+
+BASE_MODELS = ("densenet121", "resnet50")
+
+
+def test_content_hash_is_stable_and_content_addressed():
+    assert content_hash(b"leaf") == content_hash(b"leaf")
+    assert content_hash(b"leaf") != content_hash(b"leaf!")
+
+
+def test_cache_lru_eviction_respects_byte_bound():
+    """Oldest entries go first once the memory bound is exceeded"""
+    row = np.zeros((1, 16))  # 128 bytes
+    cache = PredictionCache(max_bytes=3 * row.nbytes)
+    for digest in ("a", "b", "c"):
+        cache.put(digest, "resnet50", "1", row)
+
+    cache.get("a", "resnet50", "1")  # refresh "a"
+    cache.put("d", "resnet50", "1", row)
+
+    assert cache.get("b", "resnet50", "1") is None
+    assert cache.get("a", "resnet50", "1") is not None
+    assert cache.size_bytes <= cache.max_bytes
+
+
+def test_cache_stores_rows_without_their_batch():
+    """A cached row is a copy, not a view pinning the whole batch output"""
+    cache = PredictionCache(max_bytes=2**20)
+    batch = np.random.rand(64, 10).astype(np.float32)
+    labels = np.arange(64)
+
+    cache.put("a", "resnet50", "1.0", batch[3:4])
+    cache.put("b", "ensemble", "1.0", (labels[5:6], batch[5:6]))
+
+    row = cache.get("a", "resnet50", "1.0")
+    prediction, probs = cache.get("b", "ensemble", "1.0")
+    assert row.base is None and not np.shares_memory(row, batch)
+    assert prediction.base is None and probs.base is None
+    np.testing.assert_array_equal(row, batch[3:4])
+    assert cache.size_bytes == row.nbytes + prediction.nbytes + probs.nbytes
+
+
+def test_cache_ttl_expiry():
+    cache = PredictionCache(ttl_seconds=0.01)
+    cache.put("a", "resnet50", "1", np.ones((1, 3)))
+    time.sleep(0.02)
+
+    assert cache.get("a", "resnet50", "1") is None
+    assert len(cache) == 0
+
+
+def test_cache_key_includes_model_version():
+    cache = PredictionCache()
+    cache.put("a", "resnet50", "1", np.ones((1, 3)))
+
+    assert cache.get("a", "resnet50", "2") is None
+
+
+def test_repeated_upload_skips_forward_pass():
+    """A second request for the same bytes is answered from the cache"""
+    manager, _ = ensemble_manager(BASE_MODELS, cache=PredictionCache())
+    first = manager.predict("resnet50", make_image("red", "digest-1"))
+
+    with patch.object(PlantModel, "_forward_probs") as mock_forward:
+        second = manager.predict("resnet50", make_image("red", "digest-1"))
+
+    mock_forward.assert_not_called()
+    np.testing.assert_array_equal(first, second)
+
+
+def test_batch_only_runs_cache_misses():
+    """Cached rows are stitched back in order around the freshly computed ones"""
+    manager, _ = ensemble_manager(BASE_MODELS, cache=PredictionCache())
+    cached = manager.predict("resnet50", make_image("red", "red"))
+
+    images = [make_image("blue", "blue"), make_image("red", "red")]
+    original = PlantModel.predict_batch
+    batch_sizes = []
+
+    def tracking_predict_batch(self, imgs, manager=None):
+        batch_sizes.append(len(imgs))
+        return original(self, imgs, manager=manager)
+
+    with patch.object(PlantModel, "predict_batch", tracking_predict_batch):
+        probs = manager.predict_batch("resnet50", images)
+
+    assert batch_sizes == [1]
+    assert probs.shape == (2, 3)
+    np.testing.assert_array_equal(probs[1:2], cached)
+
+
+def test_ensemble_reuses_cached_base_probabilities():
+    """Base outputs cached by earlier single-model requests feed the ensemble"""
+    manager, meta_model = ensemble_manager(BASE_MODELS, cache=PredictionCache())
+    image = make_image("green", "green")
+    dense = manager.predict("densenet121", image)
+    res = manager.predict("resnet50", image)
+
+    with patch.object(PlantModel, "_forward_probs") as mock_forward:
+        manager.predict("ensemble", image)
+
+    mock_forward.assert_not_called()
+    np.testing.assert_array_equal(
+        meta_model.predict.call_args[0][0], np.concatenate([dense, res], axis=1)
+    )
+
+
+def test_images_without_digest_bypass_cache():
+    cache = PredictionCache()
+    manager, _ = ensemble_manager(BASE_MODELS, cache=cache)
+
+    manager.predict("resnet50", make_image("red"))
+
+    assert len(cache) == 0
+
+
+def ensemble_version(manager, models=None):
+    models = manager.models if models is None else models
+    return manager._cache_version(models, models["ensemble"])
+
+
+def test_swap_invalidates_model_and_dependent_ensemble():
+    cache = PredictionCache()
+    manager, _ = ensemble_manager(BASE_MODELS, cache=cache)
+    image = make_image("red", "red")
+    manager.predict("ensemble", image)
+    manager.predict("densenet121", image)
+    before = ensemble_version(manager)
+    assert cache.get("red", "ensemble", before) is not None
+
+    with patch.object(PlantModel, "load_model", return_value=nn.Identity()):
+        manager.swap_model("resnet50", version="2")
+
+    assert cache.get("red", "resnet50", "1") is None
+    assert cache.get("red", "ensemble", before) is None
+    assert cache.get("red", "densenet121", "1") is not None
+
+
+def test_ensemble_cached_under_versions_of_its_base_models():
+    """Rows from a request still running on the pre-swap models never match after it"""
+    cache = PredictionCache()
+    manager, _ = ensemble_manager(BASE_MODELS, cache=cache)
+    snapshot = PredictionContext(manager)
+
+    with patch.object(PlantModel, "load_model", return_value=nn.Identity()):
+        manager.swap_model("resnet50", version="2")
+    snapshot.predict_batch("ensemble", [make_image("red", "red")])
+
+    assert ensemble_version(manager) != ensemble_version(manager, snapshot.models)
+    assert cache.get("red", "ensemble", ensemble_version(manager)) is None
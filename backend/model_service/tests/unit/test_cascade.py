@@ -0,0 +1,160 @@
+import numpy as np
+from unittest.mock import patch
+from PIL import Image
+from manager import CascadeModel, PlantModel
+from manager.cascade import accepts
+from tests.builders import ensemble_manager
+from tools.cascade_thresholds import (
+    evaluate_cascade,
+    labelled_paths,
+    search_thresholds,
+    stage_outputs,
+)
+
+STAGES = ["mobilenet_v3_large", "efficientnet_b4", "ensemble"]
+
+
+def make_cascade_manager(confidence, margin=0.0):
+    manager, meta_model = ensemble_manager(parallel_base_models=False)
+    meta_model.predict.side_effect = lambda X: np.zeros(len(X), dtype=int)
+    meta_model.predict_proba.side_effect = lambda X: np.tile(
+        [0.7, 0.2, 0.1], (len(X), 1)
+    )
+    manager.register_model(
+        CascadeModel(
+            name="cascade",
+            stages=STAGES,
+            default_confidence=confidence,
+            default_margin=margin,
+        )
+    )
+    return manager, meta_model
+
+
+def count_forwards(manager, images):
+    original = PlantModel._forward_probs
+    calls = []
+
+    def counting_forward(self, input_tensor):
+        calls.append((self.name, len(input_tensor)))
+        return original(self, input_tensor)
+
+    with patch.object(PlantModel, "_forward_probs", counting_forward):
+        output = manager.predict_batch("cascade", images)
+    return output, calls
+
+
+def test_accepts_checks_confidence_and_margin():
+    probs = np.array([[0.9, 0.05, 0.05], [0.5, 0.45, 0.05], [0.4, 0.3, 0.3]])
+    assert accepts(probs, 0.45, 0.0).tolist() == [True, True, False]
+    assert accepts(probs, 0.45, 0.2).tolist() == [True, False, False]
+
+
+def test_confident_first_stage_answers_alone():
+    """With a permissive threshold only mobilenet runs"""
+    manager, meta_model = make_cascade_manager(confidence=0.0)
+    images = [Image.new("RGB", (256, 256), color=c) for c in ("red", "blue")]
+
+    (prediction, probs), calls = count_forwards(manager, images)
+
+    assert calls == [("mobilenet_v3_large", 2)]
+    np.testing.assert_allclose(
+        probs, manager.predict_batch("mobilenet_v3_large", images), rtol=1e-6
+    )
+    assert prediction.tolist() == probs.argmax(axis=1).tolist()
+    meta_model.predict.assert_not_called()
+
+
+def test_escalation_reuses_earlier_stage_outputs():
+    """Images reaching the ensemble don't re-run mobilenet or efficientnet"""
+    manager, meta_model = make_cascade_manager(confidence=1.01)
+    images = [Image.new("RGB", (256, 256), color=c) for c in ("red", "blue")]
+
+    (prediction, probs), calls = count_forwards(manager, images)
+
+    assert sorted(name for name, _ in calls) == sorted(
+        manager.models["ensemble"].model_order
+    )
+    assert prediction.tolist() == [0, 0]
+    np.testing.assert_allclose(probs, [[0.7, 0.2, 0.1]] * 2)
+    # The meta-model saw the stage outputs in training order
+    features = meta_model.predict.call_args[0][0]
+    np.testing.assert_allclose(
+        features[:, 6:9],
+        manager.predict_batch("mobilenet_v3_large", images),
+        rtol=1e-6,
+    )
+
+
+def test_escalates_only_unconfident_images():
+    """Each image exits at the first stage that is confident about it"""
+    manager, _ = make_cascade_manager(confidence=0.5)
+    images = [Image.new("RGB", (256, 256), color=c) for c in ("red", "blue")]
+    first = manager.predict_batch("mobilenet_v3_large", images)
+    threshold = float(np.sort(first.max(axis=1)).mean())
+    manager.models["cascade"] = CascadeModel(
+        "cascade", STAGES, default_confidence=threshold
+    )
+
+    _, calls = count_forwards(manager, images)
+
+    assert calls[0] == ("mobilenet_v3_large", 2)
+    assert all(size == 1 for _, size in calls[1:])
+
+
+def test_thresholds_change_cached_version():
+    assert (
+        CascadeModel("cascade", STAGES, default_confidence=0.9).version
+        != CascadeModel("cascade", STAGES, default_confidence=0.8).version
+    )
+
+
+def test_search_thresholds_prefers_cheapest_config_reaching_target():
+    labels = np.array([0, 1, 0, 1])
+    # Cheap stage is confidently right on the first two images and unsure on the rest
+    cheap = np.array([[0.95, 0.05], [0.05, 0.95], [0.55, 0.45], [0.6, 0.4]])
+    full = np.array([[0.9, 0.1], [0.1, 0.9], [0.8, 0.2], [0.2, 0.8]])
+
+    thresholds, result = search_thresholds(
+        [cheap, full], labels, stage_costs=[1.0, 10.0], target_accuracy=1.0
+    )
+
+    assert result["accuracy"] == 1.0
+    assert result["exit_rates"] == [0.5, 0.5]
+    assert result["cost"] == 1.0 + 10.0 * 0.5
+    assert evaluate_cascade([cheap, full], labels, thresholds, [1.0, 10.0]) == result
+
+
+def test_coordinate_search_for_large_grids():
+    """Past max_combinations the search goes stage by stage and stays consistent"""
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, 3, 200)
+    stages = [rng.dirichlet(np.ones(3), 200) for _ in range(3)]
+    stages.append(np.eye(3)[labels] * 0.9 + 0.05)  # last stage always right
+    costs = [1.0, 2.0, 4.0, 10.0]
+
+    thresholds, result = search_thresholds(
+        stages, labels, costs, target_accuracy=0.95, max_combinations=0
+    )
+
+    assert len(thresholds) == 3
+    assert result["accuracy"] >= 0.95
+    assert result["cost"] < sum(costs)
+    assert evaluate_cascade(stages, labels, thresholds, costs) == result
+
+
+def test_stage_outputs_streams_labelled_folder(tmp_path):
+    """Photos are read from disk batch by batch and every stage gets a row each"""
+    manager, _ = make_cascade_manager(confidence=0.9)
+    idx2label = {"0": "apple/scab", "1": "corn/healthy", "2": "grape/rot"}
+    for label, color in (("apple/scab", "red"), ("corn/healthy", "green")):
+        folder = tmp_path / label
+        folder.mkdir(parents=True)
+        for i in range(3):
+            Image.new("RGB", (300, 260), color=color).save(folder / f"{i}.jpg")
+
+    paths, labels = labelled_paths(str(tmp_path), idx2label)
+    probs = stage_outputs(manager, STAGES, paths, batch_size=4)
+
+    assert labels.tolist() == [0, 0, 0, 1, 1, 1]
+    assert [p.shape for p in probs] == [(6, 3)] * 3
@@ -0,0 +1,128 @@
+import random
+import threading
+import numpy as np
+import pytest
+from unittest.mock import patch
+from PIL import Image
+from manager import CascadeModel, PlantModel
+from manager.cache import CONTENT_HASH_KEY, PredictionCache
+from manager.context import PredictionContext
+from manager.stacking_head import StackingHead
+from tests.builders import ensemble_manager, tiny_network
+
+
+def build_manager(cache=None, parallel=True):
+    """Seeded base models, a numpy stacking head over them and a cascade"""
+    rng = np.random.default_rng(0)
+    head = StackingHead(rng.normal(size=(3, 12)), rng.normal(size=3), np.arange(3))
+    manager, _ = ensemble_manager(
+        meta_model=head, cache=cache, parallel_base_models=parallel, seed=0
+    )
+    manager.register_model(
+        CascadeModel(
+            "cascade", ["mobilenet_v3_large", "ensemble"], default_confidence=0.4
+        )
+    )
+    return manager
+
+
+def make_images(count):
+    rng = np.random.default_rng(1)
+    images = []
+    for i in range(count):
+        pixels = rng.integers(0, 256, (64, 48, 3), dtype=np.uint8)
+        image = Image.fromarray(pixels)
+        if i % 3:  # some uploads carry a digest (cacheable), some don't
+            image.info[CONTENT_HASH_KEY] = f"image-{i}"
+        images.append(image)
+    return images
+
+
+def as_probs(output):
+    return output[1] if isinstance(output, tuple) else output
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_concurrent_predictions_match_sequential(parallel):
+    """Many threads mixing predict / predict_batch / predict_all get exact answers"""
+    images = make_images(12)
+    reference_manager = build_manager(parallel=False)
+    model_names = list(reference_manager.models)
+    reference = {
+        name: as_probs(reference_manager.predict_batch(name, images))
+        for name in model_names
+    }
+
+    manager = build_manager(cache=PredictionCache(), parallel=parallel)
+    errors = []
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        for _ in range(30):
+            name = rnd.choice(model_names)
+            picked = rnd.sample(range(len(images)), rnd.randint(1, 4))
+            try:
+                op = rnd.choice(("predict", "predict_batch", "predict_all"))
+                if op == "predict":
+                    got = {name: manager.predict(name, images[picked[0]])}
+                    picked = picked[:1]
+                elif op == "predict_batch":
+                    got = {
+                        name: manager.predict_batch(name, [images[i] for i in picked])
+                    }
+                else:
+                    got = manager.predict_all([images[i] for i in picked])
+                for got_name, output in got.items():
+                    np.testing.assert_allclose(
+                        as_probs(output),
+                        reference[got_name][picked],
+                        rtol=1e-5,
+                        atol=1e-6,
+                    )
+            except Exception as e:
+                errors.append(f"{op} {name} {picked}: {e!r}")
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+
+
+def test_models_keep_no_per_call_state():
+    manager = build_manager()
+    before = {name: dict(vars(m)) for name, m in manager.models.items()}
+
+    manager.predict_all(make_images(3))
+    manager.predict_batch("cascade", make_images(2))
+
+    for name, model in manager.models.items():
+        assert not hasattr(model, "last_output")
+        changed = {
+            key
+            for key, value in vars(model).items()
+            if key not in before[name] or before[name][key] is not value
+        }
+        # Only lazily created thread pools may appear after the first call
+        assert changed <= {"_base_executor"}, (name, changed)
+
+
+def test_context_pins_models_across_a_swap():
+    manager = build_manager()
+    context = PredictionContext(manager)
+    pinned = context.get_model("resnet50")
+
+    with patch.object(PlantModel, "load_model", return_value=tiny_network(9)):
+        manager.swap_model("resnet50", version="2")
+
+    assert context.get_model("resnet50") is pinned
+    assert manager.models["resnet50"] is not pinned
+    # The ensemble inside this request still runs against the pinned base model
+    expected = pinned.predict_batch(make_images(1))
+    with patch.object(
+        manager.models["resnet50"], "_forward_probs", side_effect=AssertionError
+    ):
+        base = context.get_model("ensemble").base_model_probs(make_images(1), context)
+    np.testing.assert_allclose(base["resnet50"], expected, rtol=1e-6)
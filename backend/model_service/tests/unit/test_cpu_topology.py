@@ -0,0 +1,144 @@
+import importlib.util
+import os
+import pytest
+import subprocess
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+from manager.cpu_topology import (
+    PROCESSES_ENV,
+    WORKER_SLOT_ENV,
+    cgroup_cpu_limit,
+    plan_from_settings,
+    plan_threads,
+)
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_cgroup_v2_quota(tmp_path):
+    write(tmp_path / "cpu.max", "250000 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == 2.5
+
+    write(tmp_path / "cpu.max", "max 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    write(tmp_path / "cpu,cpuacct" / "cpu.cfs_quota_us", "400000\n")
+    write(tmp_path / "cpu,cpuacct" / "cpu.cfs_period_us", "100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == 4.0
+
+    write(tmp_path / "cpu,cpuacct" / "cpu.cfs_quota_us", "-1\n")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_no_cgroup_limit(tmp_path):
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+@pytest.mark.parametrize(
+    "cpus, quota, processes, workers, expected",
+    [
+        (8, None, 4, 1, 2),  # 8 cores shared by 4 gunicorn workers
+        (8, None, 1, 2, 4),  # two concurrent inference threads in one process
+        (64, 2.5, 1, 1, 2),  # container quota below the visible cores, rounded down
+        (4, 0.5, 4, 1, 1),  # never below one thread
+    ],
+)
+def test_intra_op_threads_split_usable_cpus(cpus, quota, processes, workers, expected):
+    plan = plan_threads(
+        processes=processes,
+        inference_workers=workers,
+        cpus=range(cpus),
+        quota=quota,
+    )
+
+    assert plan.intra_op_threads == expected
+    assert plan.inter_op_threads == 1
+
+
+def test_explicit_threads_and_off_mode():
+    plan = plan_threads(processes=4, intra_op_threads=3, cpus=range(8), quota=None)
+    assert plan.intra_op_threads == 3
+
+    plan = plan_threads(processes=4, mode="off", cpus=range(8), quota=None)
+    assert (plan.intra_op_threads, plan.inter_op_threads) == (0, 0)
+
+
+def test_affinity_gives_each_process_its_own_cpus():
+    slices = [
+        plan_threads(
+            processes=3, slot=slot, affinity=True, cpus=range(8), quota=None
+        ).affinity
+        for slot in range(3)
+    ]
+
+    assert slices == [[0, 1], [2, 3], [4, 5]]
+
+
+def make_settings(**overrides):
+    values = dict(
+        INFERENCE_MODE="local",
+        INFERENCE_HOST_REPLICAS=2,
+        INFERENCE_WORKERS=1,
+        TORCH_INTRA_OP_THREADS=0,
+        TORCH_INTER_OP_THREADS=0,
+        CPU_AFFINITY=False,
+        CPU_TOPOLOGY="auto",
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_plan_from_settings_reads_gunicorn_worker_env():
+    env = {PROCESSES_ENV: "4", WORKER_SLOT_ENV: "3"}
+    with patch.dict(os.environ, env), patch(
+        "manager.cpu_topology.allowed_cpus", return_value=list(range(8))
+    ), patch("manager.cpu_topology.cgroup_cpu_limit", return_value=None):
+        worker = plan_from_settings(make_settings())
+        http_only = plan_from_settings(make_settings(INFERENCE_MODE="host"))
+        replica = plan_from_settings(
+            make_settings(INFERENCE_MODE="host"), role="host", slot=1
+        )
+
+    assert (worker.processes, worker.slot, worker.intra_op_threads) == (4, 3, 2)
+    assert http_only.intra_op_threads == 1
+    assert (replica.processes, replica.slot, replica.intra_op_threads) == (2, 1, 4)
+
+
+def test_gunicorn_assigns_lowest_free_worker_slot():
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", "gunicorn.conf.py")
+    gunicorn_conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gunicorn_conf)
+
+    server = SimpleNamespace(WORKERS={})
+    for pid in (101, 102, 103):
+        worker = SimpleNamespace()
+        gunicorn_conf.pre_fork(server, worker)
+        server.WORKERS[pid] = worker
+    assert [w.cpu_slot for w in server.WORKERS.values()] == [0, 1, 2]
+
+    del server.WORKERS[102]  # worker in slot 1 died
+    replacement = SimpleNamespace()
+    gunicorn_conf.pre_fork(server, replacement)
+    assert replacement.cpu_slot == 1
+
+
+def test_gunicorn_master_does_not_import_torch():
+    # The thread variables exported in post_fork only count if the forked worker
+    # initializes torch / numpy itself
+    code = (
+        "import importlib.util, sys\n"
+        "spec = importlib.util.spec_from_file_location('conf', 'gunicorn.conf.py')\n"
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+        "import manager.inference_host\n"
+        "print(sorted({'torch', 'numpy'} & set(sys.modules)))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,147 @@
+import pytest
+import asyncio
+import io
+import threading
+import time
+import numpy as np
+from unittest.mock import MagicMock
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from prometheus_metrics import INFERENCE_QUEUE_DEPTH
+from manager.executor import InferenceExecutor, InferenceQueueFull
+from services.prediction_service import predict_service
+
+
+def make_upload():
+    img_byte_arr = io.BytesIO()
+    Image.new("RGB", (224, 224), color="red").save(img_byte_arr, format="JPEG")
+    img_byte_arr.seek(0)
+    mock_file = MagicMock(spec=UploadFile)
+    mock_file.file = img_byte_arr
+    return mock_file
+
+
+@pytest.mark.asyncio
+async def test_executor_keeps_event_loop_responsive():
+    """A blocking call on the executor must not stall other coroutines"""
+    executor = InferenceExecutor(max_workers=1, max_queue=4)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    result, _ = await asyncio.gather(executor.run(time.sleep, 0.2), ticker())
+    executor.shutdown()
+
+    assert result is None
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.15
+
+
+@pytest.mark.asyncio
+async def test_executor_rejects_when_queue_full():
+    """Calls beyond workers + queue capacity fail fast"""
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    running = asyncio.ensure_future(executor.run(release.wait))
+    queued = asyncio.ensure_future(executor.run(release.wait))
+    await asyncio.sleep(0.01)
+    assert executor.pending == 2
+
+    with pytest.raises(InferenceQueueFull):
+        await executor.run(release.wait)
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_call_leaves_queue_depth():
+    """A call cancelled before it got a worker is taken off the gauge"""
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+    depth = INFERENCE_QUEUE_DEPTH._value.get()
+
+    running = asyncio.ensure_future(executor.run(release.wait))
+    queued = asyncio.ensure_future(executor.run(release.wait))
+    try:
+        await asyncio.sleep(0.01)
+        assert INFERENCE_QUEUE_DEPTH._value.get() == depth + 1
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert executor.pending == 1
+        assert INFERENCE_QUEUE_DEPTH._value.get() == depth
+    finally:
+        release.set()
+    await running
+    assert INFERENCE_QUEUE_DEPTH._value.get() == depth
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_predict_service_runs_on_executor():
+    """predict_service hands manager.predict to the executor thread"""
+    executor = InferenceExecutor(max_workers=1, max_queue=4)
+    caller_threads = []
+
+    def fake_predict(model_name, image):
+        caller_threads.append(threading.current_thread().name)
+        return np.array([[0.1, 0.9]])
+
+    mock_manager = MagicMock()
+    mock_manager.predict.side_effect = fake_predict
+
+    result = await predict_service(
+        "resnet50",
+        make_upload(),
+        mock_manager,
+        {"0": "healthy", "1": "diseased"},
+        executor=executor,
+    )
+    executor.shutdown()
+
+    assert result["prediction"] == "diseased"
+    assert caller_threads[0].startswith("inference")
+
+
+@pytest.mark.asyncio
+async def test_predict_service_returns_503_when_queue_full():
+    """A saturated executor surfaces as 503 instead of a generic 500"""
+    executor = MagicMock()
+    executor.run.side_effect = InferenceQueueFull("Inference queue is full")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await predict_service(
+            "resnet50", make_upload(), MagicMock(), {"0": "a"}, executor=executor
+        )
+
+    assert exc_info.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_predict_service_decodes_off_event_loop(monkeypatch):
+    """Reading and decoding the upload must not run on the event loop thread"""
+    import services.prediction_service as prediction_service
+
+    decode_threads = []
+    decode_image = prediction_service.decode_image
+
+    def tracking_decode(data):
+        decode_threads.append(threading.current_thread())
+        return decode_image(data)
+
+    monkeypatch.setattr(prediction_service, "decode_image", tracking_decode)
+    mock_manager = MagicMock()
+    mock_manager.predict.return_value = np.array([[0.1, 0.9]])
+
+    await predict_service("resnet50", make_upload(), mock_manager, {"0": "a", "1": "b"})
+
+    assert decode_threads
+    assert decode_threads[0] is not threading.main_thread()
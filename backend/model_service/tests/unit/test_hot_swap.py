@@ -0,0 +1,263 @@
+import gc
+import os
+import threading
+import weakref
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from PIL import Image
+from dependencies import get_manager
+from manager import ModelManager, PlantModel
+from manager.cache import CONTENT_HASH_KEY, PredictionCache
+from manager.checkpoint_watcher import CheckpointWatcher
+from routes.prediction_route import router
+from services.model_rollout import record_worker_swap, swap_model_service
+from tests.builders import constant_network, tiny_model
+
+
+def make_manager(checkpoint, cache=None):
+    manager = ModelManager(cache=cache)
+    manager.register_model(
+        tiny_model("resnet50", constant_network(0), model_path=str(checkpoint))
+    )
+    return manager
+
+
+def image(digest=None):
+    img = Image.new("RGB", (256, 256), color="red")
+    if digest:
+        img.info[CONTENT_HASH_KEY] = digest
+    return img
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    path = tmp_path / "resnet50.pth"
+    path.write_bytes(b"v1")
+    return path
+
+
+def test_swap_serves_new_weights_and_frees_old(checkpoint):
+    cache = PredictionCache()
+    manager = make_manager(checkpoint, cache)
+    assert manager.predict("resnet50", image("a")).argmax() == 0
+
+    in_flight = manager.models["resnet50"]  # a request that started before the swap
+    released = weakref.ref(in_flight)
+    with patch.object(PlantModel, "load_model", return_value=constant_network(2)):
+        result = manager.swap_model("resnet50", version="2")
+
+    assert result["version"] == "2"
+    assert result["previous_version"] == "1"
+    assert manager.models["resnet50"].version == "2"
+    # Cached outputs of the old version are not served for the new one
+    assert manager.predict("resnet50", image("a")).argmax() == 2
+    # The old instance keeps answering without reloading
+    assert in_flight.is_loaded
+    assert in_flight.predict_batch([image()]).argmax() == 0
+
+    del in_flight
+    gc.collect()
+    assert released() is None
+
+
+def test_released_ensemble_shuts_down_its_thread_pool(checkpoint):
+    manager = make_manager(checkpoint)
+    old = manager.models["resnet50"]
+    old.model_order = ["a", "b"]  # stands in for an ensemble's base models
+    pool = old._get_base_executor()
+
+    with patch.object(PlantModel, "load_model", return_value=constant_network(1)):
+        manager.swap_model("resnet50", version="2")
+    del old
+    gc.collect()
+
+    assert pool._shutdown
+
+
+def test_swap_version_defaults_to_checkpoint_file(checkpoint):
+    manager = make_manager(checkpoint)
+    replacement = checkpoint.with_name("resnet50.new.pth")
+    replacement.write_bytes(b"version two")
+
+    with patch.object(PlantModel, "load_model", return_value=constant_network(1)):
+        first = manager.swap_model("resnet50")["version"]
+        os.replace(replacement, checkpoint)
+        second = manager.swap_model("resnet50")["version"]
+
+    assert first != second
+    assert len(second) == 12
+
+
+def test_swap_under_concurrent_predictions(checkpoint):
+    manager = make_manager(checkpoint)
+    errors = []
+    stop = threading.Event()
+
+    def client():
+        while not stop.is_set():
+            try:
+                probs = manager.predict("resnet50", image())
+                assert probs.shape == (1, 3)
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+    threads = [threading.Thread(target=client) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for i in range(5):
+        with patch.object(
+            PlantModel, "load_model", return_value=constant_network(i % 3)
+        ):
+            manager.swap_model("resnet50", version=str(i + 2))
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert manager.models["resnet50"].version == "6"
+
+
+def test_failed_swap_keeps_serving_old_version(checkpoint):
+    manager = make_manager(checkpoint)
+    old = manager.models["resnet50"]
+
+    with patch.object(PlantModel, "load_model", side_effect=RuntimeError("corrupt")):
+        with pytest.raises(RuntimeError):
+            manager.swap_model("resnet50", version="2")
+
+    assert manager.models["resnet50"] is old
+
+
+def test_swap_disabled_for_several_processes(checkpoint):
+    manager = make_manager(checkpoint)
+    manager.allow_swap = False
+
+    with pytest.raises(RuntimeError, match="several processes"):
+        manager.swap_model("resnet50")
+    # The checkpoint watcher runs in every process, so it may still swap
+    with patch.object(PlantModel, "load_model", return_value=constant_network(1)):
+        assert manager.swap_model("resnet50", version="2", force=True)["version"] == "2"
+
+
+def test_watcher_reports_replaced_checkpoint_once_stable(checkpoint):
+    manager = make_manager(checkpoint)
+    watcher = CheckpointWatcher(manager)
+    assert watcher.poll() == []
+
+    replacement = checkpoint.with_name("resnet50.new.pth")
+    replacement.write_bytes(b"version two")
+    os.replace(replacement, checkpoint)
+
+    assert watcher.poll() == []  # could still be changing
+    assert watcher.poll() == ["resnet50"]
+    watcher.mark_loaded("resnet50")
+    assert watcher.poll() == []
+
+
+@pytest.mark.asyncio
+async def test_swap_service_records_version_in_catalog(checkpoint):
+    manager = make_manager(checkpoint)
+    mock_db_conn = MagicMock()
+    mock_db_conn.models_collection.update_one = AsyncMock(
+        return_value=MagicMock(matched_count=1)
+    )
+
+    with patch("services.model_rollout.db_conn", mock_db_conn):
+        with patch.object(PlantModel, "load_model", return_value=constant_network(1)):
+            result = await swap_model_service("resnet50", manager, version="2.0")
+
+    assert result["version"] == "2.0"
+    query, update = mock_db_conn.models_collection.update_one.call_args[0]
+    assert query == {"alias": "resnet50"}
+    assert update["$set"]["version"] == "2.0"
+
+
+@pytest.mark.asyncio
+async def test_swap_service_refused_with_several_workers(checkpoint):
+    manager = make_manager(checkpoint)
+    manager.allow_swap = False
+
+    with pytest.raises(HTTPException) as exc_info:
+        await swap_model_service("resnet50", manager)
+
+    assert exc_info.value.status_code == 409
+    assert manager.models["resnet50"].version == "1"
+
+
+@pytest.mark.asyncio
+async def test_swap_service_refused_by_inference_host_replicas():
+    manager = MagicMock(models={"resnet50": "pytorch"}, allow_swap=False)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await swap_model_service("resnet50", manager)
+
+    assert exc_info.value.status_code == 409
+    manager.swap_model.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("reported, done", [([0], False), ([1, 0], True)])
+async def test_worker_swap_recorded_once_all_workers_swapped(reported, done):
+    mock_db_conn = MagicMock()
+    mock_db_conn.models_collection.update_one = AsyncMock()
+    mock_db_conn.models_collection.find_one_and_update = AsyncMock(
+        return_value={
+            "alias": "resnet50",
+            "rollout": {"version": "2", "workers": reported},
+        }
+    )
+
+    with patch("services.model_rollout.db_conn", mock_db_conn):
+        assert await record_worker_swap("resnet50", "2", 0, workers=2) is done
+
+    query, update = mock_db_conn.models_collection.find_one_and_update.call_args[0]
+    assert query == {"alias": "resnet50", "rollout.version": "2"}
+    assert update == {"$addToSet": {"rollout.workers": 0}}
+
+
+@pytest.mark.asyncio
+async def test_swap_service_unknown_model(checkpoint):
+    manager = make_manager(checkpoint)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await swap_model_service("vgg16", manager)
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "configured, sent, status",
+    [("", "anything", 403), ("secret", None, 401), ("secret", "wrong", 401)],
+)
+def test_swap_endpoint_requires_admin_token(configured, sent, status):
+    app = FastAPI()
+    app.include_router(router, prefix="/model")
+    app.dependency_overrides[get_manager] = lambda: MagicMock()
+    headers = {"X-Admin-Token": sent} if sent else {}
+
+    with patch("dependencies.settings.MODEL_ADMIN_TOKEN", configured):
+        resp = TestClient(app).post("/model/models/resnet50/swap", headers=headers)
+
+    assert resp.status_code == status
+
+
+def test_swap_endpoint(checkpoint):
+    manager = make_manager(checkpoint)
+    app = FastAPI()
+    app.include_router(router, prefix="/model")
+    app.dependency_overrides[get_manager] = lambda: manager
+
+    with patch("dependencies.settings.MODEL_ADMIN_TOKEN", "secret"), patch(
+        "services.model_rollout.db_conn", MagicMock(models_collection=None)
+    ), patch.object(PlantModel, "load_model", return_value=constant_network(1)):
+        resp = TestClient(app).post(
+            "/model/models/resnet50/swap",
+            json={"version": "2"},
+            headers={"X-Admin-Token": "secret"},
+        )
+
+    assert resp.status_code == 200
+    assert resp.json()["version"] == "2"
+    assert manager.predict("resnet50", image()).argmax() == 1
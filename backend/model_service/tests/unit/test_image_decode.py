@@ -0,0 +1,64 @@
+import io
+import numpy as np
+from unittest.mock import patch
+from PIL import Image
+from manager.cache import CONTENT_HASH_KEY
+from manager.plant_model import PlantModel
+from manager.preprocessing import RESIZE_SIZE
+from services.prediction_service import decode_image
+
+
+def encode(image_format, size=(2000, 1500)):
+    x = np.linspace(0, 255, size[0], dtype=np.uint8)
+    y = np.linspace(0, 255, size[1], dtype=np.uint8)
+    pixels = np.stack(
+        [
+            np.add.outer(y // 2, x // 2),
+            np.tile(x, (size[1], 1)),
+            np.tile(y, (size[0], 1)).T,
+        ],
+        axis=-1,
+    ).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format=image_format)
+    return buf.getvalue()
+
+
+def test_large_jpeg_decodes_at_reduced_scale():
+    """A big JPEG comes out just above the preprocessing resize, not at full size"""
+    image = decode_image(encode("JPEG"))
+
+    assert image.mode == "RGB"
+    assert RESIZE_SIZE <= min(image.size) < 2 * RESIZE_SIZE
+    assert image.size[0] / image.size[1] == 2000 / 1500
+
+
+def test_reduced_decode_preprocesses_like_full_decode():
+    """DCT-scaled decoding barely moves the model input"""
+    data = encode("JPEG")
+    preprocessor = PlantModel(name="p", model_path="", model_type="onnx", lazy=True)
+
+    with patch("services.prediction_service.settings.REDUCED_JPEG_DECODE", False):
+        full = decode_image(data)
+    reduced = decode_image(data)
+
+    assert full.size == (2000, 1500)
+    diff = np.abs(
+        preprocessor.preprocess_batch([full]).numpy()
+        - preprocessor.preprocess_batch([reduced]).numpy()
+    )
+    assert diff.mean() < 0.02
+
+
+def test_png_and_webp_fall_back_to_full_decode():
+    for image_format in ("PNG", "WEBP"):
+        data = encode(image_format, size=(600, 400))
+        image = decode_image(data)
+        assert image.size == (600, 400)
+        assert image.mode == "RGB"
+        assert image.info[CONTENT_HASH_KEY]
+
+
+def test_small_jpeg_is_not_reduced():
+    image = decode_image(encode("JPEG", size=(300, 280)))
+    assert image.size == (300, 280)
@@ -0,0 +1,217 @@
+import pytest
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import numpy as np
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from unittest.mock import MagicMock
+from PIL import Image
+from manager.inference_host import (
+    RemoteModelManager,
+    private_socket_address,
+    run_inference_host,
+    serve,
+)
+
+
+@pytest.fixture
+def address():
+    """A socket path in a private temp directory, removed afterwards"""
+    address = private_socket_address()
+    yield address
+    shutil.rmtree(os.path.dirname(address), ignore_errors=True)
+
+
+def start_host(address, idle_timeout=300.0):
+    """Serve a mock manager from a background thread on a unix socket"""
+    listener = Listener(address)
+
+    host_manager = MagicMock()
+    host_manager.models = {
+        "resnet50": MagicMock(model_type="pytorch"),
+        "ensemble": MagicMock(model_type="sklearn"),
+    }
+    thread = threading.Thread(
+        target=serve,
+        args=(listener, host_manager, b"test-key", idle_timeout),
+        daemon=True,
+    )
+    thread.start()
+    return address, listener, host_manager
+
+
+@pytest.fixture
+def remote_manager(address):
+    address, listener, host_manager = start_host(address)
+    client = RemoteModelManager(address, "test-key", connect_timeout=2)
+    yield client, host_manager
+    client.close()
+    listener.close()
+
+
+def test_remote_manager_lists_models(remote_manager):
+    """Model names come from the host process"""
+    client, _ = remote_manager
+    assert client.models == {"resnet50": "pytorch", "ensemble": "sklearn"}
+
+
+def test_remote_manager_predict_round_trip(remote_manager):
+    """Images go to the host and probabilities come back intact"""
+    client, host_manager = remote_manager
+    host_manager.predict.return_value = np.array([[0.25, 0.75]])
+
+    image = Image.new("RGB", (64, 64), color="red")
+    probs = client.predict("resnet50", image)
+
+    assert probs.tolist() == [[0.25, 0.75]]
+    model_name, sent_image = host_manager.predict.call_args[0]
+    assert model_name == "resnet50"
+    assert sent_image.size == (64, 64)
+
+
+def test_remote_manager_predict_batch_round_trip(remote_manager):
+    """Ensemble tuples survive the trip for batches"""
+    client, host_manager = remote_manager
+    host_manager.predict_batch.return_value = (
+        np.array([1, 0]),
+        np.array([[0.1, 0.9], [0.8, 0.2]]),
+    )
+
+    images = [Image.new("RGB", (32, 32)), Image.new("RGB", (32, 32))]
+    prediction, probs = client.predict_batch("ensemble", images)
+
+    assert prediction.tolist() == [1, 0]
+    assert probs.shape == (2, 2)
+
+
+def test_remote_manager_reraises_value_errors(remote_manager):
+    """Unknown models still raise ValueError on the client side"""
+    client, host_manager = remote_manager
+    host_manager.predict.side_effect = ValueError("Model vgg16 not found")
+
+    with pytest.raises(ValueError, match="vgg16"):
+        client.predict("vgg16", Image.new("RGB", (32, 32)))
+
+
+def test_remote_manager_reports_whether_host_can_swap(remote_manager):
+    """Several forked replicas turn swapping off in the host"""
+    client, host_manager = remote_manager
+    host_manager.allow_swap = False
+
+    assert client.allow_swap is False
+
+
+def test_remote_manager_unreachable_host():
+    """A missing host fails with a clear error after the connect timeout"""
+    address = os.path.join(tempfile.mkdtemp(), "missing.sock")
+    client = RemoteModelManager(address, "test-key", connect_timeout=0)
+
+    with pytest.raises(RuntimeError, match="not reachable"):
+        client.predict("resnet50", Image.new("RGB", (32, 32)))
+
+
+def test_remote_manager_predict_all_round_trip(remote_manager):
+    """predict_all results come back keyed by model name"""
+    client, host_manager = remote_manager
+    host_manager.predict_all.return_value = {
+        "resnet50": np.array([[0.3, 0.7]]),
+        "ensemble": (np.array([1]), np.array([[0.2, 0.8]])),
+    }
+
+    outputs = client.predict_all([Image.new("RGB", (32, 32))])
+
+    assert outputs["resnet50"].tolist() == [[0.3, 0.7]]
+    assert outputs["ensemble"][0].tolist() == [1]
+    assert host_manager.predict_all.call_args[0][1] is None
+
+
+def test_remote_manager_reuses_its_connection(remote_manager):
+    """Sequential calls share one pooled connection instead of reconnecting"""
+    client, host_manager = remote_manager
+    host_manager.predict.return_value = np.array([[0.5, 0.5]])
+
+    client.predict("resnet50", Image.new("RGB", (32, 32)))
+    first = list(client._pool)
+    client.predict("resnet50", Image.new("RGB", (32, 32)))
+
+    assert len(first) == 1
+    assert client._pool == first
+
+
+def test_remote_manager_reconnects_after_idle_timeout(address):
+    """A connection the host closed for idling is replaced transparently"""
+    address, listener, host_manager = start_host(address, idle_timeout=0.1)
+    host_manager.predict.return_value = np.array([[0.5, 0.5]])
+    client = RemoteModelManager(address, "test-key", connect_timeout=2)
+
+    client.predict("resnet50", Image.new("RGB", (32, 32)))
+    time.sleep(0.3)
+    probs = client.predict("resnet50", Image.new("RGB", (32, 32)))
+
+    assert probs.tolist() == [[0.5, 0.5]]
+    assert host_manager.predict.call_count == 2
+    client.close()
+    listener.close()
+
+
+def test_host_rejects_wrong_authkey(remote_manager):
+    """Clients without the key are turned away before anything is unpickled"""
+    client, host_manager = remote_manager
+
+    with pytest.raises(AuthenticationError):
+        Client(client.address, authkey=b"wrong-key")
+
+    assert host_manager.predict.call_count == 0
+    assert client.models == {"resnet50": "pytorch", "ensemble": "sklearn"}
+
+
+def test_stalled_client_does_not_block_others(remote_manager):
+    """A peer that connects and never speaks doesn't hold up other clients"""
+    client, host_manager = remote_manager
+    host_manager.predict.return_value = np.array([[0.1, 0.9]])
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stalled:
+        stalled.connect(client.address)
+        probs = client.predict("resnet50", Image.new("RGB", (32, 32)))
+
+    assert probs.tolist() == [[0.1, 0.9]]
+
+
+def test_remote_manager_times_out_slow_requests(address):
+    """A host that doesn't answer in time fails the call instead of hanging it"""
+    address, listener, host_manager = start_host(address)
+    host_manager.predict.side_effect = lambda *args: time.sleep(1)
+    client = RemoteModelManager(address, "test-key", request_timeout=0.1)
+
+    with pytest.raises(RuntimeError, match="did not answer"):
+        client.predict("resnet50", Image.new("RGB", (32, 32)))
+
+    assert client._pool == []
+    listener.close()
+
+
+def test_host_mode_requires_authkey(address):
+    """Neither side of host mode starts without a secret key"""
+    with pytest.raises(RuntimeError, match="INFERENCE_HOST_AUTHKEY"):
+        RemoteModelManager(address, "")
+    with pytest.raises(RuntimeError, match="INFERENCE_HOST_AUTHKEY"):
+        run_inference_host(address, "")
+
+
+def test_socket_directory_must_be_private(address, tmp_path):
+    """The socket goes in a 0700 directory; a shared one is refused"""
+    assert os.stat(os.path.dirname(address)).st_mode & 0o777 == 0o700
+
+    nested = str(tmp_path / "sockets" / "inference.sock")
+    assert private_socket_address(nested) == nested
+    assert os.stat(os.path.dirname(nested)).st_mode & 0o777 == 0o700
+
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o777)
+    with pytest.raises(RuntimeError, match="must be private"):
+        private_socket_address(str(shared / "inference.sock"))
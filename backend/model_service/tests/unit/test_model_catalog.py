@@ -0,0 +1,170 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from routes.prediction_route import router
+from services.model_catalog import ModelCatalog, catalog_etag
+
+MODELS = [
+    {
+        "_id": ObjectId("507f1f77bcf86cd799439011"),
+        "model_id": ObjectId("507f1f77bcf86cd799439012"),
+        "alias": "resnet50",
+        "type": "ResNet",
+        "status": "active",
+    }
+]
+
+
+def make_collection(models=MODELS):
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(side_effect=lambda length: [dict(m) for m in models])
+    collection = MagicMock()
+    collection.find = MagicMock(return_value=cursor)
+    collection.find_one = AsyncMock(side_effect=lambda q: dict(models[0]))
+    return collection
+
+
+@pytest.mark.asyncio
+async def test_catalog_serves_repeat_reads_from_memory():
+    catalog = ModelCatalog(ttl_seconds=60)
+    load = AsyncMock(return_value=[{"alias": "resnet50"}])
+    collection = object()
+
+    first, etag1 = await catalog.get(collection, "models", load)
+    first[0]["alias"] = "mutated"  # callers get copies
+    second, etag2 = await catalog.get(collection, "models", load)
+
+    assert load.await_count == 1
+    assert second == [{"alias": "resnet50"}]
+    assert etag1 == etag2 == catalog_etag([{"alias": "resnet50"}])
+
+
+@pytest.mark.asyncio
+async def test_catalog_reloads_after_ttl_invalidation_and_reconnect():
+    catalog = ModelCatalog(ttl_seconds=60)
+    load = AsyncMock(return_value=[])
+    collection = object()
+
+    await catalog.get(collection, "models", load)
+    with patch("services.model_catalog.time.monotonic", return_value=1e12):
+        await catalog.get(collection, "models", load)
+    assert load.await_count == 2
+
+    catalog.invalidate()
+    await catalog.get(collection, "models", load)
+    assert load.await_count == 3
+
+    await catalog.get(object(), "models", load)  # new collection handle
+    assert load.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_catalog_does_not_store_result_raced_by_invalidation():
+    catalog = ModelCatalog(ttl_seconds=60)
+    collection = object()
+
+    async def load():
+        catalog.invalidate()  # a change-stream event arrives mid-read
+        return ["stale"]
+
+    value, _ = await catalog.get(collection, "models", load)
+
+    assert value == ["stale"]
+    assert catalog._entries == {}
+
+
+@pytest.mark.asyncio
+async def test_watch_invalidates_on_change_events():
+    catalog = ModelCatalog()
+    catalog._entries["models"] = ([], '"x"', 0.0)
+    invalidated = asyncio.Event()
+
+    class Stream:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if invalidated.is_set():
+                await asyncio.sleep(3600)
+            invalidated.set()
+            return {"operationType": "update"}
+
+    collection = MagicMock()
+    collection.watch.return_value = Stream()
+
+    task = asyncio.create_task(catalog.watch(collection))
+    await asyncio.wait_for(invalidated.wait(), 1)
+    await asyncio.sleep(0)
+    task.cancel()
+
+    assert catalog._entries == {}
+    assert catalog.generation == 1
+
+
+@pytest.mark.asyncio
+async def test_watch_stops_without_replica_set():
+    catalog = ModelCatalog()
+    error = Exception("The $changeStream stage is only supported on replica sets")
+    error.code = 40573
+    collection = MagicMock()
+    collection.watch.side_effect = error
+
+    await asyncio.wait_for(catalog.watch(collection), 1)
+
+    assert collection.watch.call_count == 1
+
+
+@pytest.fixture
+def catalog_client():
+    app = FastAPI()
+    app.include_router(router, prefix="/model")
+    db_conn = MagicMock()
+    db_conn.models_collection = make_collection()
+    with patch("services.prediction_service.db_conn", db_conn):
+        yield TestClient(app), db_conn.models_collection
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/model/models",
+        "/model/models/active",
+        "/model/models/alias/resnet50",
+        "/model/models/507f1f77bcf86cd799439012",
+    ],
+)
+def test_catalog_routes_revalidate_with_etag(catalog_client, path):
+    client, _ = catalog_client
+
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+    etag = first.headers["etag"]
+
+    again = client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+
+    other = client.get(path, headers={"If-None-Match": '"something-else"'})
+    assert other.status_code == 200
+    assert other.json() == first.json()
+
+
+def test_catalog_routes_hit_database_once(catalog_client):
+    client, collection = catalog_client
+
+    for _ in range(3):
+        resp = client.get("/model/models", params={"status": "active"})
+        assert resp.json()["models"][0]["_id"] == "507f1f77bcf86cd799439011"
+
+    collection.find.assert_called_once_with({"status": "active"})
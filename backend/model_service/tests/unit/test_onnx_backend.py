@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+import torch
+from PIL import Image
+from manager import PlantModel
+from tools.export_onnx import export_model
+
+pytest.importorskip("onnxruntime")
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """A small checkpoint plus its ONNX export"""
+    tmp_path = tmp_path_factory.mktemp("onnx")
+    source = PlantModel(
+        name="mobilenet_v3_small",
+        model_path="unused",
+        model_type="pytorch",
+        num_classes=5,
+        lazy=True,
+    )
+    checkpoint_path = tmp_path / "mobilenet_v3_small.pth"
+    torch.save({"model_state": source.build_model_arch().state_dict()}, checkpoint_path)
+
+    onnx_path = tmp_path / "mobilenet_v3_small.onnx"
+    max_diff = export_model(
+        "mobilenet_v3_small", str(checkpoint_path), str(onnx_path), num_classes=5
+    )
+    return str(checkpoint_path), str(onnx_path), max_diff
+
+
+def test_export_matches_pytorch(exported):
+    """The export check passes within tolerance"""
+    _, _, max_diff = exported
+    assert max_diff < 1e-4
+
+
+def test_onnx_backend_batched_predictions_match_pytorch(exported):
+    """ONNX Runtime serves batches with the same probabilities as eager PyTorch"""
+    checkpoint_path, onnx_path, _ = exported
+    pytorch_model = PlantModel(
+        name="mobilenet_v3_small",
+        model_path=checkpoint_path,
+        model_type="pytorch",
+        num_classes=5,
+    )
+    onnx_model = PlantModel(
+        name="mobilenet_v3_small",
+        model_path=onnx_path,
+        model_type="onnx",
+        num_classes=5,
+    )
+    images = [Image.new("RGB", (300, 280), color=c) for c in ("red", "green", "blue")]
+
+    onnx_probs = onnx_model.predict_batch(images)
+
+    assert onnx_probs.shape == (3, 5)
+    np.testing.assert_allclose(
+        onnx_probs, pytorch_model.predict_batch(images), atol=1e-5
+    )
+
+
+def test_static_int8_variant_serves_and_reports(exported, tmp_path):
+    """Quantized export loads as an ONNX PlantModel and gets a comparison report"""
+    from tools.quantize import ImageBatches, compare, evaluate, quantize
+
+    _, onnx_path, _ = exported
+    images = [
+        Image.fromarray(np.random.randint(0, 255, (240, 260, 3), dtype=np.uint8))
+        for _ in range(4)
+    ]
+    folder = tmp_path / "calibration"
+    folder.mkdir()
+    for i, image in enumerate(images):
+        image.save(folder / f"leaf{i}.jpg")
+
+    # Streamed in batches of 3 and 1, decoded again on every pass
+    calibration = ImageBatches(str(folder), batch_size=3)
+    assert [batch.shape for batch in calibration] == [
+        (3, 3, 224, 224),
+        (1, 3, 224, 224),
+    ]
+    int8_path = str(tmp_path / "mobilenet_v3_small_int8.onnx")
+
+    quantize(onnx_path, int8_path, calibration, mode="static")
+
+    int8_model = PlantModel(
+        name="mobilenet_v3_small_int8",
+        model_path=int8_path,
+        model_type="onnx",
+        num_classes=5,
+    )
+    assert int8_model.predict_batch(images).shape == (4, 5)
+
+    report = compare(
+        evaluate(onnx_path, calibration, runs=1),
+        evaluate(int8_path, calibration, runs=1),
+    )
+    assert len(evaluate(int8_path, calibration, runs=1)["top1"]) == 4
+    assert 0.0 <= report["top1_agreement"] <= 1.0
+    assert report["file_mb"]["int8"] < report["file_mb"]["fp32"]
@@ -0,0 +1,96 @@
+import pytest
+import numpy as np
+import torch
+from unittest.mock import patch
+from PIL import Image
+from manager import PlantModel
+from manager.optimizer import (
+    optimize_model,
+    max_prob_difference,
+    parse_optimizations,
+    optimizations_for,
+)
+
+
+@pytest.fixture(scope="module")
+def checkpoint(tmp_path_factory):
+    source = PlantModel(
+        name="mobilenet_v3_small",
+        model_path="unused",
+        model_type="pytorch",
+        num_classes=4,
+        lazy=True,
+    )
+    path = tmp_path_factory.mktemp("opt") / "mobilenet_v3_small.pth"
+    torch.save({"model_state": source.build_model_arch().state_dict()}, path)
+    return str(path)
+
+
+def test_parse_optimizations_per_model_with_default():
+    """Model entries win over the "*" default"""
+    spec = parse_optimizations("resnet50=fuse,freeze; *=channels_last")
+
+    assert optimizations_for("resnet50", spec) == ["fuse", "freeze"]
+    assert optimizations_for("densenet121", spec) == ["channels_last"]
+    assert optimizations_for("anything", parse_optimizations("")) == []
+
+
+def test_parse_optimizations_rejects_unknown():
+    with pytest.raises(ValueError):
+        parse_optimizations("resnet50=fuse,tensorrt")
+
+
+@pytest.mark.parametrize(
+    "optimizations", [["fuse"], ["channels_last"], ["fuse", "channels_last", "freeze"]]
+)
+def test_optimized_model_matches_eager(checkpoint, optimizations):
+    """Each optimization keeps outputs within tolerance of the eager model"""
+    eager = PlantModel(
+        name="mobilenet_v3_small",
+        model_path=checkpoint,
+        model_type="pytorch",
+        num_classes=4,
+    )
+    optimized = PlantModel(
+        name="mobilenet_v3_small",
+        model_path=checkpoint,
+        model_type="pytorch",
+        num_classes=4,
+        optimizations=optimizations,
+    )
+    assert optimized.model is not eager.model
+    images = [Image.new("RGB", (256, 256), color=c) for c in ("red", "blue")]
+
+    np.testing.assert_allclose(
+        optimized.predict_batch(images), eager.predict_batch(images), atol=1e-4
+    )
+
+
+def test_optimization_falls_back_to_eager_when_outputs_drift(checkpoint):
+    """A drifting optimization is rejected and the eager model is served"""
+    with patch("manager.plant_model.max_prob_difference", return_value=0.5):
+        model = PlantModel(
+            name="mobilenet_v3_small",
+            model_path=checkpoint,
+            model_type="pytorch",
+            num_classes=4,
+            optimizations=["freeze"],
+        )
+
+    assert isinstance(model.model, torch.nn.Module)
+    assert not isinstance(model.model, torch.jit.ScriptModule)
+
+
+def test_freeze_produces_scripted_module(checkpoint):
+    model = PlantModel(
+        name="mobilenet_v3_small",
+        model_path=checkpoint,
+        model_type="pytorch",
+        num_classes=4,
+    ).model
+    example = torch.randn(2, 3, 224, 224)
+
+    frozen = optimize_model(model, ["freeze"], example)
+
+    assert isinstance(frozen, torch.jit.ScriptModule)
+    assert max_prob_difference(model, frozen, example) < 1e-4
@@ -0,0 +1,197 @@
+import numpy as np
+import torch
+import torch.nn as nn
+from unittest.mock import MagicMock, patch
+from PIL import Image
+from manager import ModelManager, PlantModel
+from manager.preprocessing import Preprocessor
+from tests.builders import ensemble_manager, tiny_model
+
+
+def test_predict_batch_matches_single_predictions():
+    """Batched forward pass returns the same rows as one-at-a-time predict"""
+    model = tiny_model("resnet50")
+    images = [Image.new("RGB", (300, 260), color=c) for c in ("red", "green", "blue")]
+
+    batch_probs = model.predict_batch(images)
+    single_probs = np.concatenate([model.predict(img) for img in images])
+
+    assert batch_probs.shape == (3, 3)
+    np.testing.assert_allclose(batch_probs, single_probs, rtol=1e-5, atol=1e-6)
+
+
+def test_ensemble_predict_batch_stacks_features_per_image():
+    """Ensemble builds one (N, sum(classes)) feature matrix for the meta-model"""
+    meta_model = MagicMock()
+    meta_model.predict.return_value = np.array([0, 1])
+    meta_model.predict_proba.return_value = np.array([[0.7, 0.3], [0.4, 0.6]])
+    manager, _ = ensemble_manager(("densenet121", "resnet50"), meta_model=meta_model)
+
+    images = [Image.new("RGB", (256, 256), color="red"), Image.new("RGB", (256, 256))]
+    prediction, probs = manager.predict_batch("ensemble", images)
+
+    features = meta_model.predict.call_args[0][0]
+    assert features.shape == (2, 6)
+    meta_model.predict.assert_called_once()
+    assert prediction.tolist() == [0, 1]
+    assert probs.shape == (2, 2)
+
+
+def test_ensemble_preprocesses_image_once():
+    """Base models share one preprocessed tensor instead of re-running transforms"""
+    manager, _ = ensemble_manager()
+
+    original = Preprocessor.to_uint8
+    calls = []
+
+    def counting_to_uint8(self, image):
+        calls.append(image)
+        return original(self, image)
+
+    with patch.object(Preprocessor, "to_uint8", counting_to_uint8):
+        manager.predict("ensemble", Image.new("RGB", (256, 256), color="green"))
+
+    assert len(calls) == 1
+
+
+def test_ensemble_parallel_matches_serial_features():
+    """Concurrent base-model execution yields the same stacked features, in order"""
+    image = Image.new("RGB", (256, 256), color="orange")
+
+    # Identical base weights in both managers
+    parallel_manager, parallel_meta = ensemble_manager(seed=0)
+    serial_manager, serial_meta = ensemble_manager(parallel_base_models=False, seed=0)
+
+    parallel_manager.predict("ensemble", image)
+    serial_manager.predict("ensemble", image)
+
+    np.testing.assert_allclose(
+        parallel_meta.predict.call_args[0][0],
+        serial_meta.predict.call_args[0][0],
+        rtol=1e-6,
+    )
+
+
+def test_predict_all_runs_each_base_model_once():
+    """predict_all returns every base model plus the ensemble from 4 forward passes"""
+    manager, meta_model = ensemble_manager()
+    image = Image.new("RGB", (256, 256), color="purple")
+
+    original = PlantModel._forward_probs
+    calls = []
+
+    def counting_forward(self, input_tensor):
+        calls.append(self.name)
+        return original(self, input_tensor)
+
+    with patch.object(PlantModel, "_forward_probs", counting_forward):
+        outputs = manager.predict_all([image])
+
+    assert sorted(calls) == sorted(manager.models["ensemble"].model_order)
+    assert list(outputs) == [
+        "densenet121",
+        "efficientnet_b4",
+        "mobilenet_v3_large",
+        "resnet50",
+        "ensemble",
+    ]
+    for name in manager.models["ensemble"].model_order:
+        np.testing.assert_allclose(
+            outputs[name], manager.models[name].predict(image), rtol=1e-5
+        )
+    # The meta-model saw exactly the base outputs returned alongside it
+    np.testing.assert_allclose(
+        meta_model.predict.call_args[0][0],
+        np.concatenate(
+            [outputs[n] for n in manager.models["ensemble"].model_order], axis=1
+        ),
+    )
+    prediction, probs = outputs["ensemble"]
+    assert prediction.tolist() == [0]
+
+
+def test_predict_all_subset_without_ensemble():
+    """A list of base models runs just those models"""
+    manager, meta_model = ensemble_manager(parallel_base_models=False)
+    image = Image.new("RGB", (256, 256), color="olive")
+
+    outputs = manager.predict_all([image], ["resnet50", "densenet121"])
+
+    assert list(outputs) == ["resnet50", "densenet121"]
+    assert outputs["resnet50"].shape == (1, 3)
+    meta_model.predict.assert_not_called()
+
+
+def test_lazy_model_loads_on_first_use():
+    """Lazy models don't touch their checkpoint until predicted with"""
+    tiny = nn.Sequential(nn.AdaptiveAvgPool2d(1), nn.Flatten(), nn.Linear(3, 3)).eval()
+    with patch.object(PlantModel, "load_model", return_value=tiny) as mock_load:
+        model = PlantModel(
+            name="resnet50",
+            model_path="unused",
+            model_type="pytorch",
+            num_classes=3,
+            lazy=True,
+        )
+        assert not model.is_loaded
+        mock_load.assert_not_called()
+
+        model.predict(Image.new("RGB", (256, 256)))
+        model.predict(Image.new("RGB", (256, 256)))
+
+    mock_load.assert_called_once()
+    assert model.is_loaded
+    assert model.load_time is not None
+
+
+def test_warm_ensemble_loads_base_models():
+    """Warming the ensemble also materializes the base models it stacks"""
+    tiny = nn.Sequential(nn.AdaptiveAvgPool2d(1), nn.Flatten(), nn.Linear(3, 3)).eval()
+    manager = ModelManager()
+    with patch.object(PlantModel, "load_model", return_value=tiny):
+        for name in ("densenet121", "resnet50", "mobilenet_v3_large"):
+            manager.register_model(
+                PlantModel(
+                    name=name,
+                    model_path="unused",
+                    model_type="pytorch",
+                    num_classes=3,
+                    lazy=True,
+                )
+            )
+        manager.register_model(
+            PlantModel(
+                name="ensemble",
+                model_path="unused",
+                model_type="sklearn",
+                model_order=["densenet121", "resnet50"],
+                lazy=True,
+            )
+        )
+
+        load_times = manager.warm(["ensemble"])
+
+    assert set(load_times) == {"ensemble", "densenet121", "resnet50"}
+    assert not manager.models["mobilenet_v3_large"].is_loaded
+
+
+def test_mmap_checkpoint_matches_eager_load(tmp_path):
+    """Memory-mapped checkpoints produce the same outputs as a regular load"""
+    source = PlantModel.__new__(PlantModel)
+    source.name, source.num_classes = "mobilenet_v3_small", 3
+    checkpoint_path = tmp_path / "mobilenet_v3_small.pth"
+    torch.save({"model_state": source.build_model_arch().state_dict()}, checkpoint_path)
+
+    eager, mapped = [
+        PlantModel(
+            name="mobilenet_v3_small",
+            model_path=str(checkpoint_path),
+            model_type="pytorch",
+            num_classes=3,
+            mmap=mmap,
+        )
+        for mmap in (False, True)
+    ]
+    image = Image.new("RGB", (256, 256), color="green")
+
+    np.testing.assert_allclose(eager.predict(image), mapped.predict(image), rtol=1e-6)
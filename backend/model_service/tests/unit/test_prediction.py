@@ -6,6 +6,8 @@ import io
 import numpy as np
 from fastapi import HTTPException
 from services.prediction_service import (
+    format_prediction,
+    top_k_predictions,
     predict_service,
     get_all_models_service,
     get_active_models_service,
@@ -1719,8 +1721,8 @@ async def test_get_model_by_alias_concurrent_calls():
             assert result["alias"] == alias
             assert isinstance(result["_id"], str)
 
-        # Verify find_one was called 3 times
-        assert mock_db_conn.models_collection.find_one.await_count == 3
+        # The first read fills the catalog cache; the others are served from it
+        assert mock_db_conn.models_collection.find_one.await_count == 1
 
 
 @pytest.mark.asyncio
@@ -1906,7 +1908,7 @@ async def test_get_model_by_id_concurrent_calls():
             assert isinstance(result["_id"], str)
             assert isinstance(result["model_id"], str)
 
-        assert mock_db_conn.models_collection.find_one.await_count == 3
+        assert mock_db_conn.models_collection.find_one.await_count == 1
 
 
 @pytest.mark.asyncio
@@ -2454,3 +2456,61 @@ async def test_get_model_by_id_different_model_types():
 
             assert result["type"] == model_type
             assert result["model_id"] == model_id
+
+
+def test_top_k_predictions_match_full_sort():
+    """Partial selection returns the same classes and order as a full sort"""
+    rng = np.random.default_rng(0)
+    probs = rng.dirichlet(np.ones(54)).astype(np.float32)
+    idx2label = {str(i): f"crop/disease {i}" for i in range(54)}
+
+    top = top_k_predictions(probs, 5, idx2label)
+
+    expected = np.argsort(probs)[::-1][:5]
+    assert [p["class_idx"] for p in top] == expected.tolist()
+    assert [p["label"] for p in top] == [f"crop/disease {i}" for i in expected]
+    assert top[0]["confidence"] == pytest.approx(float(probs.max()))
+
+
+def test_top_k_larger_than_class_count():
+    probs = np.array([0.2, 0.5, 0.3])
+    top = top_k_predictions(probs, 10, {"0": "a", "1": "b", "2": "c"})
+    assert [p["label"] for p in top] == ["b", "c", "a"]
+
+
+def test_format_prediction_top_k_trims_raw_output():
+    """top_k replaces the full vector unless probabilities are asked for"""
+    idx2label = {"0": "healthy", "1": "diseased", "2": "pest"}
+    output = np.array([[0.1, 0.6, 0.3]])
+
+    trimmed = format_prediction(
+        "resnet50", output, idx2label, top_k=2, include_probs=False
+    )
+    full = format_prediction("resnet50", output, idx2label, top_k=2)
+
+    assert "raw_output" not in trimmed
+    assert [p["label"] for p in trimmed["top_predictions"]] == ["diseased", "pest"]
+    assert trimmed["prediction"] == "diseased"
+    assert full["raw_output"] == pytest.approx([0.1, 0.6, 0.3])
+
+
+def test_format_prediction_top_k_for_ensemble():
+    idx2label = {"0": "healthy", "1": "diseased", "2": "pest"}
+
+    with_probs = format_prediction(
+        "ensemble",
+        (np.array([2]), np.array([[0.1, 0.2, 0.7]])),
+        idx2label,
+        top_k=1,
+        include_probs=False,
+    )
+    without_probs = format_prediction(
+        "ensemble", (np.array([2]), None), idx2label, top_k=3, include_probs=False
+    )
+
+    assert with_probs["top_predictions"] == [
+        {"class_idx": 2, "label": "pest", "confidence": pytest.approx(0.7)}
+    ]
+    assert without_probs["top_predictions"] == [
+        {"class_idx": 2, "label": "pest", "confidence": None}
+    ]
@@ -0,0 +1,84 @@
+import json
+import numpy as np
+import pytest
+from services.prediction_format import (
+    PREDICTION_MEDIA_TYPE,
+    decode_predictions,
+    encode_predictions,
+    negotiate_dtype,
+)
+
+RESULT = {
+    "model": "resnet50",
+    "prediction": "diseased",
+    "confidence": 0.8,
+    "raw_output": [0.1, 0.8, 0.1],
+}
+
+
+def test_negotiate_dtype():
+    assert negotiate_dtype("application/json") is None
+    assert negotiate_dtype("") is None
+    assert negotiate_dtype(PREDICTION_MEDIA_TYPE) == "float32"
+    assert negotiate_dtype(f"{PREDICTION_MEDIA_TYPE}; dtype=float16") == "float16"
+    assert (
+        negotiate_dtype(f"application/json;q=0.5, {PREDICTION_MEDIA_TYPE}") == "float32"
+    )
+
+
+@pytest.mark.parametrize("dtype,atol", [("float32", 1e-7), ("float16", 1e-3)])
+def test_round_trip(dtype, atol):
+    results = [
+        RESULT,
+        {"index": 1, "filename": "b.jpg", "error": "Could not decode image"},
+        {
+            "model": "ensemble",
+            "prediction": "pest",
+            "confidence": None,
+            "raw_output": None,
+        },
+    ]
+
+    decoded = decode_predictions(encode_predictions(results, dtype))
+
+    assert decoded[1] == results[1]
+    assert decoded[2] == results[2]
+    assert {k: v for k, v in decoded[0].items() if k != "raw_output"} == {
+        k: v for k, v in RESULT.items() if k != "raw_output"
+    }
+    np.testing.assert_allclose(
+        decoded[0]["raw_output"], RESULT["raw_output"], atol=atol
+    )
+
+
+def test_binary_is_smaller_than_json():
+    probs = np.random.default_rng(0).dirichlet(np.ones(54)).astype(np.float32)
+    result = {**RESULT, "raw_output": probs.tolist()}
+
+    json_size = len(json.dumps(result))
+    assert len(encode_predictions([result])) < json_size / 3
+    assert len(encode_predictions([result], "float16")) < json_size / 5
+
+
+def test_app_service_reader_matches_encoder():
+    """app_service's stdlib-only reader decodes what this encoder writes"""
+    import importlib.util
+    import pathlib
+
+    path = (
+        pathlib.Path(__file__).parents[3]
+        / "app_service"
+        / "utils"
+        / "prediction_format.py"
+    )
+    if not path.exists():
+        pytest.skip("app_service is not checked out next to model_service")
+    spec = importlib.util.spec_from_file_location("app_prediction_format", path)
+    reader = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(reader)
+
+    results = [RESULT, {"error": "bad"}]
+    for dtype in ("float32", "float16"):
+        assert reader.decode_predictions(
+            encode_predictions(results, dtype)
+        ) == decode_predictions(encode_predictions(results, dtype))
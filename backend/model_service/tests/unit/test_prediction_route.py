@@ -0,0 +1,136 @@
+import pytest
+import numpy as np
+from routes.prediction_route import is_raw_image_body
+from services.prediction_format import PREDICTION_MEDIA_TYPE, decode_predictions
+
+
+@pytest.mark.parametrize("content_type", ["application/octet-stream", "image/jpeg"])
+def test_predict_accepts_raw_body(client_and_manager, content_type, jpeg_bytes):
+    client, manager = client_and_manager
+
+    resp = client.post(
+        "/model/predict/resnet50",
+        content=jpeg_bytes,
+        headers={"Content-Type": content_type},
+    )
+
+    assert resp.status_code == 200
+    assert resp.json()["prediction"] == "diseased"
+    model_name, image = manager.predict.call_args[0]
+    assert model_name == "resnet50"
+    assert image.size == (300, 300)
+
+
+def test_predict_still_accepts_multipart(client_and_manager, jpeg_bytes):
+    client, _ = client_and_manager
+
+    resp = client.post(
+        "/model/predict/resnet50",
+        files={"file": ("leaf.jpg", jpeg_bytes, "image/jpeg")},
+    )
+
+    assert resp.status_code == 200
+    assert resp.json()["prediction"] == "diseased"
+
+
+def test_raw_and_multipart_give_same_result(client_and_manager, jpeg_bytes):
+    """Both upload modes hand the model the same decoded image"""
+    client, manager = client_and_manager
+    data = jpeg_bytes
+
+    client.post(
+        "/model/predict/resnet50", files={"file": ("a.jpg", data, "image/jpeg")}
+    )
+    client.post(
+        "/model/predict/resnet50", content=data, headers={"Content-Type": "image/jpeg"}
+    )
+
+    multipart_image = manager.predict.call_args_list[0][0][1]
+    raw_image = manager.predict.call_args_list[1][0][1]
+    assert np.array_equal(np.asarray(multipart_image), np.asarray(raw_image))
+    assert multipart_image.info["content_hash"] == raw_image.info["content_hash"]
+
+
+@pytest.mark.parametrize(
+    "kwargs,status",
+    [
+        (dict(json={"image": "x"}), 415),
+        (dict(content=b"", headers={"Content-Type": "image/png"}), 400),
+        (dict(files={"other": ("a.jpg", b"x", "image/jpeg")}), 422),
+    ],
+)
+def test_predict_rejects_bad_uploads(client_and_manager, kwargs, status):
+    client, manager = client_and_manager
+
+    resp = client.post("/model/predict/resnet50", **kwargs)
+
+    assert resp.status_code == status
+    manager.predict.assert_not_called()
+
+
+def test_is_raw_image_body():
+    assert is_raw_image_body("application/octet-stream")
+    assert is_raw_image_body("image/webp; charset=binary")
+    assert not is_raw_image_body("multipart/form-data; boundary=x")
+    assert not is_raw_image_body("")
+
+
+def test_predict_route_negotiates_binary(client_and_manager, jpeg_bytes):
+    client, _ = client_and_manager
+
+    resp = client.post(
+        "/model/predict/resnet50",
+        content=jpeg_bytes,
+        headers={"Content-Type": "image/jpeg", "Accept": PREDICTION_MEDIA_TYPE},
+    )
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith(PREDICTION_MEDIA_TYPE)
+    (result,) = decode_predictions(resp.content)
+    assert result["prediction"] == "diseased"
+    np.testing.assert_allclose(result["raw_output"], [0.1, 0.8, 0.1], rtol=1e-6)
+
+
+def test_predict_route_defaults_to_json(client_and_manager, jpeg_bytes):
+    client, _ = client_and_manager
+
+    resp = client.post(
+        "/model/predict/resnet50",
+        content=jpeg_bytes,
+        headers={"Content-Type": "image/jpeg"},
+    )
+
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.json()["prediction"] == "diseased"
+
+
+def test_predict_top_k_query(client_and_manager, jpeg_bytes):
+    client, _ = client_and_manager
+
+    trimmed = client.post(
+        "/model/predict/resnet50?top_k=2",
+        content=jpeg_bytes,
+        headers={"Content-Type": "image/jpeg"},
+    ).json()
+    full = client.post(
+        "/model/predict/resnet50?top_k=2&include_probs=true",
+        content=jpeg_bytes,
+        headers={"Content-Type": "image/jpeg"},
+    ).json()
+
+    assert "raw_output" not in trimmed
+    assert [p["label"] for p in trimmed["top_predictions"]][0] == "diseased"
+    assert len(trimmed["top_predictions"]) == 2
+    assert len(full["raw_output"]) == 3
+
+
+def test_predict_rejects_non_positive_top_k(client_and_manager, jpeg_bytes):
+    client, _ = client_and_manager
+
+    resp = client.post(
+        "/model/predict/resnet50?top_k=0",
+        content=jpeg_bytes,
+        headers={"Content-Type": "image/jpeg"},
+    )
+
+    assert resp.status_code == 422
@@ -0,0 +1,50 @@
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import transforms
+from manager.preprocessing import Preprocessor, get_preprocessor
+
+REFERENCE = transforms.Compose(
+    [
+        transforms.Resize(256),
+        transforms.CenterCrop(224),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+    ]
+)
+
+
+def random_image(size, mode="RGB", seed=0):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (size[1], size[0], 4), dtype=np.uint8)
+    return Image.fromarray(pixels).convert(mode)
+
+
+def test_batch_matches_torchvision_pipeline():
+    """uint8 batch + fused normalize reproduces Resize/CenterCrop/ToTensor/Normalize"""
+    images = [
+        random_image((640, 480), seed=1),
+        random_image((300, 900), seed=2),
+        random_image((256, 256), seed=3),
+        random_image((200, 150), seed=4),  # smaller than the crop: padded
+        random_image((500, 400), mode="RGBA", seed=5),
+        random_image((400, 500), mode="L", seed=6),
+    ]
+
+    batch = Preprocessor()(images)
+    expected = torch.stack([REFERENCE(img.convert("RGB")) for img in images])
+
+    assert batch.shape == (6, 3, 224, 224)
+    assert batch.dtype == torch.float32
+    assert batch.is_contiguous()
+    torch.testing.assert_close(batch, expected, rtol=0, atol=1e-5)
+
+
+def test_uint8_batch_keeps_pixels_as_bytes():
+    batch = Preprocessor().uint8_batch([random_image((300, 300))])
+    assert batch.dtype == torch.uint8
+    assert batch.shape == (1, 3, 224, 224)
+
+
+def test_preprocessor_is_shared_per_process():
+    assert get_preprocessor() is get_preprocessor()
@@ -0,0 +1,95 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from manager import PlantModel
+from manager.stacking_head import MULTINOMIAL, OVR, StackingHead
+from tools.export_stacking_head import main as export_main, synthetic_features
+
+
+def fit_meta_model(num_classes, **kwargs):
+    rng = np.random.default_rng(0)
+    X = synthetic_features(4 * num_classes, 4, 400)
+    y = rng.integers(0, num_classes, len(X))
+    y[:num_classes] = np.arange(num_classes)  # every class present
+    return LogisticRegression(max_iter=500, **kwargs).fit(X, y), X
+
+
+@pytest.mark.parametrize("num_classes", [2, 5])
+def test_head_matches_logistic_regression(num_classes):
+    meta_model, X = fit_meta_model(num_classes)
+    head = StackingHead.from_sklearn(meta_model)
+
+    pred, probs = head.predict_with_proba(X)
+
+    np.testing.assert_allclose(probs, meta_model.predict_proba(X), atol=1e-6)
+    np.testing.assert_array_equal(pred, meta_model.predict(X))
+    assert head.multi_class == (OVR if num_classes == 2 else MULTINOMIAL)
+
+
+def test_one_vs_rest_normalizes_per_class_sigmoids():
+    coef = np.array([[1.0, 0.0], [0.0, 1.0], [-1.0, -1.0]])
+    intercept = np.array([0.0, 0.5, -0.5])
+    X = np.array([[0.2, 0.7], [2.0, -1.0]])
+    head = StackingHead(coef, intercept, np.array([3, 4, 5]), multi_class=OVR)
+
+    pred, probs = head.predict_with_proba(X)
+
+    sigmoids = 1 / (1 + np.exp(-(X @ coef.T + intercept)))
+    expected = sigmoids / sigmoids.sum(axis=1, keepdims=True)
+    np.testing.assert_allclose(probs, expected)
+    np.testing.assert_array_equal(pred, [4, 3])
+
+
+def test_head_rejects_non_linear_models():
+    with pytest.raises(ValueError, match="coef_"):
+        StackingHead.from_sklearn(object())
+
+
+def test_save_and_load_round_trip(tmp_path):
+    meta_model, X = fit_meta_model(5)
+    path = str(tmp_path / "head.npz")
+
+    StackingHead.from_sklearn(meta_model).save(path)
+    head = StackingHead.load(path)
+
+    np.testing.assert_allclose(
+        head.predict_proba(X), meta_model.predict_proba(X), atol=1e-6
+    )
+    assert head.n_features_in_ == 20
+
+
+def test_export_tool_writes_verified_head(tmp_path):
+    meta_model, X = fit_meta_model(5)
+    pickle_path = tmp_path / "meta.pkl"
+    output = tmp_path / "stacking_head.npz"
+    joblib.dump(meta_model, pickle_path)
+
+    export_main(["--pickle", str(pickle_path), "--output", str(output)])
+
+    np.testing.assert_array_equal(
+        StackingHead.load(str(output)).predict(X), meta_model.predict(X)
+    )
+
+
+def test_ensemble_serves_npz_head(tmp_path):
+    meta_model, X = fit_meta_model(5)
+    path = str(tmp_path / "stacking_head.npz")
+    StackingHead.from_sklearn(meta_model).save(path)
+
+    ensemble = PlantModel(
+        name="ensemble",
+        model_path=path,
+        model_type="sklearn",
+        model_order=[
+            "densenet121",
+            "efficientnet_b4",
+            "mobilenet_v3_large",
+            "resnet50",
+        ],
+    )
+    pred, probs = ensemble.predict_stacked(X)
+
+    assert isinstance(ensemble.model, StackingHead)
+    np.testing.assert_array_equal(pred, meta_model.predict(X))
+    np.testing.assert_allclose(probs, meta_model.predict_proba(X), atol=1e-6)
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from services.warmup import WarmupState, run_startup_warmup, synthetic_images
+
+
+def make_manager(failing=()):
+    manager = MagicMock()
+    manager.models = {"resnet50": object(), "ensemble": object()}
+
+    def predict_batch(name, images):
+        if name in failing:
+            raise RuntimeError("checkpoint missing")
+        return [[0.5, 0.5]] * len(images)
+
+    manager.predict_batch.side_effect = predict_batch
+    return manager
+
+
+def test_synthetic_images_bypass_prediction_cache():
+    images = synthetic_images(3)
+
+    assert len(images) == 3
+    assert images[0].size == (640, 480)
+    assert all("content_hash" not in img.info for img in images)
+
+
+@pytest.mark.asyncio
+async def test_warmup_runs_every_model_and_batch_size():
+    manager = make_manager()
+    state = WarmupState()
+
+    await run_startup_warmup(manager, batch_sizes=[1, 4], state=state)
+
+    calls = [(c.args[0], len(c.args[1])) for c in manager.predict_batch.call_args_list]
+    assert calls == [("resnet50", 1), ("resnet50", 4), ("ensemble", 1), ("ensemble", 4)]
+    assert state.ready
+    assert set(state.timings["ensemble"]) == {1, 4}
+    assert state.total_time is not None
+
+
+@pytest.mark.asyncio
+async def test_warmup_uses_inference_executor():
+    manager = make_manager()
+    executor = MagicMock()
+    executor.run = AsyncMock()
+
+    await run_startup_warmup(
+        manager,
+        executor,
+        batch_sizes=[2],
+        model_names=["resnet50"],
+        state=WarmupState(),
+    )
+
+    fn, name, images = executor.run.call_args.args
+    assert fn is manager.predict_batch
+    assert name == "resnet50"
+    assert len(images) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_model_is_reported_without_blocking_readiness():
+    manager = make_manager(failing=("ensemble",))
+    state = WarmupState()
+
+    await run_startup_warmup(manager, batch_sizes=[1, 4], state=state)
+
+    assert state.ready
+    assert "ensemble" not in state.timings
+    assert state.failures == {"ensemble": "checkpoint missing"}
+    # The failing model is not retried with the larger batch
+    assert manager.predict_batch.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "status, collection, code",
+    [("running", MagicMock(), 503), ("ready", None, 503), ("ready", MagicMock(), 200)],
+)
+def test_ready_endpoint(status, collection, code):
+    import main
+
+    state = WarmupState()
+    state.status = status
+    with patch("main.warmup_state", state), patch(
+        "main.db_conn.models_collection", collection
+    ):
+        resp = TestClient(main.app).get("/ready")
+
+    assert resp.status_code == code
+    assert resp.json()["warmup"]["status"] == status
@@ -0,0 +1,462 @@
+"""
+Benchmark inference of the base models on every backend.
+
+    python -m tools.bench_models
+    python -m tools.bench_models --models resnet50 mobilenet_v3_large \\
+        --backends pytorch onnx --batch-sizes 1 8 32 --threads 1 2 4 \\
+        --resolutions 640x480 2000x1500 --output bench.json
+    python -m tools.bench_models --baseline bench_main.json --output bench.json
+    python -m tools.bench_models --compare bench.json --baseline bench_main.json
+
+Each architecture is built with PlantModel.build_model_arch and run through the
+serving path (preprocess_batch, then _forward_probs). Checkpoints are loaded when
+present; otherwise the weights are random, which does the same arithmetic (each
+result records which). Every combination of backend, intra-op thread count, batch
+size and input resolution runs --warmup untimed and --iterations timed batches, and
+reports p50/p95/p99 batch latency, images/sec and the peak RSS of the run. The model
+input is always a CROP_SIZE crop, so the resolution changes the preprocessing cost
+(resize and crop of photo-sized uploads), reported separately as preprocess_ms.
+
+Backends: pytorch (eager), optimized (--optimizations, default MODEL_OPTIMIZATIONS),
+onnx (the export if present, otherwise exported on the fly) and int8 (only once
+tools.quantize has produced it). Combinations that cannot run are listed under
+"skipped" with the reason.
+
+With --baseline, results are matched to the baseline's by configuration, and every
+metric that got worse by more than --threshold is reported as a regression; the exit
+status is then 1 so CI can gate on it.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+from config.config import settings
+from manager.cpu_topology import allowed_cpus, cgroup_cpu_limit, plan_threads
+from manager.initializer import BASE_MODEL_PATHS, INT8_MODEL_PATHS
+from manager.optimizer import optimizations_for, parse_optimizations
+from manager.plant_model import PlantModel
+
+BACKENDS = ("pytorch", "optimized", "onnx", "int8")
+
+# Fields that identify one benchmark configuration across reports
+CONFIG_KEYS = ("model", "backend", "threads", "batch_size", "resolution")
+
+# Metric -> True when higher is better
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "images_per_sec": True,
+    "peak_rss_mb": False,
+}
+DEFAULT_COMPARE_METRICS = ("p50_ms", "p95_ms", "images_per_sec", "peak_rss_mb")
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    width, _, height = value.lower().partition("x")
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got '{value}'")
+
+
+def synthetic_images(
+    count: int, resolution: Tuple[int, int], seed: int = 0
+) -> List[Image.Image]:
+    """Decoded noise images of the given (width, height)"""
+    rng = np.random.default_rng(seed)
+    width, height = resolution
+    return [
+        Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+        for _ in range(count)
+    ]
+
+
+def reset_peak_rss() -> bool:
+    """Restart the kernel's peak-RSS counter (Linux); False if it can't be reset"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size since the last reset (or since process start)"""
+    try:
+        with open("/proc/self/status") as f:
+            match = re.search(r"VmHWM:\s+(\d+) kB", f.read())
+        if match:
+            return int(match.group(1)) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summarize(
+    latencies: List[float], preprocess: List[float], batch_size: int
+) -> Dict[str, float]:
+    ms = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "preprocess_ms": float(np.mean(preprocess) * 1000),
+        "images_per_sec": batch_size * len(latencies) / float(np.sum(latencies)),
+    }
+
+
+def time_batches(
+    model: PlantModel, images: List[Image.Image], iterations: int, warmup: int
+) -> Dict[str, float]:
+    for _ in range(warmup):
+        model._forward_probs(model.preprocess_batch(images))
+
+    latencies, preprocess = [], []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        batch = model.preprocess_batch(images)
+        prepared = time.perf_counter()
+        model._forward_probs(batch)
+        latencies.append(time.perf_counter() - start)
+        preprocess.append(prepared - start)
+    return summarize(latencies, preprocess, len(images))
+
+
+class BenchModel:
+    """One model on one backend, loaded for the benchmark"""
+
+    def __init__(
+        self,
+        name: str,
+        backend: str,
+        num_classes: int,
+        optimizations: dict,
+        workdir: str,
+    ):
+        self.name = name
+        self.backend = backend
+        checkpoint_path, onnx_path = BASE_MODEL_PATHS.get(name, (None, None))
+        self.weights = (
+            "checkpoint"
+            if checkpoint_path and os.path.exists(checkpoint_path)
+            else "random"
+        )
+
+        model_optimizations = []
+        if backend == "optimized":
+            model_optimizations = optimizations_for(name, optimizations)
+            if not model_optimizations:
+                raise RuntimeError("no optimizations configured (--optimizations)")
+
+        self.plant = PlantModel(
+            name=name,
+            model_path=checkpoint_path or "",
+            model_type="pytorch",
+            num_classes=num_classes,
+            lazy=True,
+            mmap=settings.MODEL_MMAP,
+            optimization_tolerance=(
+                settings.MODEL_OPTIMIZATION_BF16_TOLERANCE
+                if "bf16" in model_optimizations
+                else settings.MODEL_OPTIMIZATION_TOLERANCE
+            ),
+        )
+
+        if backend == "int8":
+            int8_path = INT8_MODEL_PATHS.get(name)
+            if not int8_path or not os.path.exists(int8_path):
+                raise RuntimeError("no INT8 export (python -m tools.quantize)")
+            self._use_onnx(int8_path)
+        elif backend == "onnx":
+            if not onnx_path or not os.path.exists(onnx_path):
+                from tools.export_onnx import export_module
+
+                onnx_path = os.path.join(workdir, f"{name}.onnx")
+                export_module(self._eager(), onnx_path)
+            self._use_onnx(onnx_path)
+        else:
+            self.plant.model = self._eager()
+            if model_optimizations:
+                self.plant.optimizations = model_optimizations
+                optimized = self.plant._optimize(self.plant.model)
+                if optimized is self.plant.model:
+                    raise RuntimeError("optimizations rejected, see the log above")
+                self.plant.model = optimized
+
+    def _eager(self) -> torch.nn.Module:
+        if self.weights == "checkpoint":
+            return self.plant.load_model()
+        return self.plant.build_model_arch().eval()
+
+    def _use_onnx(self, path: str):
+        self.plant.model_type = "onnx"
+        self.plant.model_path = path
+
+    def set_threads(self, threads: int):
+        torch.set_num_threads(threads)
+        if self.plant.model_type == "onnx":
+            # Sessions size their pool at creation, from torch's thread count
+            self.plant.unload()
+            self.plant.ensure_loaded()
+
+
+def run_benchmark(
+    models: List[str],
+    backends: List[str],
+    batch_sizes: List[int],
+    threads: List[int],
+    resolutions: List[Tuple[int, int]],
+    iterations: int = 20,
+    warmup: int = 3,
+    num_classes: int = None,
+    optimizations: str = "",
+) -> Dict:
+    num_classes = num_classes or settings.NUM_CLASSES
+    per_model_optimizations = parse_optimizations(optimizations)
+    original_threads = torch.get_num_threads()
+    images = {
+        res: synthetic_images(max(batch_sizes), res, seed=i)
+        for i, res in enumerate(resolutions)
+    }
+    rss_resettable = reset_peak_rss()
+
+    results, skipped = [], []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in models:
+            for backend in backends:
+                try:
+                    bench = BenchModel(
+                        name, backend, num_classes, per_model_optimizations, workdir
+                    )
+                except Exception as e:
+                    skipped.append(
+                        {"model": name, "backend": backend, "reason": str(e)}
+                    )
+                    print(f"⏭️ {name} / {backend}: {e}")
+                    continue
+
+                for thread_count in threads:
+                    bench.set_threads(thread_count)
+                    for width, height in resolutions:
+                        for batch_size in batch_sizes:
+                            reset_peak_rss()
+                            stats = time_batches(
+                                bench.plant,
+                                images[(width, height)][:batch_size],
+                                iterations,
+                                warmup,
+                            )
+                            result = {
+                                "model": name,
+                                "backend": backend,
+                                "weights": bench.weights,
+                                "threads": thread_count,
+                                "batch_size": batch_size,
+                                "resolution": f"{width}x{height}",
+                                "iterations": iterations,
+                                **stats,
+                                "peak_rss_mb": peak_rss_bytes() / 2**20,
+                            }
+                            results.append(result)
+                            print(
+                                f"⏱️ {name} / {backend} / {thread_count} threads / "
+                                f"batch {batch_size} / {width}x{height}: "
+                                f"p50 {result['p50_ms']:.1f} ms, "
+                                f"p99 {result['p99_ms']:.1f} ms, "
+                                f"{result['images_per_sec']:.1f} img/s, "
+                                f"peak RSS {result['peak_rss_mb']:.0f} MB"
+                            )
+                del bench
+                gc.collect()
+
+    torch.set_num_threads(original_threads)
+    return {
+        "environment": environment(),
+        # Without a resettable counter every peak is the process-wide maximum so far
+        "peak_rss_scope": "configuration" if rss_resettable else "process",
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def environment() -> Dict:
+    try:
+        import onnxruntime
+
+        onnxruntime_version = onnxruntime.__version__
+    except ImportError:
+        onnxruntime_version = None
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "onnxruntime": onnxruntime_version,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "allowed_cpus": len(allowed_cpus()),
+        "cgroup_cpu_quota": cgroup_cpu_limit(),
+    }
+
+
+def config_key(result: Dict) -> Tuple:
+    return tuple(result[key] for key in CONFIG_KEYS)
+
+
+def compare_reports(
+    current: Dict,
+    baseline: Dict,
+    threshold: float = 0.10,
+    metrics=DEFAULT_COMPARE_METRICS,
+) -> Dict:
+    """
+    Regressions (and improvements) beyond `threshold`, as a fraction of the baseline
+    value, for every configuration present in both reports.
+    """
+    baseline_results = {config_key(r): r for r in baseline["results"]}
+    regressions, improvements, unmatched = [], [], []
+    for result in current["results"]:
+        before = baseline_results.get(config_key(result))
+        if before is None:
+            unmatched.append(dict(zip(CONFIG_KEYS, config_key(result))))
+            continue
+        for metric in metrics:
+            if not before.get(metric):
+                continue
+            change = (result[metric] - before[metric]) / before[metric]
+            worse = -change if METRICS[metric] else change
+            if abs(change) <= threshold:
+                continue
+            entry = {
+                **dict(zip(CONFIG_KEYS, config_key(result))),
+                "metric": metric,
+                "baseline": before[metric],
+                "current": result[metric],
+                "change": change,
+            }
+            (regressions if worse > 0 else improvements).append(entry)
+
+    env_before, env_now = baseline.get("environment", {}), current.get(
+        "environment", {}
+    )
+    return {
+        "threshold": threshold,
+        "metrics": list(metrics),
+        "regressions": regressions,
+        "improvements": improvements,
+        "unmatched": unmatched,
+        # Numbers from different machines or library versions aren't comparable
+        "environment_differences": {
+            key: {"baseline": env_before.get(key), "current": env_now.get(key)}
+            for key in sorted(set(env_before) | set(env_now))
+            if env_before.get(key) != env_now.get(key)
+        },
+    }
+
+
+def print_comparison(comparison: Dict):
+    for key, values in comparison["environment_differences"].items():
+        print(f"⚠️ {key} differs: {values['baseline']} -> {values['current']}")
+    for label, entries in (
+        ("🔺 regression", comparison["regressions"]),
+        ("🔻 improvement", comparison["improvements"]),
+    ):
+        for e in entries:
+            print(
+                f"{label}: {e['model']} / {e['backend']} / {e['threads']} threads / "
+                f"batch {e['batch_size']} / {e['resolution']}: {e['metric']} "
+                f"{e['baseline']:.2f} -> {e['current']:.2f} ({e['change']:+.1%})"
+            )
+    if comparison["unmatched"]:
+        print(f"ℹ️ {len(comparison['unmatched'])} configurations not in the baseline")
+    if comparison["regressions"]:
+        print(f"❌ {len(comparison['regressions'])} regressions")
+    else:
+        print(f"✅ no regressions beyond {comparison['threshold']:.0%}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--models", nargs="+", default=list(BASE_MODEL_PATHS))
+    parser.add_argument(
+        "--backends", nargs="+", default=["pytorch"], choices=list(BACKENDS)
+    )
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument(
+        "--threads",
+        nargs="+",
+        type=int,
+        help="intra-op thread counts (default: the usable CPUs)",
+    )
+    parser.add_argument(
+        "--resolutions", nargs="+", type=parse_resolution, default=[(640, 480)]
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--num-classes", type=int)
+    parser.add_argument("--optimizations", default=settings.MODEL_OPTIMIZATIONS)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--baseline", help="report to check for regressions against")
+    parser.add_argument(
+        "--compare", help="compare this existing report instead of running"
+    )
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument(
+        "--metrics",
+        nargs="+",
+        default=list(DEFAULT_COMPARE_METRICS),
+        choices=list(METRICS),
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        if not args.baseline:
+            parser.error("--compare needs --baseline")
+        with open(args.compare) as f:
+            report = json.load(f)
+    else:
+        report = run_benchmark(
+            models=args.models,
+            backends=args.backends,
+            batch_sizes=args.batch_sizes,
+            threads=args.threads or [plan_threads().usable_cpus],
+            resolutions=args.resolutions,
+            iterations=args.iterations,
+            warmup=args.warmup,
+            num_classes=args.num_classes,
+            optimizations=args.optimizations,
+        )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["comparison"] = compare_reports(
+            report, baseline, args.threshold, args.metrics
+        )
+        print_comparison(report["comparison"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline and report["comparison"]["regressions"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
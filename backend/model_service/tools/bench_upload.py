@@ -0,0 +1,136 @@
+"""
+Compare the per-request cost of multipart and raw-body uploads to /model/predict.
+
+    python -m tools.bench_upload
+    python -m tools.bench_upload --image leaf.jpg --requests 500 --report upload.json
+
+Requests go through the real FastAPI app in-process (no sockets), with the model
+swapped for a stub that returns fixed probabilities, so the timings cover only HTTP
+handling, body parsing and image decoding. Both modes decode the same image, so the
+difference between them is the multipart parsing (and temp-file spooling for bodies
+over 1 MB) that raw uploads skip.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+
+class StubManager:
+    """Answers every prediction instantly so only the upload path is measured"""
+
+    def __init__(self, num_classes: int):
+        self.probs = np.full((1, num_classes), 1.0 / num_classes, dtype=np.float32)
+        self.models = {}
+
+    def predict(self, model_name, image):
+        return self.probs
+
+
+def synthetic_jpeg(width: int, height: int, quality: int = 90) -> bytes:
+    """A noisy photo-sized JPEG; noise keeps the file at a realistic size"""
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    ms = np.array(latencies) * 1000
+    return {
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+async def run(data: bytes, model_name: str, requests: int, warmup: int) -> dict:
+    import httpx
+
+    import main
+    from dependencies import get_executor, get_manager, get_scheduler
+    from config.config import settings
+
+    main.app.dependency_overrides[get_manager] = lambda: StubManager(
+        settings.NUM_CLASSES
+    )
+    main.app.dependency_overrides[get_scheduler] = lambda: None
+    main.app.dependency_overrides[get_executor] = lambda: None
+
+    url = f"/model/predict/{model_name}"
+    modes = {
+        "multipart": dict(files={"file": ("upload.jpg", data, "image/jpeg")}),
+        "raw": dict(content=data, headers={"Content-Type": "image/jpeg"}),
+    }
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for mode, kwargs in modes.items():
+            for _ in range(warmup):
+                (await client.post(url, **kwargs)).raise_for_status()
+            latencies = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                resp = await client.post(url, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                resp.raise_for_status()
+            results[mode] = summarize(latencies)
+
+    main.app.dependency_overrides.clear()
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--image", help="image to upload (default: synthetic JPEG)")
+    parser.add_argument("--width", type=int, default=2000)
+    parser.add_argument("--height", type=int, default=1500)
+    parser.add_argument("--model", default="resnet50")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--report", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            data = f.read()
+    else:
+        data = synthetic_jpeg(args.width, args.height)
+
+    results = asyncio.run(run(data, args.model, args.requests, args.warmup))
+    saved = results["multipart"]["mean_ms"] - results["raw"]["mean_ms"]
+    report = {
+        "upload_bytes": len(data),
+        "requests": args.requests,
+        **results,
+        "saved_ms_per_request": saved,
+        "saved_pct": 100 * saved / results["multipart"]["mean_ms"],
+    }
+
+    print(f"📦 upload size: {len(data) / 2**20:.2f} MB, {args.requests} requests/mode")
+    for mode in ("multipart", "raw"):
+        r = results[mode]
+        print(
+            f"   {mode:<9} mean {r['mean_ms']:.2f} ms  p50 {r['p50_ms']:.2f} ms  "
+            f"p95 {r['p95_ms']:.2f} ms"
+        )
+    print(f"✅ raw body saves {saved:.2f} ms/request ({report['saved_pct']:.1f}%)")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
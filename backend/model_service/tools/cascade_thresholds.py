@@ -0,0 +1,304 @@
+"""
+Pick per-stage thresholds for the "cascade" model from a labelled image folder.
+
+    python -m tools.cascade_thresholds --data-dir data/val --target-accuracy 0.97
+
+The folder follows the training layout, one sub-folder per class named like the
+idx2label values (e.g. data/val/apple/apple scab/*.jpg). Photos are decoded the way
+uploads are (services.prediction_service.decode_image) and streamed through every
+stage once, in batches, keeping only the probabilities. The search then replays the
+cascade over those arrays for combinations of candidate confidence / margin
+thresholds and keeps the one that reaches the target accuracy at the lowest average
+compute per image: every combination when there are few enough, otherwise a
+stage-by-stage coordinate search. Compute is each base model's measured forward
+time, so a stage costs what it adds on top of the stages before it.
+
+The chosen thresholds are written to saved_models/cascade_thresholds.json, which
+setup_models picks up on the next start.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config.config import settings
+from manager.cascade import accepts, confidence_and_margin
+from manager.initializer import setup_models
+from saved_models.model_paths.model_paths import CASCADE_THRESHOLDS_PATH
+from services.prediction_service import decode_image
+from tools.quantize import IMAGE_SUFFIXES
+
+CONFIDENCE_GRID = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 0.99, 1.01)
+MARGIN_GRID = (0.0, 0.1, 0.2, 0.3, 0.5, 0.7)
+
+# Above this many threshold combinations, search one stage at a time instead
+MAX_COMBINATIONS = 10_000
+
+
+def labelled_paths(
+    folder: str, idx2label: Dict[str, str], limit: int = None
+) -> Tuple[List[Path], np.ndarray]:
+    """Image files under <folder>/<label>/ with their class indices"""
+    label2idx = {label.lower(): int(idx) for idx, label in idx2label.items()}
+    root = Path(folder)
+    paths, labels, skipped = [], [], set()
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        label = path.parent.relative_to(root).as_posix().lower()
+        if label not in label2idx:
+            skipped.add(label)
+            continue
+        paths.append(path)
+        labels.append(label2idx[label])
+        if limit and len(paths) >= limit:
+            break
+
+    if skipped:
+        print(f"⚠️ Skipped folders that match no class: {sorted(skipped)}")
+    if not paths:
+        raise ValueError(f"No labelled images found in {folder}")
+    return paths, np.array(labels)
+
+
+def load_images(paths: Sequence[Path]) -> List[Image.Image]:
+    return [decode_image(path.read_bytes()) for path in paths]
+
+
+def _replay(
+    accept: Sequence[np.ndarray],
+    correct: Sequence[np.ndarray],
+    stage_costs: Sequence[float],
+) -> dict:
+    # accept[k]: images stage k may answer; correct[k]: images stage k gets right
+    n = len(correct[0])
+    reach = np.ones(n, dtype=bool)
+    answered_right = np.zeros(n, dtype=bool)
+    cost = 0.0
+    exits = []
+    for k in range(len(correct)):
+        cost += stage_costs[k] * reach.mean()
+        done = reach & accept[k] if k < len(accept) else reach
+        answered_right |= done & correct[k]
+        exits.append(float(done.mean()))
+        reach &= ~done
+    return {"accuracy": float(answered_right.mean()), "cost": cost, "exit_rates": exits}
+
+
+def evaluate_cascade(
+    stage_probs: Sequence[np.ndarray],
+    labels: np.ndarray,
+    thresholds: Sequence[Tuple[float, float]],
+    stage_costs: Sequence[float],
+) -> dict:
+    """
+    Replay the cascade offline. `thresholds` holds (confidence, margin) for every
+    stage but the last; returns accuracy, average cost per image and exit rates.
+    """
+    accept = [accepts(probs, *t) for probs, t in zip(stage_probs, thresholds)]
+    correct = [probs.argmax(axis=1) == labels for probs in stage_probs]
+    return _replay(accept, correct, stage_costs)
+
+
+def _candidate_masks(
+    probs: np.ndarray, candidates: Sequence[Tuple[float, float]]
+) -> List[Tuple[Tuple[float, float], np.ndarray]]:
+    """Accept mask of every candidate, keeping the first of any that behave alike"""
+    top1, margin = confidence_and_margin(probs)
+    options, seen = [], set()
+    for confidence, min_margin in candidates:
+        mask = (top1 >= confidence) & (margin >= min_margin)
+        key = np.packbits(mask).tobytes()
+        if key not in seen:
+            seen.add(key)
+            options.append(((confidence, min_margin), mask))
+    return options
+
+
+def _better(result: dict, best: Optional[dict], target_accuracy: float) -> bool:
+    if best is None:
+        return True
+    reached, best_reached = (
+        result["accuracy"] >= target_accuracy,
+        best["accuracy"] >= target_accuracy,
+    )
+    if reached != best_reached:
+        return reached
+    if reached:
+        return (result["cost"], -result["accuracy"]) < (best["cost"], -best["accuracy"])
+    return (result["accuracy"], -result["cost"]) > (best["accuracy"], -best["cost"])
+
+
+def search_thresholds(
+    stage_probs: Sequence[np.ndarray],
+    labels: np.ndarray,
+    stage_costs: Sequence[float],
+    target_accuracy: float,
+    confidence_grid: Sequence[float] = CONFIDENCE_GRID,
+    margin_grid: Sequence[float] = MARGIN_GRID,
+    max_combinations: int = MAX_COMBINATIONS,
+) -> Tuple[List[Tuple[float, float]], dict]:
+    """
+    Cheapest (confidence, margin) per early stage that reaches `target_accuracy`.
+    Falls back to the most accurate combination when none does.
+
+    Accept masks are computed once per stage and candidate; candidates with the same
+    mask are merged. Every combination is tried when there are at most
+    `max_combinations`; otherwise each stage's thresholds are improved in turn,
+    holding the others fixed, until no change helps.
+    """
+    candidates = list(itertools.product(confidence_grid, margin_grid))
+    correct = [probs.argmax(axis=1) == labels for probs in stage_probs]
+    options = [_candidate_masks(probs, candidates) for probs in stage_probs[:-1]]
+
+    def run(choice: Sequence[int]) -> dict:
+        accept = [options[k][i][1] for k, i in enumerate(choice)]
+        return _replay(accept, correct, stage_costs)
+
+    best, best_result = None, None
+    if math.prod(len(o) for o in options) <= max_combinations:
+        for choice in itertools.product(*(range(len(o)) for o in options)):
+            result = run(choice)
+            if _better(result, best_result, target_accuracy):
+                best, best_result = choice, result
+    else:
+        # Start from the strictest thresholds: everything escalates to the last stage
+        best = tuple(int(np.argmin([m.sum() for _, m in o])) for o in options)
+        best_result = run(best)
+        improved = True
+        while improved:
+            improved = False
+            for k, stage_options in enumerate(options):
+                for i in range(len(stage_options)):
+                    choice = best[:k] + (i,) + best[k + 1 :]
+                    result = run(choice)
+                    if _better(result, best_result, target_accuracy):
+                        best, best_result, improved = choice, result, True
+
+    return [options[k][i][0] for k, i in enumerate(best)], best_result
+
+
+def _forward_ms(model, images: List[Image.Image], repeats: int = 3) -> float:
+    """Per-image forward time of a base model, best of a few runs"""
+    tensor = model.preprocess_batch(images)
+    model._forward_probs(tensor)  # warm-up
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model._forward_probs(tensor)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(images)
+
+
+def stage_outputs(
+    manager, stages: List[str], paths: Sequence[Path], batch_size: int
+) -> List[np.ndarray]:
+    """
+    Probabilities of every stage for every image, as the cascade would see them.
+    Images are decoded one batch at a time and dropped once it has run.
+    """
+    needed = []
+    for stage in stages:
+        model = manager.models[stage]
+        if manager._is_stacking(model):
+            needed.extend(model.model_order)
+        needed.append(stage)
+    needed = list(dict.fromkeys(needed))
+
+    per_model = {name: [] for name in stages}
+    for start in range(0, len(paths), batch_size):
+        images = load_images(paths[start : start + batch_size])
+        outputs = manager.predict_all(images, needed)
+        for name in stages:
+            output = outputs[name]
+            if isinstance(output, tuple):
+                prediction, probs = output
+                if probs is None:
+                    probs = np.eye(outputs[needed[0]].shape[1])[prediction]
+                output = probs
+            per_model[name].append(output)
+    return [np.concatenate(per_model[name]) for name in stages]
+
+
+def stage_costs(
+    manager, stages: List[str], paths: Sequence[Path]
+) -> Tuple[List[float], Dict[str, float]]:
+    """Incremental per-image compute (ms) of each stage given the stages before it"""
+    sample = load_images(paths[:16])
+    timings = {}
+    costs = []
+    for stage in stages:
+        model = manager.models[stage]
+        bases = model.model_order if manager._is_stacking(model) else [stage]
+        cost = 0.0
+        for name in bases:
+            if name not in timings:
+                timings[name] = _forward_ms(manager.models[name], sample)
+                cost += timings[name]
+        costs.append(cost)
+    return costs, timings
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--data-dir", required=True, help="labelled image folder")
+    parser.add_argument(
+        "--target-accuracy",
+        type=float,
+        default=None,
+        help="accuracy to reach (default: that of the last stage alone)",
+    )
+    parser.add_argument("--stages", default=settings.CASCADE_STAGES)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--output", default=CASCADE_THRESHOLDS_PATH)
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    manager, idx2label = setup_models()
+    paths, labels = labelled_paths(args.data_dir, idx2label, args.limit)
+    print(f"🖼️ {len(paths)} labelled images, stages: {' -> '.join(stages)}")
+
+    probs = stage_outputs(manager, stages, paths, args.batch_size)
+    costs, timings = stage_costs(manager, stages, paths)
+    final_accuracy = float((probs[-1].argmax(axis=1) == labels).mean())
+    target = final_accuracy if args.target_accuracy is None else args.target_accuracy
+
+    thresholds, result = search_thresholds(probs, labels, costs, target)
+    if result["accuracy"] < target:
+        print(f"⚠️ No thresholds reach {target:.4f}; using the most accurate ones")
+
+    report = {
+        "stages": stages,
+        "thresholds": {
+            stage: {"confidence": conf, "margin": margin}
+            for stage, (conf, margin) in zip(stages, thresholds)
+        },
+        "target_accuracy": target,
+        "accuracy": result["accuracy"],
+        "last_stage_accuracy": final_accuracy,
+        "avg_compute_ms": result["cost"],
+        "all_stages_compute_ms": sum(costs),
+        "exit_rates": dict(zip(stages, result["exit_rates"])),
+        "model_compute_ms": timings,
+        "num_images": len(paths),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(
+        f"✅ accuracy {result['accuracy']:.4f} (last stage {final_accuracy:.4f}) at "
+        f"{result['cost']:.1f} ms/image (every stage {sum(costs):.1f} ms/image)"
+    )
+    print(f"📝 Thresholds written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Export the fine-tuned PyTorch base models to ONNX.
+
+    python -m tools.export_onnx
+    python -m tools.export_onnx --models resnet50 mobilenet_v3_large --opset 17
+
+Each export keeps a dynamic batch dimension so the ONNX Runtime backend can serve
+micro-batches, and is checked against the eager PyTorch model before it is kept.
+Serve the results with MODEL_BACKEND=onnx.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import torch
+
+from config.config import settings
+from manager.initializer import BASE_MODEL_PATHS
+from manager.plant_model import PlantModel
+
+
+def export_module(model: torch.nn.Module, onnx_path: str, opset: int = 17):
+    """Export an eval-mode model with a dynamic batch dimension"""
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    dummy = torch.randn(1, 3, 224, 224)
+    torch.onnx.export(
+        model,
+        dummy,
+        onnx_path,
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+    )
+
+
+def export_model(
+    name: str,
+    checkpoint_path: str,
+    onnx_path: str,
+    opset: int = 17,
+    atol: float = 1e-4,
+    num_classes: int = None,
+) -> float:
+    """Export one model and return the max abs logit difference vs. PyTorch."""
+    plant_model = PlantModel(
+        name=name,
+        model_path=checkpoint_path,
+        model_type="pytorch",
+        num_classes=num_classes or settings.NUM_CLASSES,
+    )
+    model = plant_model.model
+    export_module(model, onnx_path, opset)
+
+    # Verify on a batch larger than the one used for tracing
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    check = torch.randn(4, 3, 224, 224)
+    with torch.no_grad():
+        expected = model(check).numpy()
+    actual = session.run(None, {"input": check.numpy()})[0]
+
+    max_diff = float(np.abs(expected - actual).max())
+    if max_diff > atol:
+        os.remove(onnx_path)
+        raise RuntimeError(
+            f"{name}: ONNX output differs from PyTorch by {max_diff:.2e} (> {atol})"
+        )
+    return max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export base models to ONNX")
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=list(BASE_MODEL_PATHS),
+        choices=list(BASE_MODEL_PATHS),
+    )
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    for name in args.models:
+        checkpoint_path, onnx_path = BASE_MODEL_PATHS[name]
+        max_diff = export_model(
+            name, checkpoint_path, onnx_path, opset=args.opset, atol=args.atol
+        )
+        print(f"✅ {name} -> {onnx_path} (max abs diff {max_diff:.2e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Export the ensemble's scikit-learn meta-model as a numpy stacking head.
+
+    python -m tools.export_stacking_head
+    python -m tools.export_stacking_head --pickle saved_models/logistic_meta_model.pkl
+
+Reads the fitted LogisticRegression from the pickle, writes its coefficients,
+intercepts and class order to saved_models/stacking_head.npz, and checks the head
+against the pickle on synthetic stacked features (one probability vector per base
+model, as the ensemble builds them). Nothing is written if predictions differ or
+probabilities drift beyond --tolerance. setup_models serves the .npz from the next
+start (STACKING_HEAD_ENABLED).
+"""
+
+import argparse
+import json
+import time
+from typing import List, Optional
+
+import joblib
+import numpy as np
+
+from manager.stacking_head import StackingHead
+from saved_models.model_paths.model_paths import ENSEMBLE_PATH, STACKING_HEAD_PATH
+
+
+def synthetic_features(
+    num_features: int, num_base_models: int, samples: int, seed: int = 0
+) -> np.ndarray:
+    """Stacked features shaped like the ensemble's: rows of per-model distributions"""
+    rng = np.random.default_rng(seed)
+    if num_features % num_base_models:
+        return rng.random((samples, num_features))
+    classes = num_features // num_base_models
+    # Low concentration gives the peaked distributions confident base models produce
+    blocks = [
+        rng.dirichlet(np.full(classes, 0.1), size=samples)
+        for _ in range(num_base_models)
+    ]
+    return np.concatenate(blocks, axis=1).astype(np.float32)
+
+
+def compare(meta_model, head: StackingHead, features: np.ndarray) -> dict:
+    """How closely the head reproduces the pickle, and what each costs per batch"""
+    start = time.perf_counter()
+    expected_pred = meta_model.predict(features)
+    expected_probs = meta_model.predict_proba(features)
+    sklearn_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    pred, probs = head.predict_with_proba(features)
+    head_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "samples": len(features),
+        "max_prob_difference": float(np.abs(probs - expected_probs).max()),
+        "prediction_mismatches": int((pred != expected_pred).sum()),
+        "sklearn_ms": sklearn_ms,
+        "head_ms": head_ms,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--pickle", default=ENSEMBLE_PATH)
+    parser.add_argument("--output", default=STACKING_HEAD_PATH)
+    parser.add_argument("--base-models", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=2048)
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    parser.add_argument("--report", help="write the comparison as JSON")
+    args = parser.parse_args(argv)
+
+    meta_model = joblib.load(args.pickle)
+    head = StackingHead.from_sklearn(meta_model)
+    features = synthetic_features(head.n_features_in_, args.base_models, args.samples)
+    report = compare(meta_model, head, features)
+    report["multi_class"] = head.multi_class
+    report["num_classes"] = len(head.classes)
+
+    print(
+        f"🔎 {report['samples']} samples: max probability difference "
+        f"{report['max_prob_difference']:.2e}, "
+        f"{report['prediction_mismatches']} prediction mismatches"
+    )
+    print(
+        f"   scikit-learn {report['sklearn_ms']:.2f} ms vs "
+        f"stacking head {report['head_ms']:.2f} ms"
+    )
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if (
+        report["prediction_mismatches"]
+        or report["max_prob_difference"] > args.tolerance
+    ):
+        raise SystemExit("❌ Stacking head does not match the pickle; nothing written")
+
+    head.save(args.output)
+    print(f"✅ Stacking head written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Produce INT8 quantized variants of the base models.
+
+    python -m tools.quantize --calibration-dir data/calibration
+    python -m tools.quantize --calibration-dir data/calibration --mode dynamic \\
+        --models mobilenet_v3_large --report int8_report.json
+
+Quantization runs on the ONNX exports (created on the fly if missing) with ONNX
+Runtime's static post-training quantization, calibrated on a small folder of
+representative leaf photos. Each variant is written to saved_models/int8/ and served
+by setup_models as "<name>_int8". The report compares every variant with its fp32
+model on latency, memory and top-1 agreement.
+
+Photos are decoded like uploads (services.prediction_service.decode_image) and
+streamed through in batches, so only one batch is in memory at a time however large
+the calibration or evaluation folder is.
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Union
+
+import numpy as np
+from PIL import Image
+
+from config.config import settings
+from manager.initializer import BASE_MODEL_PATHS, INT8_MODEL_PATHS
+from manager.preprocessing import get_preprocessor
+from services.prediction_service import decode_image
+from tools.export_onnx import export_model
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def image_paths(folder: str, limit: int = None) -> List[Path]:
+    paths = sorted(
+        p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES
+    )[:limit]
+    if not paths:
+        raise ValueError(f"No images found in {folder}")
+    return paths
+
+
+def preprocess(images: List[Image.Image]) -> np.ndarray:
+    """Same preprocessing the served models use, as an (N, 3, 224, 224) array"""
+    return get_preprocessor()(images).numpy()
+
+
+class ImageBatches:
+    """
+    Preprocessed batches of the images in a folder. Every pass decodes the files
+    again, lazily, so iterating never holds more than one batch.
+    """
+
+    def __init__(self, folder: str, limit: int = None, batch_size: int = 16):
+        self.paths = image_paths(folder, limit)
+        self.batch_size = batch_size
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for start in range(0, len(self.paths), self.batch_size):
+            chunk = self.paths[start : start + self.batch_size]
+            yield preprocess([decode_image(path.read_bytes()) for path in chunk])
+
+
+Batches = Union[np.ndarray, Iterable[np.ndarray]]
+
+
+def _batches(inputs: Batches) -> Iterable[np.ndarray]:
+    # A single preprocessed array counts as one batch
+    return [inputs] if isinstance(inputs, np.ndarray) else inputs
+
+
+def quantize(
+    fp32_path: str,
+    int8_path: str,
+    calibration: Batches,
+    mode: str = "static",
+):
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    os.makedirs(os.path.dirname(int8_path), exist_ok=True)
+
+    # Shape inference + graph cleanup gives the quantizer a simpler graph
+    prepared_path = f"{int8_path}.prep.onnx"
+    try:
+        quant_pre_process(fp32_path, prepared_path)
+    except Exception as e:
+        print(f"⚠️ Pre-processing failed, quantizing the raw export: {e}")
+        prepared_path = fp32_path
+
+    try:
+        if mode == "dynamic":
+            quantize_dynamic(prepared_path, int8_path, weight_type=QuantType.QInt8)
+            return
+
+        class StreamingReader(CalibrationDataReader):
+            """Hands the calibrator one batch at a time, as it is preprocessed"""
+
+            def __init__(self, batches: Iterable[np.ndarray]):
+                self._batches = iter(batches)
+
+            def get_next(self):
+                batch = next(self._batches, None)
+                return None if batch is None else {"input": batch}
+
+        quantize_static(
+            prepared_path,
+            int8_path,
+            StreamingReader(_batches(calibration)),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    finally:
+        if prepared_path != fp32_path:
+            for leftover in (prepared_path, f"{prepared_path}.data"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+
+def _model_bytes(onnx_path: str) -> int:
+    # Large exports keep their weights in an external "<file>.data" blob
+    external = f"{onnx_path}.data"
+    size = os.path.getsize(onnx_path)
+    return size + (os.path.getsize(external) if os.path.exists(external) else 0)
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def evaluate(onnx_path: str, inputs: Batches, runs: int = 3) -> Dict:
+    """Latency (batch of one), memory and top-1 predictions for one ONNX model"""
+    import onnxruntime as ort
+
+    rss_before = _rss_bytes()
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    rss_after = None
+
+    timings, top1 = [], []
+    for batch in _batches(inputs):
+        if rss_after is None:
+            session.run(None, {"input": batch[:1]})  # warm up
+            rss_after = _rss_bytes()
+        for _ in range(runs):
+            for i in range(len(batch)):
+                start = time.perf_counter()
+                session.run(None, {"input": batch[i : i + 1]})
+                timings.append(time.perf_counter() - start)
+        top1.append(session.run(None, {"input": batch})[0].argmax(axis=1))
+
+    return {
+        "latency_ms_p50": float(np.percentile(timings, 50) * 1000),
+        "latency_ms_mean": float(np.mean(timings) * 1000),
+        "file_mb": _model_bytes(onnx_path) / 2**20,
+        "rss_delta_mb": (rss_after - rss_before) / 2**20,
+        "top1": np.concatenate(top1),
+    }
+
+
+def compare(fp32: Dict, int8: Dict) -> Dict:
+    agreement = float((fp32["top1"] == int8["top1"]).mean())
+    report = {}
+    for key in ("latency_ms_p50", "latency_ms_mean", "file_mb", "rss_delta_mb"):
+        report[key] = {"fp32": fp32[key], "int8": int8[key]}
+    report["latency_speedup"] = fp32["latency_ms_p50"] / int8["latency_ms_p50"]
+    report["top1_agreement"] = agreement
+    report["top1_agreement_delta"] = agreement - 1.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build INT8 variants of base models")
+    parser.add_argument("--calibration-dir", required=True)
+    parser.add_argument(
+        "--eval-dir", help="Images for the report (defaults to calibration set)"
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=list(INT8_MODEL_PATHS),
+        choices=list(INT8_MODEL_PATHS),
+    )
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--max-calibration-images", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--report", help="Write the comparison as JSON to this path")
+    args = parser.parse_args()
+
+    calibration = ImageBatches(
+        args.calibration_dir, args.max_calibration_images, args.batch_size
+    )
+    eval_inputs = (
+        ImageBatches(args.eval_dir, batch_size=args.batch_size)
+        if args.eval_dir
+        else calibration
+    )
+
+    reports = {}
+    for name in args.models:
+        checkpoint_path, fp32_path = BASE_MODEL_PATHS[name]
+        if not os.path.exists(fp32_path):
+            export_model(
+                name, checkpoint_path, fp32_path, num_classes=settings.NUM_CLASSES
+            )
+
+        int8_path = INT8_MODEL_PATHS[name]
+        quantize(fp32_path, int8_path, calibration, mode=args.mode)
+
+        report = compare(
+            evaluate(fp32_path, eval_inputs), evaluate(int8_path, eval_inputs)
+        )
+        reports[f"{name}_int8"] = report
+        print(
+            f"✅ {name}_int8: {report['latency_speedup']:.2f}x faster, "
+            f"{report['file_mb']['int8']:.1f} MB vs {report['file_mb']['fp32']:.1f} MB, "
+            f"top-1 agreement {report['top1_agreement']:.2%}"
+        )
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()